@@ -0,0 +1 @@
+"""Offline benchmarks for the Campaign Ops pipeline (no Vertex AI calls)."""
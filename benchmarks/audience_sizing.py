@@ -0,0 +1,187 @@
+"""Audience sizing latency on 1M / 10M-user tables, with and without bitmap caching.
+
+uv run python -m benchmarks.audience_sizing --users 1000000 10000000 --queries 500
+
+Each query ANDs 2-4 rules drawn from a pool of common eligibility rules, the way
+segments of one campaign reuse the same predicates. `uncached` evaluates every rule
+with a fresh vectorized filter; `cached` keeps predicate bitmaps between queries.
+`overlap` times the pairwise overlap / union / exclusive assignment of `--segments`
+such segments, from cold columns and with their bitmaps cached.
+
+Before timing anything, the rules in PARSE_CHECKS are parsed and compared with their
+expected interpretation; a mismatch stops the benchmark.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from campaign_ops_team.audience_engine import (
+    AudienceEngine,
+    describe,
+    load_user_table,
+    parse_rule,
+)
+
+RULE_POOL = (
+    ">=20 wallet transactions in 30 days",
+    ">=10 wallet transactions in 30 days",
+    "spend >=10,000 THB",
+    "spend >=10,000 THB in 90 days",
+    "spend >= 5,000 THB per month",
+    "QR share below 35%",
+    "QR share >= 50%",
+    ">=10 QR transactions/user/month",
+    "active in the last 7 days",
+    "inactive for 30 days",
+    "tenure over 180 days",
+    "redeemed at least 1 cashback voucher",
+    "opted in to push",
+    "email opt-in",
+    "(QR share < 20% OR qr transactions < 2) AND push opt-in",
+)
+
+# Rules once misread, with the interpretation they must keep.
+PARSE_CHECKS = {
+    "spend between 1,000 and 5,000 THB": "(spend_30d_thb <= 5000 AND spend_30d_thb >= 1000)",
+    "top 10% spenders": "spend_30d_thb top 10.00%",
+    "spend >= 10k THB per month on QR": "spend_30d_thb >= 10000",
+    "tenure > 1 year": "tenure_days > 365",
+    "account age >= 6 months": "tenure_days >= 180",
+    "dormant over 1 month": "days_since_last_txn > 30",
+    "last transaction more than 2 weeks ago": "days_since_last_txn > 14",
+}
+
+
+def check_parsing() -> list[str]:
+    """One line per rule in PARSE_CHECKS whose interpretation changed."""
+    failures = []
+    for rule, expected in PARSE_CHECKS.items():
+        actual = describe(parse_rule(rule))
+        if actual != expected:
+            failures.append(f"{rule!r}: expected {expected!r}, got {actual!r}")
+    return failures
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _queries(count: int, seed: int) -> list[list[str]]:
+    rng = random.Random(seed)
+    return [rng.sample(RULE_POOL, rng.randint(2, 4)) for _ in range(count)]
+
+
+def _run(engine: AudienceEngine, queries: list[list[str]]) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for rules in queries:
+        latencies.append(engine.size(rules).elapsed_ms)
+    wall = time.perf_counter() - started
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": _percentile(latencies, 0.95),
+        "max_ms": max(latencies),
+        "queries_per_s": len(queries) / wall,
+        "cache": engine.stats.as_dict(),
+    }
+
+
+def _overlap(engine: AudienceEngine, segments: list[list[str]]) -> dict:
+    named = [(f"segment_{i}", rules) for i, rules in enumerate(segments)]
+    cold = engine.overlap(named)
+    warm = engine.overlap(named)
+    return {
+        "segments": len(segments),
+        "cold_ms": cold["elapsed_ms"],
+        "warm_ms": warm["elapsed_ms"],
+        "union_users": cold["union_users"],
+        "double_counted_users": cold["double_counted_users"],
+    }
+
+
+def bench(
+    users: int,
+    path: str,
+    queries: list[list[str]],
+    cache_size: int,
+    segments: list[list[str]],
+) -> dict:
+    table_path = os.path.join(path, f"users_{users}")
+    started = time.perf_counter()
+    columns = load_user_table(table_path, users)
+    build_s = time.perf_counter() - started
+    started = time.perf_counter()
+    columns = load_user_table(table_path, users)
+    open_ms = (time.perf_counter() - started) * 1000
+    return {
+        "users": users,
+        "build_or_load_s": build_s,
+        "mmap_open_ms": open_ms,
+        "uncached": _run(AudienceEngine(columns, cache_size=0), queries),
+        "cached": _run(AudienceEngine(columns, cache_size=cache_size), queries),
+        "overlap": _overlap(AudienceEngine(columns, cache_size=cache_size), segments),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--cache-size", type=int, default=256)
+    parser.add_argument(
+        "--segments", type=int, default=10, help="segments in the overlap test"
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "--path", help="keep the generated tables here (default: a temp dir)"
+    )
+    parser.add_argument("--json", dest="json_path", help="also write the report here")
+    args = parser.parse_args()
+
+    failures = check_parsing()
+    if failures:
+        raise SystemExit("rule parsing regressed:\n" + "\n".join(failures))
+    queries = _queries(args.queries, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        reports = [
+            bench(
+                users,
+                args.path or tmp,
+                queries,
+                args.cache_size,
+                segments=queries[: args.segments],
+            )
+            for users in args.users
+        ]
+
+    for report in reports:
+        print(
+            f"users={report['users']:,}  build_or_load={report['build_or_load_s']:.2f}s  "
+            f"mmap_open={report['mmap_open_ms']:.1f}ms"
+        )
+        for mode in ("uncached", "cached"):
+            r = report[mode]
+            print(
+                f"  {mode:9} p50={r['p50_ms']:.2f}ms  p95={r['p95_ms']:.2f}ms  "
+                f"max={r['max_ms']:.2f}ms  {r['queries_per_s']:.0f} queries/s  "
+                f"bitmap_hit_rate={r['cache']['hit_rate']:.2f}"
+            )
+        r = report["overlap"]
+        print(
+            f"  overlap   segments={r['segments']}  cold={r['cold_ms']:.1f}ms  "
+            f"warm={r['warm_ms']:.1f}ms  union={r['union_users']:,}  "
+            f"double_counted={r['double_counted_users']:,}"
+        )
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
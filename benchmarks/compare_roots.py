@@ -0,0 +1,70 @@
+"""Compares the LLM orchestrator root against the deterministic pipeline root.
+
+uv run python -m benchmarks.compare_roots --runs 50 --concurrency 10 --latency 0.05
+
+Each root runs in its own process (CAMPAIGN_OPS_ROOT is read at import) with the
+same `benchmarks.run_pipeline` arguments; any extra arguments are passed through.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT_MODES = ("orchestrator", "pipeline")
+
+ROWS = (
+    ("latency p50 (s)", lambda r: r["latency_s"]["p50"], "{:.3f}"),
+    ("latency p95 (s)", lambda r: r["latency_s"]["p95"], "{:.3f}"),
+    ("throughput (runs/s)", lambda r: r["throughput_runs_per_s"], "{:.2f}"),
+    ("model calls / run", lambda r: r["model_calls_per_run"], "{:.1f}"),
+    ("prompt tokens / run", lambda r: r["prompt_tokens_per_run"], "{:.0f}"),
+    ("completion tokens / run", lambda r: r["completion_tokens_per_run"], "{:.0f}"),
+    ("errors", lambda r: r["errors"], "{}"),
+)
+
+
+def run_mode(mode: str, args: list[str]) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = os.path.join(tmp, "report.json")
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.run_pipeline", *args]
+            + ["--json", report_path],
+            env={**os.environ, "CAMPAIGN_OPS_ROOT": mode},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        with open(report_path) as f:
+            return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--json", dest="json_path", help="also write both reports to this file"
+    )
+    args, passthrough = parser.parse_known_args()
+
+    reports = {mode: run_mode(mode, passthrough) for mode in ROOT_MODES}
+
+    print(
+        f"{'':<26}" + "".join(f"{mode:>14}" for mode in ROOT_MODES) + f"{'change':>10}"
+    )
+    for label, value, fmt in ROWS:
+        before, after = (value(reports[mode]) for mode in ROOT_MODES)
+        change = f"{(after - before) / before:+.0%}" if before else ""
+        print(
+            f"{label:<26}"
+            + "".join(f"{fmt.format(value(reports[m])):>14}" for m in ROOT_MODES)
+            + f"{change:>10}"
+        )
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
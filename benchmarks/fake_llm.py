@@ -0,0 +1,202 @@
+import asyncio
+import json
+import random
+from contextvars import ContextVar
+from typing import AsyncGenerator
+
+import google.genai.types as types
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.utils.context_utils import Aclosing
+from google.genai.errors import ClientError
+from pydantic import Field, PrivateAttr
+
+# Set by BenchmarkPlugin before each model call. Agents with include_contents="none"
+# don't see their own earlier turns, so critics count their rejections per invocation.
+CURRENT_INVOCATION: ContextVar[str | None] = ContextVar(
+    "current_invocation", default=None
+)
+
+
+def estimate_tokens(llm_request: LlmRequest) -> int:
+    """Rough prompt size (~4 characters per token) of everything sent to the model."""
+    chars = len(str(llm_request.config.system_instruction or ""))
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_call:
+                chars += len(json.dumps(part.function_call.args or {}))
+            elif part.function_response:
+                chars += len(
+                    json.dumps(part.function_response.response or {}, default=str)
+                )
+    return max(1, chars // 4)
+
+
+def _trailing_tool_rounds(contents: list[types.Content]) -> int:
+    """Counts the tool call/response pairs at the end of the conversation."""
+    rounds = 0
+    index = len(contents) - 1
+    while index >= 1:
+        response, request = contents[index], contents[index - 1]
+        if not any(p.function_response for p in response.parts or []):
+            break
+        if not any(p.function_call for p in request.parts or []):
+            break
+        rounds += 1
+        index -= 2
+    return rounds
+
+
+def _previous_turns(contents: list[types.Content], step: dict) -> int:
+    """Counts earlier model turns of this agent that look like `step`."""
+
+    def matches(part: types.Part) -> bool:
+        if "call" in step:
+            return bool(part.function_call) and part.function_call.name == step["call"]
+        return bool(part.text)
+
+    return sum(
+        1
+        for content in contents
+        if content.role == "model" and any(matches(p) for p in content.parts or [])
+    )
+
+
+class ScriptedLlm(BaseLlm):
+    """Deterministic stand-in for `Gemini` that replays a per-agent script.
+
+    Each script step is `{"call": name, "args": {...}}`, `{"calls": [call, ...]}` (one
+    turn with several tool calls) or `{"text": str}`.
+    Critics answer with `rejection` for their first `reject_first` turns, and drafting
+    agents reply with their `flawed` draft for their first `flawed_first` replies.
+    A `rate_limit_errors` fraction of calls fails with a 429 like an exhausted quota,
+    and a `malformed_outputs` fraction of JSON replies comes back fenced, with a
+    trailing comma or truncated, the way real models sometimes answer.
+    The step is chosen from the request itself (how many tool rounds the agent has
+    completed this turn), so one instance is safe to share across concurrent sessions.
+    """
+
+    agent_name: str
+    script: list[dict] = Field(default_factory=list)
+    rejection: dict = Field(default_factory=dict)
+    reject_first: int = 0
+    flawed: dict = Field(default_factory=dict)
+    flawed_first: int = 0
+    latency_s: float = 0.0
+    jitter_s: float = 0.0
+    output_tokens_per_s: float = 0.0  # decode rate; 0 returns replies instantly
+    seed: int = 0
+    rate_limit_errors: float = 0.0
+    malformed_outputs: float = 0.0
+
+    _rng: random.Random = PrivateAttr()
+    _rejections: dict[str, int] = PrivateAttr(default_factory=dict)
+    _flawed: dict[str, int] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context) -> None:
+        self._rng = random.Random(f"{self.seed}:{self.agent_name}")
+
+    def _next_step(self, llm_request: LlmRequest) -> dict:
+        if self.rejection:
+            invocation = CURRENT_INVOCATION.get()
+            if invocation is None:
+                rejected = _previous_turns(llm_request.contents, self.rejection)
+            else:
+                rejected = self._rejections.get(invocation, 0)
+            if rejected < self.reject_first:
+                if invocation is not None:
+                    self._rejections[invocation] = rejected + 1
+                return self.rejection
+        if not self.script:
+            return {"text": "OK"}
+        config = llm_request.config
+        if config.response_schema and not config.tools:
+            # A structured-output re-prompt: answer with the final reply again.
+            return next(s for s in reversed(self.script) if "text" in s)
+        step = self.script[
+            min(_trailing_tool_rounds(llm_request.contents), len(self.script) - 1)
+        ]
+        invocation = CURRENT_INVOCATION.get()
+        if self.flawed and "text" in step and invocation is not None:
+            drafts = self._flawed.get(invocation, 0)
+            if drafts < self.flawed_first:
+                self._flawed[invocation] = drafts + 1
+                return self.flawed
+        return step
+
+    def _malform(self, text: str) -> str:
+        if not self.malformed_outputs or not text.startswith("{"):
+            return text
+        if self._rng.random() >= self.malformed_outputs:
+            return text
+        defect = self._rng.choice(("fence", "trailing_comma", "truncate"))
+        if defect == "fence":
+            return f"Here is the JSON:\n```json\n{text}\n```"
+        if defect == "trailing_comma":
+            return text[:-1] + ",}"
+        return text[: len(text) // 2]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        delay = self.latency_s + self._rng.uniform(0, self.jitter_s)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.rate_limit_errors and self._rng.random() < self.rate_limit_errors:
+            raise ClientError(
+                429,
+                {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}},
+            )
+
+        step = self._next_step(llm_request)
+        if "call" in step or "calls" in step:
+            steps = step.get("calls", [step])
+            parts = [
+                types.Part.from_function_call(name=s["call"], args=s["args"])
+                for s in steps
+            ]
+            output_chars = sum(
+                len(s["call"]) + len(json.dumps(s["args"])) for s in steps
+            )
+        else:
+            reply = self._malform(step["text"])
+            parts = [types.Part.from_text(text=reply)]
+            output_chars = len(reply)
+
+        prompt_tokens = estimate_tokens(llm_request)
+        completion_tokens = max(1, output_chars // 4)
+        if self.output_tokens_per_s:
+            await asyncio.sleep(completion_tokens / self.output_tokens_per_s)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=parts),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=completion_tokens,
+                total_token_count=prompt_tokens + completion_tokens,
+            ),
+        )
+
+
+class ScheduledScriptedLlm(ScriptedLlm):
+    """`ScriptedLlm` admitted by the shared model scheduler, like `ScheduledGemini`."""
+
+    priority: int = 1
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        from campaign_ops_team.rate_limit import SCHEDULER
+
+        generate = super().generate_content_async
+        responses = SCHEDULER.stream(
+            llm_request.model or self.model,
+            self.priority,
+            llm_request,
+            lambda: generate(llm_request, stream),
+        )
+        async with Aclosing(responses) as agen:
+            async for response in agen:
+                yield response
@@ -0,0 +1,448 @@
+import json
+
+# ---------------------------------------------------------------------------
+# Canned agent outputs used by the scripted benchmark models.
+# Shapes follow the JSON contracts described in each agent's instruction.
+# ---------------------------------------------------------------------------
+
+CAMPAIGN_BRIEF = "Grow QR payments for high spenders by 15% in December."
+
+INTAKE_RESULT = {
+    "goal": "Increase QR merchant payments among high spenders by 15% in December.",
+    "possible_features": [
+        "QR Code Payment (Offline Merchants)",
+        "Cashback Rewards & Vouchers",
+        "Transaction History & Insights",
+    ],
+    "best_case": "QR transactions per high spender rise from 2.9 to 3.6/month (+24%).",
+    "worst_case": "Cashback cannibalises organic QR usage; uplift stays below 5%.",
+    "average_case": "QR transactions per high spender rise to 3.3/month (+14%).",
+}
+
+FRONTLINE_CRITIQUE = (
+    "The intake does not state a baseline for QR transactions per high spender. "
+    "Pull `mock_current_kpis` and restate the best/average/worst cases against it."
+)
+
+FRONTLINE_RESULT = dict(
+    INTAKE_RESULT,
+    baselines={"qr_txn_share": 0.35, "high_value_segment_size": 180},
+)
+
+SEARCH_RESULT = (
+    "December is peak season for QR merchant payments in Thailand; competitor wallets "
+    "run 3-5% cashback on dining and groceries during the last two weeks of the month."
+)
+
+GOAL_PLAN = {
+    "campaign_type": "engagement",
+    "campaign_name": "QR December Dash",
+    "campaign_theme": "Scan More, Earn More",
+    "hero_promise": "Scan 10 QR payments in December, get 5% cashback in January",
+    "primary_goal": "Lift QR transactions per high spender by 15% in December",
+    "secondary_goals": ["Raise cashback redemption rate to 0.28"],
+    "action_plan": [
+        {
+            "action": "Launch tiered QR cashback for high spenders",
+            "channel_focus": ["eligible", "push"],
+            "how": "Eligibility rule on 90-day spend; push reminders twice weekly.",
+            "quant_target": {
+                "metric": "qr_txn_per_user",
+                "target_value": ">=10 QR transactions per user",
+                "timeframe": "December",
+            },
+            "reward_logic": "5% cashback capped at 200 THB, paid in January.",
+            "consumer_message": "Scan 10 QR payments this December, unlock 5% cashback",
+            "adapt_plan": "Drop threshold to 8 scans if week-2 progress is below 40%.",
+            "collaboration_owner": "Growth Marketing",
+            "success_metric": "qr_txn_share >= 0.40",
+        },
+        {
+            "action": "Email progress digest with merchant suggestions",
+            "channel_focus": ["email"],
+            "how": "Weekly digest generated from transaction history.",
+            "quant_target": {
+                "metric": "email_ctr",
+                "target_value": ">=4% click-through",
+                "timeframe": "December",
+            },
+            "reward_logic": "Bonus 50 points for opening the digest.",
+            "consumer_message": "You're 4 scans away from 5% cashback",
+            "adapt_plan": "Swap merchant list to top-3 nearby if CTR < 2%.",
+            "collaboration_owner": "CRM",
+            "success_metric": "email_ctr >= 0.04",
+        },
+    ],
+    "measurement_plan": {
+        "primary_kpis": ["qr_txn_share"],
+        "secondary_kpis": ["cashback_redemption_rate"],
+        "checkpoints": ["Dec 8", "Dec 15", "Dec 22"],
+        "kpi_targets": [
+            {
+                "metric": "qr_txn_share",
+                "baseline": "0.35",
+                "target": "0.40",
+                "unit": "share",
+                "timeframe": "December",
+            },
+            {
+                "metric": "cashback_redemption_rate",
+                "baseline": "0.22",
+                "target": "0.28",
+                "unit": "rate",
+                "timeframe": "December",
+            },
+        ],
+    },
+    "schedule_intent": {
+        "launch_window": "Dec 1 - Dec 31",
+        "cadences": ["push twice weekly", "email weekly"],
+        "prerequisites": ["Finance approval for cashback budget"],
+    },
+    "collaboration_matrix": [
+        {"team": "Finance", "need": "Cashback budget 36,000 THB", "status": "pending"}
+    ],
+    "open_questions": ["Confirm cashback cap with Finance"],
+}
+
+SEGMENT = {
+    "name": "High Spenders - Low QR",
+    "campaign_alignment": "Primary audience for the QR cashback action.",
+    "definition": ">=10,000 THB monthly spend in last 90 days and QR share below 0.35",
+    "estimated_size": "205,759 users (20.6%, ~206 per 1,000)",
+    "eligibility_attributes": [
+        "spend >=10,000 THB in 90 days",
+        "qr_txn_share < 0.35",
+    ],
+    "activation_channel": "push",
+    "tooling_or_integrations": ["segment_group_preparing_tool"],
+    "collaboration_required": ["CRM"],
+    "frequency_goal": ">=10 QR transactions/user/month",
+    "spend_goal": ">=10,000 THB per user in 30 days",
+    "reward_mechanics": "5% cashback capped at 200 THB",
+    "offer_copy": "Scan 10 times, earn 5% cashback",
+    "cta_hint": "Start Scanning",
+    "risks": ["Cashback cannibalisation"],
+    "next_best_action": "Send push on Dec 1 with merchant list",
+}
+
+# Overlaps SEGMENT: active high spenders with a low QR share match both.
+SECOND_SEGMENT = dict(
+    SEGMENT,
+    name="Active QR Dabblers",
+    campaign_alignment="Secondary audience: weekly email nudges for recent users.",
+    definition="Transacted in the last 7 days with QR share below 35%",
+    estimated_size="366,152 users (36.6%, ~366 per 1,000)",
+    eligibility_attributes=["active in the last 7 days", "QR share below 35%"],
+    activation_channel="email",
+    next_best_action="Send the weekly digest on Dec 1",
+)
+
+SEGMENTS_PLAN = {
+    "segment_overview": [
+        "High spenders drive the QR cashback action; active dabblers get email nudges."
+    ],
+    "segments": [SEGMENT, SECOND_SEGMENT],
+    "tool_calls": [
+        "segment_group_preparing_tool: 2 segments, 195,386 users overlap; "
+        "Active QR Dabblers keeps 170,766 after dedup"
+    ],
+}
+
+# What `segment_group_preparing_tool` receives: segments in priority order.
+PREPARED_SEGMENTS = [
+    {"audience_name": segment["name"], "rules": segment["eligibility_attributes"]}
+    for segment in SEGMENTS_PLAN["segments"]
+]
+
+# What the eligibility specialist creates from planner_result.audience_size: one
+# audience per segment, the lower priority one excluding the users of the higher.
+EXCLUSIVE_AUDIENCES = [
+    PREPARED_SEGMENTS[0],
+    {
+        "audience_name": SECOND_SEGMENT["name"],
+        "rules": [
+            *SECOND_SEGMENT["eligibility_attributes"],
+            "NOT ("
+            + " AND ".join(f"({rule})" for rule in SEGMENT["eligibility_attributes"])
+            + ")",
+        ],
+    },
+]
+
+PLANNER_RESULT = {
+    "campaign_type": GOAL_PLAN["campaign_type"],
+    "campaign_name": GOAL_PLAN["campaign_name"],
+    "campaign_theme": GOAL_PLAN["campaign_theme"],
+    "hero_promise": GOAL_PLAN["hero_promise"],
+    "primary_goal": GOAL_PLAN["primary_goal"],
+    "secondary_goals": GOAL_PLAN["secondary_goals"],
+    "campaign_messaging": [
+        {
+            "audience": SEGMENT["name"],
+            "message": "Scan 10 QR payments this December, unlock 5% cashback",
+            "timeframe": "December",
+        }
+    ],
+    "segments": SEGMENTS_PLAN["segments"],
+    "kpi_targets": GOAL_PLAN["measurement_plan"]["kpi_targets"],
+    "constraints": ["Cashback budget 36,000 THB"],
+    "schedule_plan": {
+        "launch_window": "Dec 1 - Dec 31",
+        "cadences": ["push twice weekly", "email weekly"],
+        "blockers": [],
+    },
+    "delivery_plan": {
+        "eligible": {
+            "objective": "Qualify high spenders with low QR share",
+            "attributes": SEGMENT["eligibility_attributes"],
+            "notes": "Refresh eligibility daily.",
+            "kpi_threshold": ">=10 QR transactions per user in December",
+        },
+        "email": {
+            "objective": "Weekly progress digest",
+            "content_brief": {
+                "subject": "You're close to 5% cashback",
+                "body": "Scan 10 QR payments this December to unlock 5% cashback.",
+                "cta": "See My Progress",
+            },
+            "personalization": ["scans_remaining"],
+            "kpi_threshold": ">=4% click-through",
+        },
+        "push": {
+            "objective": "Twice-weekly scan reminders",
+            "content_brief": {
+                "title": "Scan More, Earn More",
+                "body": "10 QR scans = 5% cashback this December",
+                "cta": "Start Scanning",
+            },
+            "personalization": ["scans_remaining"],
+            "kpi_threshold": ">=10 QR transactions per user in December",
+        },
+    },
+    "risks": [
+        {
+            "risk": "Cashback cannibalisation",
+            "severity": "medium",
+            "mitigation": "Cap at 200 THB",
+            "owner": "Finance",
+        }
+    ],
+    "confidence": 0.72,
+    "references": {
+        "audience_tools_used": ["segment_group_preparing_tool"],
+        "frontline_links": ["frontline_result"],
+        "notes": "Baselines from mock_current_kpis.",
+    },
+}
+
+ELIGIBILITY_OUTPUT = {
+    "audience_name": "qr_december_high_spenders",
+    "eligibility_rules": SEGMENT["eligibility_attributes"],
+    "tool_outputs": {
+        "eligibility": "Eligibility Rules Set: spend >=10,000 THB in 90 days",
+        "find_audience": "matched_users=205759",
+        "create_audience": "Audience Created: qr_december_high_spenders",
+        "campaign_creation": "Campaign Created: QR December Dash - Eligibility",
+    },
+    "notes": "Rules copied from planner_result.delivery_plan.eligible.",
+}
+
+EMAIL_OUTPUT = {
+    "subject": "You're close to 5% cashback",
+    "body": "Scan 10 QR payments this December to unlock 5% cashback in January.",
+    "cta": "See My Progress",
+    "personalization": ["scans_remaining"],
+    "kpi_threshold": ">=4% click-through",
+    "tool_output": "Email Payload: template=qr_dash_digest",
+    "creation_result": "Campaign Created: QR December Dash - Email",
+    "notes": "",
+}
+
+PUSH_OUTPUT = {
+    "title": "Scan More, Earn More",
+    "body": "10 QR scans = 5% cashback this December",
+    "cta": "Start Scanning",
+    "personalization": ["scans_remaining"],
+    "kpi_threshold": ">=10 QR transactions per user in December",
+    "tool_output": "Push Payload: title=Scan More, Earn More",
+    "creation_result": "Campaign Created: QR December Dash - Push",
+    "notes": "",
+}
+
+DELIVERY_RESULT = {
+    "campaign_name": PLANNER_RESULT["campaign_name"],
+    "campaign_type": PLANNER_RESULT["campaign_type"],
+    "campaign_theme": PLANNER_RESULT["campaign_theme"],
+    "hero_promise": PLANNER_RESULT["hero_promise"],
+    "campaign_messaging": PLANNER_RESULT["campaign_messaging"],
+    "audience_reference": ELIGIBILITY_OUTPUT["audience_name"],
+    "eligible": ELIGIBILITY_OUTPUT,
+    "email": EMAIL_OUTPUT,
+    "push": PUSH_OUTPUT,
+    "kpi_targets": PLANNER_RESULT["kpi_targets"],
+    "launch_plan": PLANNER_RESULT["schedule_plan"],
+    "summary": "QR December Dash is ready to launch on Dec 1.",
+    "creation_events": {
+        "eligible": ELIGIBILITY_OUTPUT["tool_outputs"]["campaign_creation"],
+        "email": EMAIL_OUTPUT["creation_result"],
+        "push": PUSH_OUTPUT["creation_result"],
+    },
+}
+
+
+# ---------------------------------------------------------------------------
+# Per-agent scripts: each step is the model turn returned after the previous
+# step's tool calls have been answered.
+# ---------------------------------------------------------------------------
+
+
+def call(name: str, **args) -> dict:
+    return {"call": name, "args": args}
+
+
+def calls(*steps: dict) -> dict:
+    """Several tool calls in one model turn; ADK runs them concurrently."""
+    return {"calls": list(steps)}
+
+
+def text(value) -> dict:
+    if not isinstance(value, str):
+        value = json.dumps(value)
+    return {"text": value}
+
+
+SCRIPTS = {
+    "root_agent": [
+        call("frontline_manager_agent", request=CAMPAIGN_BRIEF),
+        # Group outputs travel through state; the prompt asks for one-line requests.
+        call("planner_manager_agent", request="Plan the campaign."),
+        call("delivery_agent", request="Deliver the planned campaign."),
+        text("Frontline, Planner and Delivery stages are complete."),
+    ],
+    "intake_agent": [
+        call("internal_data_agent_tool", query="payments"),
+        text(INTAKE_RESULT),
+    ],
+    "frontline_critic_agent": [
+        call("exit_loop"),
+        text("APPROVED"),
+    ],
+    "frontline_evidence_agent": [text(FRONTLINE_RESULT)],
+    "google_search_agent": [text(SEARCH_RESULT)],
+    "goal_planning_agent": [
+        call("internal_data_agent_tool", query="mock_current_kpis"),
+        call("google_search_agent", request="December QR payment promotions Thailand"),
+        text(GOAL_PLAN),
+    ],
+    "segmentation_discovery_agent": [
+        calls(
+            call("find_audience_tool", rules=SEGMENT["eligibility_attributes"]),
+            call("segment_group_preparing_tool", segments=PREPARED_SEGMENTS),
+        ),
+        text(SEGMENTS_PLAN),
+    ],
+    "planner_critic_agent": [call("approve_plan"), text("APPROVED")],
+    "reporter_agent": [text(PLANNER_RESULT)],
+    "eligibility_specialist_agent": [
+        calls(
+            call(
+                "create_audiences_tool",
+                audiences=EXCLUSIVE_AUDIENCES,
+            ),
+            call(
+                "create_campaigns_tool",
+                campaigns=[
+                    {
+                        "campaign_name": "QR December Dash - Eligibility",
+                        "channel": "eligible",
+                        "details": SEGMENT["definition"],
+                    }
+                ],
+            ),
+        ),
+        text(ELIGIBILITY_OUTPUT),
+    ],
+    "email_specialist_agent": [
+        calls(
+            call(
+                "email_tool", template_id="qr_dash_digest", content=EMAIL_OUTPUT["body"]
+            ),
+            call(
+                "create_campaigns_tool",
+                campaigns=[
+                    {
+                        "campaign_name": "QR December Dash - Email",
+                        "channel": "email",
+                        "details": EMAIL_OUTPUT["subject"],
+                    }
+                ],
+            ),
+        ),
+        text(EMAIL_OUTPUT),
+    ],
+    "push_specialist_agent": [
+        calls(
+            call(
+                "push_notification_tool",
+                title=PUSH_OUTPUT["title"],
+                body=PUSH_OUTPUT["body"],
+            ),
+            call(
+                "create_campaigns_tool",
+                campaigns=[
+                    {
+                        "campaign_name": "QR December Dash - Push",
+                        "channel": "push",
+                        "details": PUSH_OUTPUT["title"],
+                    }
+                ],
+            ),
+        ),
+        text(PUSH_OUTPUT),
+    ],
+    "delivery_aggregator_agent": [text(DELIVERY_RESULT)],
+    "delivery_summary_agent": [text({"summary": DELIVERY_RESULT["summary"]})],
+    "market_research_agent": [text(SEARCH_RESULT)],
+}
+
+# With CAMPAIGN_OPS_PLANNER_PARALLEL the planners start from prefetched context
+# and skip their own internal data / search lookups.
+PREFETCHED_SCRIPTS = {
+    "goal_planning_agent": [text(GOAL_PLAN)],
+    "segmentation_discovery_agent": [
+        calls(
+            call("find_audience_tool", rules=SEGMENT["eligibility_attributes"]),
+            call("segment_group_preparing_tool", segments=PREPARED_SEGMENTS),
+        ),
+        text(SEGMENTS_PLAN),
+    ],
+}
+
+# Step returned by a critic while it is still rejecting (see `reject_first`).
+REJECTIONS = {
+    "frontline_critic_agent": text(FRONTLINE_CRITIQUE),
+    "planner_critic_agent": call(
+        "request_revision",
+        goal_plan_issues=[],
+        segments_plan_issues=[
+            "`estimated_size` is not backed by find_audience_tool; size the "
+            "segment from its eligibility_attributes."
+        ],
+    ),
+}
+
+# Drafts with a mechanical gap, returned as the first reply when `flawed_first` is
+# set: the rule-based pre-critic rejects them without a critic model call.
+FLAWED_DRAFTS = {
+    "intake_agent": text(
+        dict(
+            INTAKE_RESULT,
+            best_case="QR usage among high spenders grows strongly.",
+            average_case="QR usage grows moderately.",
+        )
+    ),
+    "segmentation_discovery_agent": text(
+        dict(SEGMENTS_PLAN, segments=[dict(SEGMENT, estimated_size="TBD")])
+    ),
+}
@@ -0,0 +1,326 @@
+import asyncio
+import contextlib
+import math
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import google.genai.types as types
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.runners import Runner
+from google.adk.tools import AgentTool
+
+from .fake_llm import CURRENT_INVOCATION, ScheduledScriptedLlm, ScriptedLlm
+from .fixtures import (
+    CAMPAIGN_BRIEF,
+    FLAWED_DRAFTS,
+    PREFETCHED_SCRIPTS,
+    REJECTIONS,
+    SCRIPTS,
+)
+
+STAGES = {
+    "frontline_manager_agent": "frontline",
+    "planner_manager_agent": "planner",
+    "delivery_agent": "delivery",
+}
+
+# Numeric session-state counters averaged per run in the report.
+STATE_COUNTERS = ("planner_iterations", "planner_iterations_saved")
+
+
+def load_root_agent():
+    """Imports the real agent graph with offline-safe defaults."""
+    os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "offline-benchmark")
+    os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "us-central1")
+    from campaign_ops_team.agent import root_agent
+
+    return root_agent
+
+
+def iter_agents(agent: BaseAgent, seen: set | None = None):
+    """Yields every agent reachable through sub_agents and AgentTool wrappers."""
+    seen = set() if seen is None else seen
+    if id(agent) in seen:
+        return
+    seen.add(id(agent))
+    yield agent
+    for sub_agent in agent.sub_agents:
+        yield from iter_agents(sub_agent, seen)
+    for tool in getattr(agent, "tools", []):
+        if isinstance(tool, AgentTool):
+            yield from iter_agents(tool.agent, seen)
+
+
+@contextlib.contextmanager
+def scripted_models(
+    root: BaseAgent,
+    latency_s=0.0,
+    jitter_s=0.0,
+    output_tokens_per_s=0.0,
+    reject_first=0,
+    flawed_first=0,
+    seed=0,
+    rate_limit_errors=0.0,
+    malformed_outputs=0.0,
+):
+    """Temporarily replaces every LlmAgent's model with a `ScriptedLlm`.
+
+    Models that go through the shared scheduler keep doing so (at the same priority).
+    """
+    from campaign_ops_team.config import PLANNER_PARALLEL
+    from campaign_ops_team.rate_limit import ScheduledGemini
+
+    scripts = {**SCRIPTS, **PREFETCHED_SCRIPTS} if PLANNER_PARALLEL else SCRIPTS
+    originals = []
+    for agent in iter_agents(root):
+        if not isinstance(agent, LlmAgent):
+            continue
+        originals.append((agent, agent.model))
+        scheduled = {}
+        if isinstance(agent.model, ScheduledGemini):
+            scheduled = {"priority": agent.model.priority}
+        agent.model = (ScheduledScriptedLlm if scheduled else ScriptedLlm)(
+            **scheduled,
+            model=agent.canonical_model.model,
+            agent_name=agent.name,
+            script=scripts.get(agent.name, []),
+            rejection=REJECTIONS.get(agent.name, {}),
+            reject_first=reject_first,
+            flawed=FLAWED_DRAFTS.get(agent.name, {}),
+            flawed_first=flawed_first,
+            latency_s=latency_s,
+            jitter_s=jitter_s,
+            output_tokens_per_s=output_tokens_per_s,
+            seed=seed,
+            rate_limit_errors=rate_limit_errors,
+            malformed_outputs=malformed_outputs,
+        )
+    try:
+        yield
+    finally:
+        for agent, model in originals:
+            agent.model = model
+
+
+@dataclass
+class RunMetrics:
+    latency_s: float = 0.0
+    stages_s: dict = field(default_factory=dict)
+    model_calls: int = 0
+    tool_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    calls_by_agent: dict = field(default_factory=lambda: defaultdict(int))
+    counters: dict = field(default_factory=dict)
+    first_event_s: float | None = None
+    first_output_s: float | None = None
+    progress_events: int = 0
+    error: str = ""
+
+
+class BenchmarkPlugin(BasePlugin):
+    """Collects per-run stage timings, model calls and token usage.
+
+    Runs are keyed by user id because AgentTool executes each stage in a child
+    session that only inherits the user id from the caller.
+    """
+
+    def __init__(self):
+        super().__init__(name="benchmark_metrics")
+        self.runs: dict[str, RunMetrics] = defaultdict(RunMetrics)
+        self._stage_started: dict[tuple[str, str], float] = {}
+
+    def observe(self, user_id: str, event, elapsed_s: float) -> None:
+        """Records when the caller saw its first event and its first stage output."""
+        from campaign_ops_team.progress import OUTPUT_KEYS, progress_payload
+
+        run = self.runs[user_id]
+        if run.first_event_s is None:
+            run.first_event_s = elapsed_s
+        payload = progress_payload(event)
+        if payload:
+            run.progress_events += 1
+        if run.first_output_s is None and (
+            (payload or {}).get("type") == "partial_output"
+            or any(event.actions.state_delta.get(key) for key in OUTPUT_KEYS)
+        ):
+            run.first_output_s = elapsed_s
+
+    async def before_agent_callback(self, *, agent, callback_context):
+        if agent.name in STAGES:
+            key = (callback_context._invocation_context.user_id, agent.name)
+            self._stage_started[key] = time.perf_counter()
+
+    async def after_agent_callback(self, *, agent, callback_context):
+        if agent.name in STAGES:
+            user_id = callback_context._invocation_context.user_id
+            started = self._stage_started.pop((user_id, agent.name), None)
+            if started is not None:
+                self.runs[user_id].stages_s[STAGES[agent.name]] = (
+                    time.perf_counter() - started
+                )
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        CURRENT_INVOCATION.set(callback_context.invocation_id)
+        return None
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        if llm_response.partial:
+            return None
+        run = self.runs[callback_context._invocation_context.user_id]
+        run.model_calls += 1
+        run.calls_by_agent[callback_context.agent_name] += 1
+        usage = llm_response.usage_metadata
+        if usage:
+            run.prompt_tokens += usage.prompt_token_count or 0
+            run.completion_tokens += usage.candidates_token_count or 0
+        return None
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        self.runs[tool_context._invocation_context.user_id].tool_calls += 1
+        return None
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+async def run_pipeline(
+    root: BaseAgent,
+    runs: int = 10,
+    concurrency: int = 5,
+    brief: str = CAMPAIGN_BRIEF,
+    plugins: list[BasePlugin] | None = None,
+) -> dict:
+    """Drives `runs` campaign briefs through `root` and returns a latency report."""
+    from campaign_ops_team.progress import ProgressPlugin
+    from campaign_ops_team.routing import RoutingPlugin
+    from campaign_ops_team.sessions import build_session_service
+    from campaign_ops_team.telemetry import TelemetryPlugin
+    from campaign_ops_team.token_budget import TokenBudgetPlugin
+
+    metrics = BenchmarkPlugin()
+    runner = Runner(
+        agent=root,
+        app_name="campaign_ops_team",
+        session_service=build_session_service(),
+        plugins=[
+            metrics,
+            ProgressPlugin(),
+            RoutingPlugin(),
+            TokenBudgetPlugin(),
+            TelemetryPlugin(),
+            *(plugins or []),
+        ],
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_run(index: int) -> None:
+        user_id = f"bench-user-{index}"
+        async with semaphore:
+            session = await runner.session_service.create_session(
+                app_name=runner.app_name, user_id=user_id
+            )
+            message = types.Content(
+                role="user", parts=[types.Part.from_text(text=brief)]
+            )
+            started = time.perf_counter()
+            try:
+                async for event in runner.run_async(
+                    user_id=user_id, session_id=session.id, new_message=message
+                ):
+                    metrics.observe(user_id, event, time.perf_counter() - started)
+            except Exception as exc:  # keep measuring the remaining runs
+                metrics.runs[user_id].error = repr(exc)
+            run = metrics.runs[user_id]
+            run.latency_s = time.perf_counter() - started
+            session = await runner.session_service.get_session(
+                app_name=runner.app_name, user_id=user_id, session_id=session.id
+            )
+            run.counters = {
+                key: session.state[key]
+                for key in STATE_COUNTERS
+                if key in session.state
+            }
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_run(i) for i in range(runs)))
+    wall_s = time.perf_counter() - started
+    await runner.close()
+    return summarize(list(metrics.runs.values()), wall_s)
+
+
+def summarize(results: list[RunMetrics], wall_s: float) -> dict:
+    latencies = [r.latency_s for r in results]
+    count = max(1, len(results))
+    report = {
+        "runs": len(results),
+        "errors": sum(1 for r in results if r.error),
+        "wall_s": wall_s,
+        "throughput_runs_per_s": len(results) / wall_s if wall_s else 0.0,
+        "latency_s": {
+            p: percentile(latencies, n)
+            for p, n in (("p50", 50), ("p95", 95), ("p99", 99))
+        },
+        "stages_p50_s": {
+            stage: percentile(
+                [r.stages_s[stage] for r in results if stage in r.stages_s], 50
+            )
+            for stage in STAGES.values()
+        },
+        "time_to_first_p50_s": {
+            name: percentile(
+                [getattr(r, attr) for r in results if getattr(r, attr) is not None],
+                50,
+            )
+            for name, attr in (("event", "first_event_s"), ("output", "first_output_s"))
+        },
+        "progress_events_per_run": sum(r.progress_events for r in results) / count,
+        "model_calls_per_run": sum(r.model_calls for r in results) / count,
+        "tool_calls_per_run": sum(r.tool_calls for r in results) / count,
+        "prompt_tokens_per_run": sum(r.prompt_tokens for r in results) / count,
+        "completion_tokens_per_run": sum(r.completion_tokens for r in results) / count,
+        "calls_by_agent": {},
+        "counters_per_run": {
+            key: sum(r.counters.get(key, 0) for r in results) / count
+            for key in STATE_COUNTERS
+        },
+    }
+    for result in results:
+        for agent_name, calls in result.calls_by_agent.items():
+            report["calls_by_agent"][agent_name] = (
+                report["calls_by_agent"].get(agent_name, 0) + calls / count
+            )
+    return report
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"runs={report['runs']} errors={report['errors']} wall={report['wall_s']:.2f}s "
+        f"throughput={report['throughput_runs_per_s']:.2f} runs/s",
+        "latency  "
+        + "  ".join(f"{k}={v:.3f}s" for k, v in report["latency_s"].items()),
+        "stages   "
+        + "  ".join(f"{k}={v:.3f}s" for k, v in report["stages_p50_s"].items()),
+        "first    "
+        + "  ".join(f"{k}={v:.3f}s" for k, v in report["time_to_first_p50_s"].items())
+        + f"  progress_events={report['progress_events_per_run']:.1f}",
+        f"per run  model_calls={report['model_calls_per_run']:.1f} "
+        f"tool_calls={report['tool_calls_per_run']:.1f} "
+        f"prompt_tokens={report['prompt_tokens_per_run']:.0f} "
+        f"completion_tokens={report['completion_tokens_per_run']:.0f}",
+        "counters "
+        + "  ".join(f"{k}={v:.2f}" for k, v in report["counters_per_run"].items()),
+        "calls by agent:",
+    ]
+    for agent_name, calls in sorted(report["calls_by_agent"].items()):
+        lines.append(f"  {agent_name:<32} {calls:.1f}")
+    return "\n".join(lines)
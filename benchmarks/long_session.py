@@ -0,0 +1,181 @@
+"""Per-turn latency, prompt size and memory over many campaigns in one session.
+
+uv run python -m benchmarks.long_session --turns 100 --latency 0.01
+
+Sends `--turns` campaign briefs, one after another, into a single session, the way
+manual_operations/test.py does, against scripted local models. `memory` keeps every
+event in ADK's in-memory session service (CAMPAIGN_OPS_SESSIONS=memory); `sqlite`
+uses the compacting SQLite service (CAMPAIGN_OPS_SESSIONS=sqlite, in a temporary
+file). Each mode runs in its own process, so RSS is comparable. Prompts are
+budgeted as in the app (CAMPAIGN_OPS_TOKEN_BUDGET); set it to 0 to see them unbounded.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("memory", "sqlite")
+
+BRIEFS = (
+    "Grow QR payments for high spenders by 15% in December.",
+    "Increase bill payment usage by 10% in Q1 among new users.",
+    "Re-activate users inactive for 30 days with cashback vouchers.",
+    "Boost mobile top-up adoption among students this summer.",
+    "Lift linked bank transfers by 5% for salaried users in March.",
+)
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _turns(root, turns: int) -> list[dict]:
+    import google.genai.types as types
+    from google.adk.runners import Runner
+
+    from campaign_ops_team.progress import ProgressPlugin
+    from campaign_ops_team.sessions import build_session_service
+    from campaign_ops_team.token_budget import TokenBudgetPlugin
+
+    from .harness import BenchmarkPlugin
+
+    metrics = BenchmarkPlugin()
+    service = build_session_service()
+    runner = Runner(
+        agent=root,
+        app_name="campaign_ops_team",
+        session_service=service,
+        plugins=[metrics, ProgressPlugin(), TokenBudgetPlugin()],
+    )
+    user_id = "long-session-user"
+    session = await service.create_session(app_name=runner.app_name, user_id=user_id)
+    results = []
+    for turn in range(turns):
+        run = metrics.runs[user_id]
+        prompt_tokens, model_calls = run.prompt_tokens, run.model_calls
+        message = types.Content(
+            role="user",
+            parts=[types.Part.from_text(text=BRIEFS[turn % len(BRIEFS)])],
+        )
+        started = time.perf_counter()
+        async for _ in runner.run_async(
+            user_id=user_id, session_id=session.id, new_message=message
+        ):
+            pass
+        latency_s = time.perf_counter() - started
+        stored = await service.get_session(
+            app_name=runner.app_name, user_id=user_id, session_id=session.id
+        )
+        results.append(
+            {
+                "latency_s": latency_s,
+                "prompt_tokens": run.prompt_tokens - prompt_tokens,
+                "model_calls": run.model_calls - model_calls,
+                "events": len(stored.events),
+                "event_kb": sum(
+                    len(e.model_dump_json(exclude_none=True)) for e in stored.events
+                )
+                / 1024,
+                "rss_mb": _rss_mb(),
+            }
+        )
+    await runner.close()
+    stats = getattr(service, "stats", None)
+    return results, stats.as_dict() if stats else {}
+
+
+def run_child(turns: int, latency_s: float) -> dict:
+    from .harness import load_root_agent, scripted_models
+
+    root = load_root_agent()
+    logging.getLogger().setLevel(logging.WARNING)
+    with scripted_models(root, latency_s=latency_s):
+        results, compaction = asyncio.run(_turns(root, turns))
+    return {"turns": results, "compaction": compaction}
+
+
+def run_mode(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.long_session", "--child"]
+            + ["--turns", str(args.turns), "--latency", str(args.latency)],
+            env={
+                **os.environ,
+                "CAMPAIGN_OPS_SESSIONS": mode,
+                "CAMPAIGN_OPS_SESSION_DB": os.path.join(tmp, "sessions.sqlite3"),
+                "CAMPAIGN_OPS_LOG_LEVEL": "WARNING",
+            },
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _window(turns: list[dict], key: str, start: int, size: int) -> float:
+    return statistics.mean(t[key] for t in turns[start : start + size])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument(
+        "--latency", type=float, default=0.01, help="seconds per model call"
+    )
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--json", dest="json_path", help="also write the report here")
+    args = parser.parse_args()
+
+    if args.child:
+        logging.disable(logging.WARNING)
+        print(json.dumps(run_child(args.turns, args.latency)))
+        return
+
+    window = max(1, min(10, args.turns // 2))
+    reports = {mode: run_mode(mode, args) for mode in args.modes}
+    for mode, report in reports.items():
+        turns = report["turns"]
+        first, last = 0, len(turns) - window
+        print(
+            f"{mode:<7} turns={len(turns)}  "
+            + "  ".join(
+                f"{label}={_window(turns, key, first, window):{fmt}}"
+                f"->{_window(turns, key, last, window):{fmt}}"
+                for label, key, fmt in (
+                    ("latency_s", "latency_s", ".3f"),
+                    ("prompt_tokens", "prompt_tokens", ".0f"),
+                    ("events", "events", ".0f"),
+                    ("event_kb", "event_kb", ".0f"),
+                    ("rss_mb", "rss_mb", ".0f"),
+                )
+            )
+            + f"  (mean of the first -> last {window} turns)"
+        )
+        if report["compaction"]:
+            print(
+                f"{'':<7} "
+                + "  ".join(f"{k}={v}" for k, v in report["compaction"].items())
+            )
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Model connection reuse: shared client pool vs. one client per agent.
+
+uv run python -m benchmarks.model_pool --sessions 50 --concurrency 10 --latency 0.02
+
+Sends every LlmAgent's model calls (one per agent per session, in graph order) to a
+local fake Gemini API endpoint and counts the TCP connections it accepts. `pooled`
+uses the registry's models as built (CAMPAIGN_OPS_MODEL_CLIENT_POOL=1); `per_agent`
+gives every agent its own model and client, as before the registry
+(CAMPAIGN_OPS_MODEL_CLIENT_POOL=0). Each mode runs in its own process, since the
+flag is read at import.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODES = {"per_agent": "0", "pooled": "1"}
+
+_RESPONSE = json.dumps(
+    {
+        "candidates": [
+            {
+                "content": {"role": "model", "parts": [{"text": "ok"}]},
+                "finishReason": "STOP",
+            }
+        ],
+        "usageMetadata": {
+            "promptTokenCount": 8,
+            "candidatesTokenCount": 1,
+            "totalTokenCount": 9,
+        },
+    }
+).encode()
+
+
+class FakeModelServer(ThreadingHTTPServer):
+    """Answers every `:generateContent` call with a one-word reply."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, latency_s: float = 0.0):
+        super().__init__(address, _Handler)
+        self.latency_s = latency_s
+        self.requests = 0
+        self.connections = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: FakeModelServer
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        self.server.requests += 1
+        self.rfile.read(int(self.headers["Content-Length"]))
+        if self.server.latency_s:
+            time.sleep(self.server.latency_s)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(_RESPONSE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _llm_agents():
+    from google.adk.agents import LlmAgent
+
+    from campaign_ops_team.agent import get_root_agent
+    from campaign_ops_team.config import MODEL_CLIENT_POOL
+
+    from .harness import iter_agents
+
+    agents = [a for a in iter_agents(get_root_agent()) if isinstance(a, LlmAgent)]
+    if not MODEL_CLIENT_POOL:
+        for agent in agents:
+            agent.model = agent.model.model_copy()
+    return agents
+
+
+async def _sessions(agents, sessions: int, concurrency: int) -> list[float]:
+    import google.genai.types as types
+    from google.adk.models.llm_request import LlmRequest
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def session(index: int):
+        async with semaphore:
+            for agent in agents:
+                request = LlmRequest(
+                    model=agent.model.model,
+                    contents=[
+                        types.Content(
+                            role="user", parts=[types.Part(text=f"session {index}")]
+                        )
+                    ],
+                    config=types.GenerateContentConfig(),
+                )
+                started = time.perf_counter()
+                async for _ in agent.model.generate_content_async(request):
+                    pass
+                latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    return latencies
+
+
+def run_child(sessions: int, concurrency: int, latency_s: float) -> dict:
+    server = FakeModelServer(("127.0.0.1", 0), latency_s)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update(
+        GOOGLE_GENAI_USE_VERTEXAI="0",
+        GOOGLE_API_KEY="offline-benchmark",
+        GOOGLE_GEMINI_BASE_URL=server.url,
+    )
+    agents = _llm_agents()
+    started = time.perf_counter()
+    latencies = asyncio.run(_sessions(agents, sessions, concurrency))
+    wall = time.perf_counter() - started
+    server.shutdown()
+    ordered = sorted(latencies)
+    return {
+        "agents": len(agents),
+        "model_instances": len({id(a.model) for a in agents}),
+        "requests": server.requests,
+        "connections": server.connections,
+        "requests_per_connection": server.requests / max(1, server.connections),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+        "calls_per_s": len(latencies) / wall,
+    }
+
+
+def run_mode(mode: str, args) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.model_pool", "--child"]
+        + ["--sessions", str(args.sessions), "--concurrency", str(args.concurrency)]
+        + ["--latency", str(args.latency)],
+        env={
+            **os.environ,
+            "CAMPAIGN_OPS_MODEL_CLIENT_POOL": MODES[mode],
+            "CAMPAIGN_OPS_LOG_LEVEL": "WARNING",
+        },
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="seconds per fake model call"
+    )
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--json", dest="json_path", help="also write the report here")
+    args = parser.parse_args()
+
+    if args.child:
+        logging.disable(logging.WARNING)
+        print(json.dumps(run_child(args.sessions, args.concurrency, args.latency)))
+        return
+
+    reports = {mode: run_mode(mode, args) for mode in MODES}
+    for mode, r in reports.items():
+        print(
+            f"{mode:<10} models={r['model_instances']:<3} requests={r['requests']:<5} "
+            f"connections={r['connections']:<4} "
+            f"requests/connection={r['requests_per_connection']:.1f}  "
+            f"p50={r['p50_ms']:.1f}ms  p95={r['p95_ms']:.1f}ms  "
+            f"{r['calls_per_s']:.0f} calls/s"
+        )
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
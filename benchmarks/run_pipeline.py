@@ -0,0 +1,196 @@
+"""End-to-end latency benchmark of `root_agent` against scripted local models.
+
+uv run python -m benchmarks.run_pipeline --runs 50 --concurrency 10 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+from .harness import format_report, load_root_agent, run_pipeline, scripted_models
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="seconds per model call"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="extra random seconds per call"
+    )
+    parser.add_argument(
+        "--output-tps",
+        type=float,
+        default=0.0,
+        help="model output tokens per second (0: replies take no decode time)",
+    )
+    parser.add_argument(
+        "--reject-first", type=int, default=0, help="critic rejections before approving"
+    )
+    parser.add_argument(
+        "--flawed-drafts",
+        type=int,
+        default=0,
+        help="drafts with a mechanical gap (caught by the pre-critic) before a clean one",
+    )
+    parser.add_argument(
+        "--rate-limit-errors",
+        type=float,
+        default=0.0,
+        help="fraction of model calls that fail with 429",
+    )
+    parser.add_argument(
+        "--malformed-outputs",
+        type=float,
+        default=0.0,
+        help="fraction of JSON replies that come back malformed",
+    )
+    parser.add_argument(
+        "--delivery-latency",
+        type=float,
+        default=0.0,
+        help="seconds per delivery backend request",
+    )
+    parser.add_argument(
+        "--delivery-server",
+        action="store_true",
+        help="send delivery tool calls over HTTP to a local delivery_server",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--json", dest="json_path", help="also write the report to this file"
+    )
+    args = parser.parse_args()
+
+    root_agent = load_root_agent()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    from campaign_ops_team.delivery_backends import (
+        HttpDeliveryBackend,
+        InMemoryDeliveryBackend,
+        set_delivery_backend,
+    )
+    from campaign_ops_team.audience_engine import get_audience_engine
+    from campaign_ops_team.delivery_server import DeliveryServer
+
+    # Builds (first time only) and maps the user table outside the timed runs.
+    get_audience_engine()
+    server = None
+    if args.delivery_server:
+        server = DeliveryServer(("127.0.0.1", 0), latency_s=args.delivery_latency)
+        server.start()
+        set_delivery_backend(HttpDeliveryBackend(server.url))
+    else:
+        set_delivery_backend(InMemoryDeliveryBackend(args.delivery_latency))
+
+    with scripted_models(
+        root_agent,
+        latency_s=args.latency,
+        jitter_s=args.jitter,
+        output_tokens_per_s=args.output_tps,
+        reject_first=args.reject_first,
+        flawed_first=args.flawed_drafts,
+        seed=args.seed,
+        rate_limit_errors=args.rate_limit_errors,
+        malformed_outputs=args.malformed_outputs,
+    ):
+        report = asyncio.run(
+            run_pipeline(root_agent, runs=args.runs, concurrency=args.concurrency)
+        )
+
+    from campaign_ops_team.telemetry import shutdown_telemetry
+
+    shutdown_telemetry()
+    if server:
+        server.shutdown()
+        report["delivery_server"] = {
+            "requests": server.requests,
+            "connections": server.connections,
+        }
+        print(
+            f"delivery server requests={server.requests} connections={server.connections}"
+        )
+    from campaign_ops_team.critic_checks import CRITIC_STATS
+    from campaign_ops_team.rate_limit import SCHEDULER
+    from campaign_ops_team.routing import ROUTER
+    from campaign_ops_team.structured_output import output_stats
+    from campaign_ops_team.sub_agents.frontline_agents import FRONTLINE_CACHE
+    from campaign_ops_team.sub_agents.google_search_agent import search_agent_tool
+    from campaign_ops_team.token_budget import TOKEN_STATS
+
+    report["search_cache"] = search_agent_tool.stats.as_dict()
+    print(format_report(report))
+    print(
+        "search cache "
+        + "  ".join(f"{k}={v}" for k, v in report["search_cache"].items())
+    )
+    if FRONTLINE_CACHE is not None:
+        report["frontline_cache"] = FRONTLINE_CACHE.stats.as_dict()
+        print(
+            "frontline cache "
+            + "  ".join(
+                f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                for k, v in report["frontline_cache"].items()
+            )
+        )
+    report["model_scheduler"] = SCHEDULER.stats()
+    for model, stats in report["model_scheduler"].items():
+        print(f"scheduler {model} " + "  ".join(f"{k}={v}" for k, v in stats.items()))
+    report["structured_output"] = output_stats()
+    print(
+        "structured output "
+        + "  ".join(
+            f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}"
+            for k, v in report["structured_output"]["total"].items()
+        )
+    )
+    report["routing"] = ROUTER.stats()
+    for model, stats in report["routing"]["models"].items():
+        cost = stats["cost_usd"]
+        print(
+            f"model {model} tier={stats['tier']} calls={stats['calls']} "
+            f"escalated_calls={stats['escalated_calls']} "
+            f"mean_latency={stats['mean_latency_s']:.3f}s "
+            f"tokens={stats['prompt_tokens']}+{stats['completion_tokens']} "
+            f"cost={'n/a' if cost is None else f'${cost:.4f}'}"
+        )
+    print(
+        "escalations "
+        + (
+            "  ".join(f"{k}={v}" for k, v in report["routing"]["escalations"].items())
+            or "none"
+        )
+    )
+    report["prompt_tokens"] = TOKEN_STATS.as_dict()
+    runs = max(1, TOKEN_STATS.runs)
+    for kind in ("stages", "agents"):
+        for name, stats in sorted(
+            report["prompt_tokens"][kind].items(),
+            key=lambda item: item[1]["prompt_tokens"],
+            reverse=True,
+        ):
+            print(
+                f"prompt {kind[:-1]} {name:<32} tokens/run={stats['prompt_tokens'] / runs:.0f} "
+                f"mean={stats['mean_prompt_tokens']:.0f} max={stats['max_prompt_tokens']} "
+                f"trimmed={stats['trimmed_tokens'] / runs:.0f}/run "
+                f"over_budget={stats['over_budget']}"
+            )
+    report["critics"] = {name: s.as_dict() for name, s in CRITIC_STATS.items()}
+    for name, stats in report["critics"].items():
+        print(
+            f"{name} critic "
+            + "  ".join(
+                f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                for k, v in stats.items()
+            )
+        )
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Frontline similarity cache: hit rate, false hits and lookup latency per threshold.
+
+uv run python -m benchmarks.similarity_cache --thresholds 0.7 0.75 0.8 0.85 0.9 --filler 1000
+
+Each group below is one campaign brief (remembered first) with paraphrases that
+should reuse its frontline_result and near-misses that must not: the same wording for
+another product, month, quarter or target, the opposite direction (grow vs. reduce),
+another audience (high vs. low spenders, new vs. existing users) or a channel
+restriction ("via email only"). `--filler` unrelated generated briefs are
+added to the index so lookups run against a realistically sized cache.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from campaign_ops_team.search_cache import InMemoryCacheStore
+from campaign_ops_team.similarity_cache import SimilarityCache
+from campaign_ops_team.sub_agents.frontline_agents import brief_anchors
+
+GROUPS = (
+    {
+        "brief": "Grow QR payments for high spenders by 15% in December.",
+        "paraphrases": (
+            "Boost QR payments among top spenders by 15% this December",
+            "Increase QR payment usage of high spenders by 15% in December",
+            "grow qr payments for high-spenders by 15% in december!",
+            "Drive 15% more QR payments from our high spenders in December",
+        ),
+        "near_misses": (
+            "Grow QR payments for high spenders by 15% in January.",
+            "Grow QR payments for high spenders by 25% in December.",
+            "Grow bill payments for high spenders by 15% in December.",
+            "Grow P2P transfers for high spenders by 15% in December.",
+            "Reduce QR payments for high spenders by 15% in December.",
+            "Grow QR payments for low spenders by 15% in December.",
+        ),
+    },
+    {
+        # The example in similarity_cache's docstring.
+        "brief": "Grow QR payments for high spenders in December",
+        "paraphrases": (
+            "Boost QR spend among top users this December",
+            "Increase QR payments from heavy spenders in December",
+        ),
+        "near_misses": (
+            "Grow QR payments for high spenders in November",
+            "Grow bill payments for high spenders in December",
+            "Reduce QR payments for high spenders in December",
+            "Grow QR payments for low spenders in December",
+            "Grow QR payments for high spenders in December via email only",
+        ),
+    },
+    {
+        "brief": "Increase bill payment usage by 10% in Q1 among new users",
+        "paraphrases": (
+            "Boost bill payments usage by 10% in Q1 among new customers",
+            "Raise utility and bill payment usage 10% in Q1 for new users",
+            "Increase bill payment use by 10% in Q1 among new users.",
+        ),
+        "near_misses": (
+            "Increase bill payment usage by 10% in Q2 among new users",
+            "Increase mobile top-up usage by 10% in Q1 among new users",
+            "Increase bill payment usage by 20% in Q1 among new users",
+            "Increase bill payment usage by 10% in Q1 among existing users",
+            "Decrease bill payment failures by 10% in Q1 among new users",
+        ),
+    },
+    {
+        "brief": "Re-activate users inactive for 30 days with cashback vouchers",
+        "paraphrases": (
+            "Reactivate users inactive for 30 days using cashback vouchers",
+            "Re-activate customers who were inactive for 30 days with cashback vouchers",
+            "Win back users inactive for 30 days with cashback vouchers",
+        ),
+        "near_misses": (
+            "Re-activate users inactive for 90 days with cashback vouchers",
+            "Re-activate users inactive for 30 days with a P2P transfer bonus",
+        ),
+    },
+    {
+        "brief": "Boost mobile top up adoption among students this summer",
+        "paraphrases": (
+            "Grow mobile top-ups among students this summer",
+            "Increase mobile topup adoption among students over the summer",
+        ),
+        "near_misses": (
+            "Boost bank withdrawal adoption among students this summer",
+            "Boost mobile top up adoption among students this winter",
+            "Boost mobile top up adoption among students this summer via push notifications only",
+        ),
+    },
+    {
+        "brief": "Lift linked bank transfers by 5% for salaried users in March",
+        "paraphrases": (
+            "Increase linked bank transfers by 5% for salaried users in March",
+            "Grow bank transfer volume of salaried users by 5% in March",
+        ),
+        "near_misses": (
+            "Lift linked bank transfers by 5% for salaried users in May",
+            "Lift transaction history views by 5% for salaried users in March",
+        ),
+    },
+)
+
+_FILLER_WORDS = (
+    "loyalty referral onboarding merchants students families travellers seniors "
+    "weekend evening campaign retention engagement wallet savings insurance loans "
+    "rewards partners stores online delivery groceries fuel transport coffee"
+).split()
+
+
+def _filler(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.sample(_FILLER_WORDS, 6)) for _ in range(count)]
+
+
+def run(threshold: float, filler: list[str]) -> dict:
+    cache = SimilarityCache(
+        InMemoryCacheStore(max_entries=len(filler) + len(GROUPS) + 1),
+        threshold=threshold,
+        anchors=brief_anchors,
+    )
+    for index, brief in enumerate(filler):
+        cache.remember(brief, "v1", f"filler-{index}")
+    for index, group in enumerate(GROUPS):
+        cache.remember(group["brief"], "v1", f"group-{index}")
+
+    hits = false_hits = paraphrases = near_misses = 0
+    latencies = []
+    for index, group in enumerate(GROUPS):
+        for query, should_hit in [(q, True) for q in group["paraphrases"]] + [
+            (q, False) for q in group["near_misses"]
+        ]:
+            started = time.perf_counter()
+            found = cache.lookup(query, "v1")
+            latencies.append((time.perf_counter() - started) * 1000)
+            paraphrases += should_hit
+            near_misses += not should_hit
+            if found is None:
+                continue
+            if should_hit and found[0] == f"group-{index}":
+                hits += 1
+            else:
+                false_hits += 1
+    served = hits + false_hits
+    # A changed data version invalidates everything.
+    stale_misses = sum(cache.lookup(g["brief"], "v2") is None for g in GROUPS)
+    ordered = sorted(latencies)
+    return {
+        "threshold": threshold,
+        "paraphrase_hit_rate": hits / paraphrases,
+        "false_hits": false_hits,
+        "near_misses": near_misses,
+        "precision": hits / served if served else 1.0,
+        "anchor_rejections": cache.stats.anchor_rejections,
+        "invalidated_on_version_change": stale_misses == len(GROUPS),
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": ordered[int(0.95 * (len(ordered) - 1))],
+        "index_size": len(filler) + len(GROUPS),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--thresholds", type=float, nargs="+", default=[0.7, 0.75, 0.8, 0.85, 0.9]
+    )
+    parser.add_argument("--filler", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", dest="json_path", help="also write the report here")
+    args = parser.parse_args()
+
+    filler = _filler(args.filler, args.seed)
+    reports = [run(threshold, filler) for threshold in args.thresholds]
+    for r in reports:
+        print(
+            f"threshold={r['threshold']:.2f}  "
+            f"paraphrase_hit_rate={r['paraphrase_hit_rate']:.2f}  "
+            f"false_hits={r['false_hits']}/{r['near_misses']}  "
+            f"precision={r['precision']:.2f}  "
+            f"anchor_rejections={r['anchor_rejections']}  "
+            f"p50={r['p50_ms']:.3f}ms  p95={r['p95_ms']:.3f}ms  "
+            f"index={r['index_size']}  "
+            f"version_invalidation={'ok' if r['invalidated_on_version_change'] else 'FAILED'}"
+        )
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Cold-start time of the campaign_ops_team package: import, agent graph and App.
+
+uv run python -m benchmarks.startup --runs 5
+uv run python -m benchmarks.startup --json before.json
+uv run python -m benchmarks.startup --compare before.json
+
+Each run is a fresh interpreter with `-X importtime`, so nothing is cached in
+`sys.modules`. `import` is `import campaign_ops_team.agent`, `build` is
+`get_root_agent()` (sub-agents, tools, telemetry setup) and `app` is `get_app()`.
+The slowest modules are ranked by cumulative import time, the package's own modules
+by self time, both from the median run.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+_PROBE = """
+import json, time
+started = time.perf_counter()
+import campaign_ops_team.agent as agent
+imported = time.perf_counter()
+agent.get_root_agent()
+built = time.perf_counter()
+agent.get_app()
+done = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - started,
+    "build_s": built - imported,
+    "app_s": done - built,
+    "total_s": done - started,
+}))
+"""
+
+
+def _importtime(stderr: str) -> list[tuple[str, int, int]]:
+    # A package re-entered while importing its own submodules is listed twice.
+    rows = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        name = name.strip()
+        previous = rows.get(name, (name, 0, 0))
+        rows[name] = (
+            name,
+            previous[1] + int(self_us),
+            max(previous[2], int(cumulative_us)),
+        )
+    return list(rows.values())
+
+
+def run_once(python: str) -> dict:
+    env = {**os.environ, "CAMPAIGN_OPS_LOG_LEVEL": "WARNING"}
+    env.setdefault("GOOGLE_CLOUD_PROJECT", "benchmark")
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", _PROBE],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["modules"] = _importtime(result.stderr)
+    return timings
+
+
+def bench(runs: int, python: str, top: int) -> dict:
+    samples = [run_once(python) for _ in range(runs)]
+    median = sorted(samples, key=lambda s: s["total_s"])[len(samples) // 2]
+    modules = median["modules"]
+    return {
+        "runs": runs,
+        **{
+            key: statistics.median(s[key] for s in samples)
+            for key in ("import_s", "build_s", "app_s", "total_s")
+        },
+        "slowest_modules": [
+            {"module": name, "cumulative_ms": cumulative / 1000}
+            for name, _, cumulative in sorted(modules, key=lambda m: -m[2])[:top]
+        ],
+        "package_modules": [
+            {"module": name, "self_ms": self_us / 1000}
+            for name, self_us, _ in sorted(modules, key=lambda m: -m[1])
+            if name.split(".")[0] == "campaign_ops_team"
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--python", default=sys.executable)
+    parser.add_argument("--compare", help="a previous --json report to diff against")
+    parser.add_argument("--json", dest="json_path", help="also write the report here")
+    args = parser.parse_args()
+
+    report = bench(args.runs, args.python, args.top)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    for key in ("import_s", "build_s", "app_s", "total_s"):
+        line = f"{key[:-2]:<8}{report[key]:>8.3f}s"
+        if baseline:
+            line += f"  (was {baseline[key]:.3f}s, {report[key] - baseline[key]:+.3f}s)"
+        print(line)
+    print(f"\n{'slowest imports':<56}{'cumulative':>12}")
+    for row in report["slowest_modules"]:
+        print(f"{row['module']:<56}{row['cumulative_ms']:>10.1f}ms")
+    print(f"\n{'campaign_ops_team modules':<56}{'self':>12}")
+    for row in report["package_modules"]:
+        print(f"{row['module']:<56}{row['self_ms']:>10.1f}ms")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Latency and token breakdown from an OTLP/JSON trace file (CAMPAIGN_OPS_TELEMETRY=file).
+
+CAMPAIGN_OPS_TELEMETRY=file uv run python -m benchmarks.run_pipeline --runs 20
+uv run python -m benchmarks.trace_breakdown .cache/telemetry/traces.jsonl
+
+Groups the spans written by `campaign_ops_team.telemetry` by agent, tool and loop
+round. Durations are wall time, so an agent's time includes its sub-agents and tools.
+"""
+
+import argparse
+import json
+from collections import defaultdict
+
+from .harness import percentile
+
+
+def _value(attribute: dict):
+    value = attribute["value"]
+    for kind in ("stringValue", "boolValue", "doubleValue"):
+        if kind in value:
+            return value[kind]
+    if "intValue" in value:
+        return int(value["intValue"])
+    return None
+
+
+def load_spans(path: str) -> list[dict]:
+    spans = []
+    with open(path) as f:
+        for line in f:
+            for resource in json.loads(line).get("resourceSpans", []):
+                for scope in resource.get("scopeSpans", []):
+                    for span in scope.get("spans", []):
+                        spans.append(
+                            {
+                                "name": span["name"],
+                                "duration_s": (
+                                    int(span["endTimeUnixNano"])
+                                    - int(span["startTimeUnixNano"])
+                                )
+                                / 1e9,
+                                "attributes": {
+                                    a["key"]: _value(a)
+                                    for a in span.get("attributes", [])
+                                },
+                            }
+                        )
+    return spans
+
+
+def breakdown(spans: list[dict]) -> dict:
+    agents = defaultdict(lambda: defaultdict(list))
+    tools = defaultdict(lambda: defaultdict(list))
+    rounds = defaultdict(list)
+    for span in spans:
+        attributes = span["attributes"]
+        agent = attributes.get("campaign_ops.agent") or attributes.get(
+            "gen_ai.agent.name", ""
+        )
+        kind = span["name"].split(" ", 1)[0]
+        if kind == "invoke_agent":
+            agents[agent]["wall_s"].append(span["duration_s"])
+        elif kind == "call_llm":
+            row = agents[agent]
+            row["model_s"].append(span["duration_s"])
+            row["prompt_tokens"].append(attributes.get("gen_ai.usage.input_tokens", 0))
+            row["completion_tokens"].append(
+                attributes.get("gen_ai.usage.output_tokens", 0)
+            )
+            row["retries"].append(attributes.get("campaign_ops.model.retries", 0))
+            row["queue_wait_s"].append(
+                attributes.get("campaign_ops.model.queue_wait_s", 0.0)
+            )
+        elif kind == "execute_tool" and span["name"] != "execute_tool (merged)":
+            row = tools[attributes.get("gen_ai.tool.name", span["name"])]
+            row["wall_s"].append(span["duration_s"])
+            if "campaign_ops.cache.hit" in attributes:
+                row["cache_hits"].append(int(attributes["campaign_ops.cache.hit"]))
+        elif kind == "loop_iteration":
+            key = (
+                attributes["campaign_ops.loop"],
+                attributes["campaign_ops.loop.iteration"],
+            )
+            rounds[key].append(span["duration_s"])
+
+    def timing(values: list[float]) -> dict:
+        return {
+            "count": len(values),
+            "p50_s": percentile(values, 50),
+            "p95_s": percentile(values, 95),
+            "total_s": sum(values),
+        }
+
+    return {
+        "agents": {
+            name: {
+                "runs": len(row["wall_s"]),
+                "wall": timing(row["wall_s"]),
+                "model": timing(row["model_s"]),
+                "prompt_tokens": sum(row["prompt_tokens"]),
+                "completion_tokens": sum(row["completion_tokens"]),
+                "retries": sum(row["retries"]),
+                "queue_wait_p95_s": percentile(row["queue_wait_s"], 95),
+            }
+            for name, row in agents.items()
+        },
+        "tools": {
+            name: {
+                **timing(row["wall_s"]),
+                "cache_hit_rate": (
+                    sum(row["cache_hits"]) / len(row["cache_hits"])
+                    if row["cache_hits"]
+                    else None
+                ),
+            }
+            for name, row in tools.items()
+        },
+        "loop_rounds": {
+            f"{loop}#{iteration}": timing(values)
+            for (loop, iteration), values in sorted(rounds.items())
+        },
+    }
+
+
+def format_breakdown(report: dict) -> str:
+    lines = [
+        f"{'agent':<34}{'runs':>6}{'wall p50':>10}{'model calls':>13}"
+        f"{'model p50':>11}{'prompt tok':>12}{'compl tok':>11}{'retries':>9}"
+    ]
+    for name, row in sorted(
+        report["agents"].items(), key=lambda item: -item[1]["model"]["total_s"]
+    ):
+        lines.append(
+            f"{name:<34}{row['runs']:>6}{row['wall']['p50_s']:>9.3f}s"
+            f"{row['model']['count']:>13}{row['model']['p50_s']:>10.3f}s"
+            f"{row['prompt_tokens']:>12}{row['completion_tokens']:>11}"
+            f"{row['retries']:>9}"
+        )
+    lines.append(f"\n{'tool':<34}{'calls':>6}{'p50':>10}{'p95':>10}{'cache hits':>12}")
+    for name, row in sorted(report["tools"].items(), key=lambda i: -i[1]["total_s"]):
+        hits = row["cache_hit_rate"]
+        lines.append(
+            f"{name:<34}{row['count']:>6}{row['p50_s']:>9.3f}s{row['p95_s']:>9.3f}s"
+            f"{'' if hits is None else f'{hits:.2f}':>12}"
+        )
+    lines.append(f"\n{'loop round':<34}{'count':>6}{'p50':>10}{'p95':>10}")
+    for name, row in report["loop_rounds"].items():
+        lines.append(
+            f"{name:<34}{row['count']:>6}{row['p50_s']:>9.3f}s{row['p95_s']:>9.3f}s"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("traces", nargs="?", default=".cache/telemetry/traces.jsonl")
+    parser.add_argument(
+        "--json", dest="json_path", help="also write the breakdown here"
+    )
+    args = parser.parse_args()
+
+    report = breakdown(load_spans(args.traces))
+    print(format_breakdown(report))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
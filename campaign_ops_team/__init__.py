@@ -1,3 +1,11 @@
-from . import agent
-from . import sub_agents
-from . import prompt
+import importlib
+
+# Submodules load on first access, so importing one module of the package (config,
+# audience_engine, ...) doesn't build the agent graph.
+_SUBMODULES = ("agent", "sub_agents", "prompt")
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,54 +1,132 @@
+"""Root agent of the Campaign Ops team.
+
+Nothing is built at import: `root_agent` and `app` are created on first access (ADK's
+loader and `adk deploy` read them as module attributes), and Vertex AI is only imported
+by `get_agent_engine_app()`. This keeps cold starts and tooling imports cheap.
+"""
+
+import functools
 import logging
 import os
-import vertexai
-import google.genai.types as types
+from typing import AsyncGenerator
+
+from google.adk.agents import SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
 from google.adk.agents.llm_agent import Agent
+from google.adk.apps import App
+from google.adk.events import Event
 from google.adk.tools import AgentTool
-from google.adk.models.google_llm import Gemini
-from vertexai import agent_engines
+
+from .checkpoints import record_campaign_brief
+from .config import LOG_LEVEL, ROOT_MODE
+from .models import get_model
+from .progress import ProgressPlugin, stream_progress
 from .prompt import CAMPAIGN_ORCHESTRATOR_PROMPT
+from .routing import RoutingPlugin
+from .telemetry import TelemetryPlugin, setup_telemetry
+from .token_budget import TokenBudgetPlugin
+
+APP_NAME = "campaign_ops_team"
+
+
+class StagePipelineAgent(SequentialAgent):
+    """Runs the stages in order, each on its own event branch.
+
+    Like the AgentTool calls it replaces, a stage sees the user's message and its own
+    events but not the other stages' transcripts; results pass through session state.
+    """
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        async for event in stream_progress(ctx, self._run_stages(ctx)):
+            yield event
+
+    async def _run_stages(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        for stage in self.sub_agents:
+            stage_ctx = ctx.model_copy(update={"branch": f"{self.name}.{stage.name}"})
+            async for event in stage.run_async(stage_ctx):
+                yield event
+
+
+class OrchestratorAgent(Agent):
+    """LLM orchestrator whose stage tools report their progress while they run."""
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        async for event in stream_progress(ctx, super()._run_async_impl(ctx)):
+            yield event
+
+
+@functools.cache
+def get_root_agent() -> Agent | StagePipelineAgent:
+    """Builds the agent graph on first call (the sub-agent modules build their agents)."""
+    logging.basicConfig(
+        level=LOG_LEVEL,
+        format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+    )
+    # Local trace/metric export when CAMPAIGN_OPS_TELEMETRY is set (see telemetry.py).
+    setup_telemetry()
+
+    from .sub_agents.delivery_agent import delivery_agent
+    from .sub_agents.frontline_agents import frontline_manager_agent
+    from .sub_agents.planner_agents import planner_manager_agent
+
+    if ROOT_MODE == "pipeline":
+        # The stage order is fixed, so run it directly: no orchestrator model call
+        # around each stage and no re-serialization of each group's output.
+        return StagePipelineAgent(
+            name="root_agent",
+            description="Campaign Ops Pipeline",
+            sub_agents=[frontline_manager_agent, planner_manager_agent, delivery_agent],
+            before_agent_callback=record_campaign_brief,
+        )
+    return OrchestratorAgent(
+        model=get_model("root_agent"),
+        name="root_agent",
+        description="Campaign Ops Orchestrator",
+        instruction=CAMPAIGN_ORCHESTRATOR_PROMPT,
+        before_agent_callback=record_campaign_brief,
+        tools=[
+            AgentTool(agent=frontline_manager_agent),
+            AgentTool(agent=planner_manager_agent),
+            AgentTool(agent=delivery_agent),
+        ],
+    )
+
+
+@functools.cache
+def get_app() -> App:
+    """The root agent with its progress, routing, token budget and telemetry plugins."""
+    return App(
+        name=APP_NAME,
+        root_agent=get_root_agent(),
+        plugins=[
+            ProgressPlugin(),
+            RoutingPlugin(),
+            TokenBudgetPlugin(),
+            TelemetryPlugin(),
+        ],
+    )
+
+
+@functools.cache
+def get_agent_engine_app():
+    """Wraps `app` in an Agent Engine `AdkApp`; imports and initializes Vertex AI."""
+    import vertexai
+    from vertexai import agent_engines
+
+    vertexai.init(
+        project=os.getenv("GOOGLE_CLOUD_PROJECT"),
+        location=os.getenv("GOOGLE_CLOUD_LOCATION"),
+    )
+    return agent_engines.AdkApp(app=get_app(), enable_tracing=True)
+
 
-# Import Manager Agents
-from .sub_agents.frontline_agents import frontline_manager_agent
-from .sub_agents.planner_agents import planner_manager_agent
-from .sub_agents.delivery_agent import delivery_agent
-
-logging.basicConfig(
-    level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(name)s - %(message)s"
-)
-
-GOOGLE_CLOUD_PROJECT = os.getenv("GOOGLE_CLOUD_PROJECT")
-GOOGLE_CLOUD_LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION")
-
-# Initialize Vertex AI
-vertexai.init(
-    project=GOOGLE_CLOUD_PROJECT,
-    location=GOOGLE_CLOUD_LOCATION,
-)
-
-MODEL = "gemini-2.5-flash-lite"
-
-retry_config = types.HttpRetryOptions(
-    attempts=2,
-    exp_base=3,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
-
-root_agent = Agent(
-    model=Gemini(model=MODEL, retry_options=retry_config),
-    name="root_agent",
-    description="Campaign Ops Orchestrator",
-    instruction=CAMPAIGN_ORCHESTRATOR_PROMPT,
-    tools=[
-        AgentTool(agent=frontline_manager_agent),
-        AgentTool(agent=planner_manager_agent),
-        AgentTool(agent=delivery_agent),
-    ],
-)
-
-# Wrap the agent in an AdkApp object
-app = agent_engines.AdkApp(
-    agent=root_agent,
-    enable_tracing=True,
-)
+def __getattr__(name: str):
+    if name == "root_agent":
+        return get_root_agent()
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
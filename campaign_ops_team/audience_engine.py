@@ -0,0 +1,794 @@
+"""Audience sizing over a columnar, memory-mapped user table.
+
+uv run python -m campaign_ops_team.audience_engine --users 1000000 \
+    ">=20 wallet transactions in 30 days AND spend >=10,000 THB"
+
+The table is synthetic (one row per user, 30-day activity) and calibrated to the
+`mock_current_kpis` baselines: ~8.2 transactions and ~4,200 THB spend per user per
+month, 35% of transactions by QR. It is generated once per (users, seed) under
+AUDIENCE_DATA_PATH and memory-mapped afterwards, so processes share the pages.
+
+Eligibility rules are plain strings joined with AND/OR (and parentheses), each clause
+naming a field, a comparison and a number, e.g. "QR share below 35%", "inactive for
+30+ days", "opted in to push", a range ("spend between 1,000 and 5,000 THB") or a
+percentile rank ("top 10% spenders"). A clause with several thresholds, or a
+percentage of a field that is not a share, is rejected rather than guessed. Every
+clause is evaluated as one vectorized filter and kept as a packed bitmap in an LRU
+cache, so a rule that reuses common predicates only pays for the bitwise AND/OR and
+the popcount.
+"""
+
+import argparse
+import functools
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from .config import AUDIENCE_CACHE_SIZE, AUDIENCE_DATA_PATH, AUDIENCE_USERS
+from .search_cache import CacheStats
+
+# The table describes a 30-day activity window; count and amount thresholds written
+# for another window are scaled to it.
+WINDOW_DAYS = 30
+
+_DATASET_VERSION = 1
+_CHUNK_ROWS = 1_000_000
+
+COLUMNS = {
+    "wallet_txn_30d": np.uint16,
+    "qr_txn_30d": np.uint16,
+    "qr_share": np.float32,
+    "spend_30d_thb": np.float32,
+    "days_since_last_txn": np.uint16,
+    "tenure_days": np.uint16,
+    "cashback_redemptions_30d": np.uint8,
+    "email_opt_in": np.bool_,
+    "push_opt_in": np.bool_,
+}
+
+
+class AudienceRuleError(ValueError):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Synthetic user table
+# ---------------------------------------------------------------------------
+
+
+def _generate_chunk(rng: np.random.Generator, rows: int) -> dict[str, np.ndarray]:
+    # Gamma-Poisson: most users transact a few times a month, a long tail a lot.
+    # 12% have no activity at all; the rest average 8.2 / 0.88 so the mean is 8.2.
+    rate = rng.gamma(shape=1.2, scale=8.2 / 0.88 / 1.2, size=rows)
+    rate[rng.random(rows) < 0.12] = 0.0
+    txns = np.minimum(rng.poisson(rate), np.iinfo(np.uint16).max)
+    qr_txns = rng.binomial(txns, rng.beta(2.0, 3.7, size=rows))
+    ticket = rng.lognormal(np.log(512) - 0.18, 0.6, size=rows)
+    idle = np.where(
+        txns > 0,
+        np.minimum(rng.exponential(WINDOW_DAYS / (txns + 1.0)), WINDOW_DAYS - 1),
+        WINDOW_DAYS + np.minimum(rng.exponential(90, size=rows), 335),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        qr_share = np.where(txns > 0, qr_txns / txns, 0.0)
+    return {
+        "wallet_txn_30d": txns,
+        "qr_txn_30d": qr_txns,
+        "qr_share": qr_share,
+        "spend_30d_thb": txns * ticket,
+        "days_since_last_txn": idle,
+        "tenure_days": rng.integers(1, 5 * 365, size=rows),
+        "cashback_redemptions_30d": np.minimum(
+            rng.poisson(0.3, size=rows) * (txns > 0), 255
+        ),
+        "email_opt_in": rng.random(rows) < 0.6,
+        "push_opt_in": rng.random(rows) < 0.7,
+    }
+
+
+def build_user_table(path: str, users: int, seed: int = 7) -> None:
+    """Writes one `.npy` file per column, generated in chunks to bound memory."""
+    tmp = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    outputs = {
+        name: np.lib.format.open_memmap(
+            os.path.join(tmp, f"{name}.npy"), mode="w+", dtype=dtype, shape=(users,)
+        )
+        for name, dtype in COLUMNS.items()
+    }
+    chunks = range(0, users, _CHUNK_ROWS)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    for start, chunk_seed in zip(chunks, seeds):
+        stop = min(start + _CHUNK_ROWS, users)
+        chunk = _generate_chunk(np.random.default_rng(chunk_seed), stop - start)
+        for name, values in chunk.items():
+            outputs[name][start:stop] = values
+    for column in outputs.values():
+        column.flush()
+    del outputs
+    meta = {"version": _DATASET_VERSION, "users": users, "seed": seed}
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # Another process finished the same table first.
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_user_table(path: str, users: int, seed: int = 7) -> dict[str, np.ndarray]:
+    """Memory-maps the table at `path`, building it first if it is missing."""
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        meta = None
+    if meta != {"version": _DATASET_VERSION, "users": users, "seed": seed}:
+        shutil.rmtree(path, ignore_errors=True)
+        build_user_table(path, users, seed)
+    return {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        for name in COLUMNS
+    }
+
+
+# ---------------------------------------------------------------------------
+# Rule parsing
+# ---------------------------------------------------------------------------
+
+# Among keywords at the same position, the first listed wins, so the more specific
+# fields come first.
+_OPT_IN = r"(opt|subscri|consent|reachable|enabled)"
+_FIELDS = (
+    ("email_opt_in", re.compile(rf"e-?mail.*\b{_OPT_IN}|\b{_OPT_IN}.*e-?mail")),
+    ("push_opt_in", re.compile(rf"push.*\b{_OPT_IN}|\b{_OPT_IN}.*push")),
+    ("qr_share", re.compile(r"\bqr\b.*(share|ratio|mix|%)|qr_txn_share|qr_share")),
+    ("qr_txn_30d", re.compile(r"\bqr")),
+    ("cashback_redemptions_30d", re.compile(r"cashback|voucher|redeem|redemption")),
+    ("spend_30d_thb", re.compile(r"spend|\bthb\b|฿|baht|\bgmv\b|volume")),
+    (
+        "tenure_days",
+        re.compile(r"tenure|account age|\bjoined|sign(ed)?[ -]?up|new user"),
+    ),
+    (
+        "days_since_last_txn",
+        re.compile(
+            r"inactive|dormant|lapsed|recen|days since|\blast (txn|transaction|activ)"
+            r"|\bactive (in|within|during)\b"
+        ),
+    ),
+    ("wallet_txn_30d", re.compile(r"transact|\btxns?\b|payment|wallet|frequency")),
+)
+
+_KIND = {
+    "email_opt_in": "flag",
+    "push_opt_in": "flag",
+    "qr_share": "share",
+    "qr_txn_30d": "count",
+    "cashback_redemptions_30d": "count",
+    "spend_30d_thb": "count",
+    "tenure_days": "days",
+    "days_since_last_txn": "days",
+    "wallet_txn_30d": "count",
+}
+
+_NUMBER = r"(\d[\d,]*(?:\.\d+)?|\.\d+)\s*([km])?\b\s*(%)?"
+_OPERATORS = (
+    (">=", r">=|≥|=>|\bat least|\bminimum(?: of)?|\bmin\b|\bno less than"),
+    (
+        "<=",
+        r"<=|≤|=<|\bat most|\bmaximum(?: of)?|\bmax\b|\bno more than|\bup to"
+        r"|\bwithin",
+    ),
+    (">", r">|\bmore than|\bover|\babove|\bgreater than|\bexceeds?|\bolder than"),
+    ("<", r"<|\bless than|\bfewer than|\bunder|\bbelow|\bnewer than"),
+    ("==", r"==|=|\bexactly|\bequals?\b"),
+)
+_COMPARISON = re.compile(
+    "(?P<op>"
+    + "|".join(f"(?:{pattern})" for _, pattern in _OPERATORS)
+    + r")\s*"
+    + _NUMBER
+)
+_BARE_NUMBER = re.compile(_NUMBER)
+# "between 1,000 and 5,000 THB" / "10-20 transactions" are one clause; the range is
+# rewritten to "1,000 ↔ 5,000" before the rule is split on AND.
+_RANGE = "↔"
+_RANGE_BOUND = r"\d[\d,]*(?:\.\d+)?(?:\s*[km]\b)?(?:\s*%)?"
+_RANGE_TEXT = re.compile(
+    rf"\b(?:between|from)\s+(?P<lo>{_RANGE_BOUND})\s*(?:and|to|-|–)\s*"
+    rf"(?P<hi>{_RANGE_BOUND})"
+    rf"|(?P<lo2>{_RANGE_BOUND})\s*(?:-|–|\bto\b)\s*(?P<hi2>{_RANGE_BOUND})"
+)
+_RANGE_NUMBERS = re.compile(_NUMBER + rf"\s*{_RANGE}\s*" + _NUMBER)
+# Percentile ranks: "top 10% spenders", "bottom 25% by QR share", "above the 90th
+# percentile of spend".
+_RANK = re.compile(r"\b(top|bottom)\s+(\d+(?:\.\d+)?)\s*(?:%|percent\b)")
+_PERCENTILE = re.compile(
+    "(?P<op>"
+    + "|".join(f"(?:{pattern})" for _, pattern in _OPERATORS)
+    + r")?\s*(?:the\s+)?(\d+(?:\.\d+)?)(?:st|nd|rd|th)\s+percentile\b"
+)
+_WINDOW = re.compile(
+    r"(?:\b(?:in|within|over|during|per|for|of|past|last)|/)\s*(?:the\s+)?"
+    r"(?:last\s+|past\s+)?(\d+)?\s*(day|week|month|quarter|year)s?\b"
+    r"|\b(daily|weekly|monthly|quarterly)\b"
+)
+_WINDOW_DAYS = {"day": 1, "week": 7, "month": 30, "quarter": 90, "year": 365}
+_ADVERB_DAYS = {"daily": 1, "weekly": 7, "monthly": 30, "quarterly": 90}
+_UNIT_ALIASES = {"d": "day", "wk": "week", "mo": "month", "mth": "month", "yr": "year"}
+# The word after a compared number; for day fields it is the number's unit.
+_UNIT = re.compile(r"\s*\+?\s*([a-z]+)")
+_NEGATION = re.compile(
+    r"\b(no|not|non|without|inactive|dormant|lapsed|opted[ -]?out|unsubscribed)\b"
+)
+# "5 or fewer" / "10,000 THB and above" are one clause, not an OR / AND; they are
+# rewritten to these markers before the rule is split.
+_AT_MOST_SUFFIX = re.compile(r"\s+or\s+(?:less|fewer|below|under|lower)\b")
+_AT_LEAST_SUFFIX = re.compile(
+    r"\s+(?:and|or)\s+(?:above|more|up|over|greater|higher)\b"
+)
+_AT_MOST, _AT_LEAST = "⩽", "⩾"
+# NOT is an operator only in front of a parenthesis ("NOT (qr share >= 50%)"); inside
+# a clause ("not opted in to push") it is part of the condition.
+_TOKENS = re.compile(
+    r"(\(|\)|\band\b|\bor\b|\bnot(?=\s*\()|&&?|\|\|?|;|,\s+)", re.IGNORECASE
+)
+
+
+def _number(match: re.Match, offset: int = 0) -> tuple[float, bool]:
+    digits, scale, percent = match.group(1 + offset, 2 + offset, 3 + offset)
+    value = float(digits.replace(",", ""))
+    value *= {"k": 1e3, "m": 1e6}.get((scale or "").lower(), 1)
+    return value, bool(percent)
+
+
+def _operator(text: str) -> str:
+    for op, pattern in _OPERATORS:
+        if re.fullmatch(pattern, text.strip()):
+            return op
+    return ">="
+
+
+def _unit_days(unit: str) -> int | None:
+    """Days in "month", "weeks", "yrs", ...; None if `unit` is not a unit of time."""
+    unit = unit.removesuffix("s") if len(unit) > 2 else unit
+    return _WINDOW_DAYS.get(_UNIT_ALIASES.get(unit, unit))
+
+
+def _window_days(match: re.Match) -> int:
+    if match.group(3):
+        return _ADVERB_DAYS[match.group(3)]
+    return int(match.group(1) or 1) * _unit_days(match.group(2))
+
+
+def _in_days(text: str, clause: str, end: int) -> int:
+    """Days per unit of the number ending at `end` ("1 year" is 365 days).
+
+    A number without a unit is already in days; any other word after it raises.
+    """
+    unit = _UNIT.match(clause, end)
+    if unit is None:
+        return 1
+    days = _unit_days(unit.group(1))
+    if days is None:
+        raise AudienceRuleError(f"unreadable unit {unit.group(1)!r} in {text!r}")
+    return days
+
+
+_SUBJECT_START = re.compile(r"\b(?:with|having|who|whose|where|that)\b")
+
+
+def _field(text: str, clause: str) -> str:
+    """The field the comparison is about.
+
+    Keywords before the comparison ("spend >= 10k THB on QR") name its subject; only
+    without one do keywords after the number count (">=20 wallet transactions"), and
+    only without those the ones before a "with" ("high spenders with >= 20
+    transactions"). Otherwise the earliest keyword wins.
+    """
+    starts = [
+        match.start()
+        for match in (
+            _RANK.search(clause),
+            _PERCENTILE.search(clause),
+            _COMPARISON.search(clause),
+            _BARE_NUMBER.search(clause),
+        )
+        if match
+    ]
+    subject_end = min(starts, default=len(clause))
+    connectors = list(_SUBJECT_START.finditer(clause, 0, subject_end))
+    subject_start = connectors[-1].end() if connectors else 0
+    found = []
+    for order, (name, pattern) in enumerate(_FIELDS):
+        for match in pattern.finditer(clause):
+            start = match.start()
+            place = 0 if subject_start <= start < subject_end else 1
+            if start < subject_start:
+                place = 2
+            found.append((place, start, order, name))
+    if not found:
+        raise AudienceRuleError(
+            f"no known field in {text!r}; fields: {', '.join(COLUMNS)}"
+        )
+    return min(found)[3]
+
+
+def _threshold(text: str, column: str, value: float, percent: bool, window) -> float:
+    kind = _KIND[column]
+    if percent and kind != "share":
+        raise AudienceRuleError(
+            f"ambiguous percentage in {text!r}: {column} is not a share; give a"
+            " number, or a rank such as 'top 10%'"
+        )
+    if kind == "share" and (percent or value > 1):
+        value /= 100
+    if kind == "count" and window and _window_days(window) != WINDOW_DAYS:
+        value *= WINDOW_DAYS / _window_days(window)
+    return round(value, 4)
+
+
+def _clause(text: str) -> tuple:
+    """Parses one comparison, e.g. "spend >=10,000 THB", into ("pred", column, op, value).
+
+    A range becomes an AND of two predicates and a percentile a ("rank", column,
+    "top"|"bottom", fraction) node. A clause with more than one threshold raises.
+    """
+    clause = " ".join(text.lower().split())
+    column = _field(text, clause)
+    kind = _KIND[column]
+    if kind == "flag":
+        return ("pred", column, "==", 0.0 if _NEGATION.search(clause) else 1.0)
+
+    rank = _RANK.search(clause)
+    percentile = _PERCENTILE.search(clause)
+    if rank or percentile:
+        if rank:
+            end, fraction = rank.group(1), float(rank.group(2)) / 100
+        elif _operator(percentile.group("op") or ">=") in ("<", "<="):
+            end, fraction = "bottom", float(percentile.group(2)) / 100
+        else:
+            end, fraction = "top", 1 - float(percentile.group(2)) / 100
+        if not 0 < fraction <= 1:
+            raise AudienceRuleError(f"percentile out of range in {text!r}")
+        return ("rank", column, end, round(fraction, 4))
+
+    default_op = "<=" if _AT_MOST in clause else ">="
+    window = _WINDOW.search(clause)
+    if kind != "days" and window:
+        # "in 90 days" is the window, not the threshold. For day fields it may be
+        # the threshold itself ("over 90 days", "in the last 7 days").
+        clause = clause[: window.start()] + " " + clause[window.end() :]
+
+    if _RANGE in clause:
+        bounds = _RANGE_NUMBERS.search(clause)
+        if bounds is None:
+            raise AudienceRuleError(f"unreadable range in {text!r}")
+        (lo, lo_percent), (hi, hi_percent) = _number(bounds), _number(bounds, 3)
+        percent = lo_percent or hi_percent
+        if kind == "days":
+            # "1-2 years": the unit follows the upper bound.
+            days = _in_days(text, clause, bounds.end())
+            lo, hi = lo * days, hi * days
+        lo, hi = sorted(
+            _threshold(text, column, value, percent, window) for value in (lo, hi)
+        )
+        rest = clause[: bounds.start()] + clause[bounds.end() :]
+        if _BARE_NUMBER.search(rest):
+            raise AudienceRuleError(f"more than one threshold in {text!r}")
+        return ("and", ("pred", column, ">=", lo), ("pred", column, "<=", hi))
+    if re.search(r"\bbetween\b", clause):
+        raise AudienceRuleError(
+            f"unreadable range in {text!r}; write it as 'between X and Y'"
+        )
+
+    comparison = _COMPARISON.search(clause)
+    bare = _BARE_NUMBER.search(clause)
+    if comparison:
+        op = _operator(comparison.group("op"))
+        value, percent = _number(comparison, offset=1)
+        used = comparison
+        if kind == "days":
+            value *= _in_days(text, clause, comparison.end())
+    elif kind == "days" and window:
+        # "active in the last 7 days", "inactive for 30 days", "joined in the last month"
+        value, percent = float(_window_days(window)), False
+        op = ">" if _NEGATION.search(clause) else "<="
+        used = window
+    elif bare:
+        op = default_op
+        value, percent = _number(bare)
+        used = bare
+        if kind == "days":
+            value *= _in_days(text, clause, bare.end())
+    else:
+        raise AudienceRuleError(f"no threshold in {text!r}")
+    if _BARE_NUMBER.search(clause[: used.start()] + " " + clause[used.end() :]):
+        raise AudienceRuleError(f"more than one threshold in {text!r}")
+    return ("pred", column, op, _threshold(text, column, value, percent, window))
+
+
+def _parse_tokens(tokens: list[str]) -> tuple:
+    position = 0
+
+    def peek():
+        return tokens[position].lower() if position < len(tokens) else None
+
+    def expression():
+        nonlocal position
+        children = [term()]
+        while peek() in ("or", "|", "||"):
+            position += 1
+            children.append(term())
+        return children[0] if len(children) == 1 else ("or", *children)
+
+    def term():
+        nonlocal position
+        children = [factor()]
+        while peek() in ("and", "&", "&&", ";", ","):
+            position += 1
+            children.append(factor())
+        return children[0] if len(children) == 1 else ("and", *children)
+
+    def factor():
+        nonlocal position
+        token = peek()
+        if token is None:
+            raise AudienceRuleError("rule ends after an operator")
+        position += 1
+        if token == "not":
+            return ("not", factor())
+        if token == "(":
+            node = expression()
+            if peek() != ")":
+                raise AudienceRuleError("unbalanced parentheses")
+            position += 1
+            return node
+        if token in ("and", "or", "&", "&&", "|", "||", ";", ",", ")"):
+            raise AudienceRuleError(f"unexpected {token!r}")
+        return _clause(tokens[position - 1])
+
+    node = expression()
+    if position != len(tokens):
+        raise AudienceRuleError(f"unexpected {tokens[position]!r}")
+    return node
+
+
+def _range_marker(match: re.Match) -> str:
+    lo = match.group("lo") or match.group("lo2")
+    hi = match.group("hi") or match.group("hi2")
+    return f"{lo} {_RANGE} {hi}"
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_rule(rule: str) -> tuple:
+    """Parses a rule string into a nested ("and"|"or"|"not", ...) / ("pred"|"rank", ...)
+    tree."""
+    rule = rule.lower()
+    rule = _AT_MOST_SUFFIX.sub(_AT_MOST, _AT_LEAST_SUFFIX.sub(_AT_LEAST, rule))
+    rule = _RANGE_TEXT.sub(_range_marker, rule)
+    tokens = [token.strip() for token in _TOKENS.split(rule) if token.strip()]
+    if not tokens:
+        raise AudienceRuleError("empty rule")
+    return _parse_tokens(tokens)
+
+
+def describe(node: tuple) -> str:
+    """Canonical text of a parsed rule; also the bitmap cache key."""
+    if node[0] == "pred":
+        _, column, op, value = node
+        return f"{column} {op} {value:g}"
+    if node[0] == "rank":
+        _, column, end, fraction = node
+        return f"{column} {end} {fraction:.2%}"
+    if node[0] == "not":
+        return f"NOT {describe(node[1])}"
+    parts = sorted(describe(child) for child in node[1:])
+    return "(" + f" {node[0].upper()} ".join(parts) + ")"
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+_COMPARE = {
+    ">=": np.greater_equal,
+    "<=": np.less_equal,
+    ">": np.greater,
+    "<": np.less,
+    "==": np.equal,
+}
+
+
+def _compare(values: np.ndarray, op: str, threshold: float) -> np.ndarray:
+    """`values <op> threshold`, computed in the column's own dtype.
+
+    A float threshold would upcast a whole integer column to float64 first, which
+    doubles the cost of the filter; integer thresholds are rounded to the equivalent
+    inclusive bound instead.
+    """
+    if values.dtype == np.bool_:
+        return np.equal(values, bool(threshold))
+    if values.dtype.kind != "u":
+        return _COMPARE[op](values, values.dtype.type(threshold))
+    if op == "==":
+        if threshold != int(threshold):
+            return np.zeros(len(values), dtype=bool)
+        bound = int(threshold)
+    elif op in (">=", ">"):
+        bound = math.floor(threshold) + 1 if op == ">" else math.ceil(threshold)
+        op = ">="
+    else:
+        bound = math.ceil(threshold) - 1 if op == "<" else math.floor(threshold)
+        op = "<="
+    limits = np.iinfo(values.dtype)
+    if bound < limits.min or bound > limits.max:
+        # Out of range for the dtype: the answer is the same for every user.
+        everyone = (op == ">=" and bound < limits.min) or (
+            op == "<=" and bound > limits.max
+        )
+        return np.full(len(values), everyone, dtype=bool)
+    return _COMPARE[op](values, bound)
+
+
+def _rank(values: np.ndarray, end: str, fraction: float) -> np.ndarray:
+    """The `fraction` of users with the highest (top) or lowest (bottom) values.
+
+    Users tied at the cut-off are all included.
+    """
+    if end == "top":
+        return _compare(values, ">=", float(np.quantile(values, 1 - fraction)))
+    return _compare(values, "<=", float(np.quantile(values, fraction)))
+
+
+@dataclass
+class AudienceSize:
+    matched_users: int
+    total_users: int
+    rules: list[str]
+    elapsed_ms: float
+
+    def as_dict(self) -> dict:
+        share = self.matched_users / self.total_users if self.total_users else 0.0
+        return {
+            "matched_users": self.matched_users,
+            "total_users": self.total_users,
+            "share": round(share, 4),
+            # The mock KPIs describe a 1,000-user reference app.
+            "per_1000_users": round(share * 1000, 1),
+            "interpreted_rules": self.rules,
+            "elapsed_ms": round(self.elapsed_ms, 2),
+        }
+
+
+class AudienceEngine:
+    """Sizes eligibility rules against in-memory or memory-mapped columns.
+
+    Each predicate and AND/OR/NOT node is cached as a packed bitmap (one bit per
+    user), least recently used first out past `cache_size` entries.
+    """
+
+    def __init__(self, columns: dict[str, np.ndarray], cache_size: int = 256):
+        self.columns = columns
+        self.total_users = len(next(iter(columns.values())))
+        self.cache_size = cache_size
+        self.stats = CacheStats()
+        self._bitmaps: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        # Every real user; masks the zero padding of the last byte after a NOT.
+        self._everyone = _pack(np.ones(self.total_users, dtype=bool))
+
+    @classmethod
+    def open(cls, path: str, users: int, seed: int = 7, cache_size: int = 256):
+        return cls(load_user_table(path, users, seed), cache_size=cache_size)
+
+    def _cached(self, key: str) -> np.ndarray | None:
+        with self._lock:
+            bitmap = self._bitmaps.get(key)
+            if bitmap is None:
+                self.stats.misses += 1
+                return None
+            self._bitmaps.move_to_end(key)
+            self.stats.hits += 1
+            return bitmap
+
+    def _store(self, key: str, bitmap: np.ndarray) -> None:
+        if not self.cache_size:
+            return
+        with self._lock:
+            self._bitmaps[key] = bitmap
+            self._bitmaps.move_to_end(key)
+            while len(self._bitmaps) > self.cache_size:
+                self._bitmaps.popitem(last=False)
+                self.stats.evictions += 1
+
+    def bitmap(self, node: tuple) -> np.ndarray:
+        key = describe(node)
+        bitmap = self._cached(key)
+        if bitmap is not None:
+            return bitmap
+        if node[0] == "pred":
+            _, column, op, value = node
+            bitmap = _pack(_compare(self.columns[column], op, value))
+        elif node[0] == "rank":
+            bitmap = _pack(_rank(self.columns[node[1]], node[2], node[3]))
+        elif node[0] == "not":
+            bitmap = np.bitwise_and(np.invert(self.bitmap(node[1])), self._everyone)
+        else:
+            combine = np.bitwise_and if node[0] == "and" else np.bitwise_or
+            bitmap = functools.reduce(combine, (self.bitmap(c) for c in node[1:]))
+        self._store(key, bitmap)
+        return bitmap
+
+    def _rules_bitmap(self, rules: list[str]) -> tuple[np.ndarray, list[tuple]]:
+        nodes = [parse_rule(rule) for rule in rules]
+        if not nodes:
+            raise AudienceRuleError("no rules given")
+        return self.bitmap(nodes[0] if len(nodes) == 1 else ("and", *nodes)), nodes
+
+    def size(self, rules: list[str]) -> AudienceSize:
+        """Counts users matching every rule. Raises AudienceRuleError on a bad rule."""
+        started = time.perf_counter()
+        bitmap, nodes = self._rules_bitmap(rules)
+        return AudienceSize(
+            matched_users=_count(bitmap),
+            total_users=self.total_users,
+            rules=[describe(n) for n in nodes],
+            elapsed_ms=(time.perf_counter() - started) * 1000,
+        )
+
+    def overlap(self, segments: list[tuple[str, list[str]]]) -> dict:
+        """Pairwise overlaps, union and a mutually exclusive assignment of `segments`.
+
+        `segments` is (name, rules) in priority order: a user matching several segments
+        is assigned to the first. Each segment's `exclusive_rules` select exactly its
+        assigned users, so audiences created from them never share a user.
+        """
+        started = time.perf_counter()
+        sized, errors = [], {}
+        for name, rules in segments:
+            try:
+                sized.append((name, list(rules), self._rules_bitmap(rules)[0]))
+            except AudienceRuleError as exc:
+                errors[name] = str(exc)
+
+        report_segments, claimed, higher = [], None, []
+        for priority, (name, rules, bitmap) in enumerate(sized, start=1):
+            exclusive = (
+                bitmap
+                if claimed is None
+                else np.bitwise_and(bitmap, np.invert(claimed))
+            )
+            claimed = bitmap if claimed is None else np.bitwise_or(claimed, bitmap)
+            report_segments.append(
+                {
+                    "name": name,
+                    "priority": priority,
+                    "matched_users": _count(bitmap),
+                    "exclusive_users": _count(exclusive),
+                    "exclusive_rules": rules
+                    + [f"NOT ({_conjunction(other)})" for other in higher],
+                }
+            )
+            higher.append(rules)
+
+        overlaps = []
+        sizes = [segment["matched_users"] for segment in report_segments]
+        for i, (name_a, _, a) in enumerate(sized):
+            for j, (name_b, _, b) in enumerate(sized[i + 1 :], start=i + 1):
+                shared = _count(np.bitwise_and(a, b))
+                if shared:
+                    either = sizes[i] + sizes[j] - shared
+                    overlaps.append(
+                        {
+                            "segments": [name_a, name_b],
+                            "users": shared,
+                            "jaccard": round(shared / either, 4),
+                        }
+                    )
+
+        union = _count(claimed) if claimed is not None else 0
+        total = sum(segment["matched_users"] for segment in report_segments)
+        report = {
+            "total_users": self.total_users,
+            "union_users": union,
+            "sum_of_segments": total,
+            "double_counted_users": total - union,
+            "segments": report_segments,
+            "overlaps": overlaps,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        if errors:
+            report["errors"] = errors
+        return report
+
+
+def _pack(mask: np.ndarray) -> np.ndarray:
+    """One bit per user, as uint64 words so AND/OR/popcount run 64 users at a time.
+
+    The padding after the last user is zero, so it never counts.
+    """
+    packed = np.packbits(mask)
+    padded = np.zeros(-(-len(packed) // 8) * 8, dtype=np.uint8)
+    padded[: len(packed)] = packed
+    return padded.view(np.uint64)
+
+
+def _count(bitmap: np.ndarray) -> int:
+    return int(np.bitwise_count(bitmap).sum(dtype=np.int64))
+
+
+def _conjunction(rules: list[str]) -> str:
+    return " AND ".join(f"({rule})" for rule in rules)
+
+
+_engine: AudienceEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_audience_engine() -> AudienceEngine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AudienceEngine.open(
+                os.path.join(AUDIENCE_DATA_PATH, f"users_{AUDIENCE_USERS}"),
+                AUDIENCE_USERS,
+                cache_size=AUDIENCE_CACHE_SIZE,
+            )
+        return _engine
+
+
+def find_audience_tool(rules: list[str]) -> dict:
+    """
+    Counts the users matching a set of eligibility rules. Call it freely: it answers in
+    milliseconds from the user table.
+
+    Each rule is a plain-language condition; rules in the list are combined with AND, and
+    a rule may itself use AND / OR and parentheses. Supported fields (30-day window):
+    wallet transactions, QR transactions, QR share, spend (THB), days since last
+    transaction ("active in last 7 days", "inactive 30+ days"), tenure, cashback
+    redemptions, email / push opt-in. Ranges ("spend between 1,000 and 5,000 THB") and
+    percentile ranks ("top 10% spenders") are supported. Example:
+    [">=20 wallet transactions in 30 days", "spend >=10,000 THB", "QR share below 35%"]
+
+    Args:
+        rules (list[str]): Eligibility rules, all of which a user must match.
+
+    Returns:
+        dict: `matched_users`, `total_users`, `share`, `per_1000_users` (for the 1,000-user
+        reference app) and `interpreted_rules`, or `status: "error"` with the rule that
+        could not be read.
+    """
+    if isinstance(rules, str):
+        rules = [rules]
+    try:
+        size = get_audience_engine().size(list(rules))
+    except AudienceRuleError as exc:
+        return {"status": "error", "error": str(exc)}
+    return {"status": "ok", **size.as_dict()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rules", nargs="+", help="rules, combined with AND")
+    parser.add_argument("--users", type=int, default=AUDIENCE_USERS)
+    parser.add_argument("--path", default=AUDIENCE_DATA_PATH)
+    args = parser.parse_args()
+
+    engine = AudienceEngine.open(
+        os.path.join(args.path, f"users_{args.users}"), args.users
+    )
+    print(json.dumps(engine.size(args.rules).as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
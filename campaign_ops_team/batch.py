@@ -0,0 +1,163 @@
+"""Run many campaign briefs through `root_agent` concurrently.
+
+    uv run python -m campaign_ops_team.batch briefs.jsonl results.jsonl --concurrency 4 --rpm 60
+
+Each input line is {"id": str, "brief": str}. Each finished campaign is appended to the
+output file as soon as it completes; rerunning the same command skips ids that already
+succeeded, so an interrupted batch resumes where it stopped.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+
+import google.genai.types as types
+from google.adk.apps import App
+from google.adk.runners import InMemoryRunner
+
+from .context import parse_agent_json
+from .rate_limit import SCHEDULER
+
+logger = logging.getLogger(__name__)
+
+
+def load_briefs(path: str) -> list[dict]:
+    briefs = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            brief = record.get("brief") or record.get("goal")
+            if not brief:
+                raise ValueError(f"{path}:{line_no} has no 'brief'")
+            briefs.append({"id": str(record.get("id", line_no)), "brief": brief})
+    return briefs
+
+
+def completed_ids(path: str) -> set[str]:
+    """Ids that already have a successful result in `path` (a missing file means none)."""
+    if not os.path.exists(path):
+        return set()
+    done = set()
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interrupted write
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+async def run_batch(
+    app: App,
+    briefs: list[dict],
+    output_path: str,
+    concurrency: int = 4,
+    requests_per_minute: float | None = None,
+) -> dict:
+    """Runs `briefs` through `app` with at most `concurrency` in flight; returns counts."""
+    done = completed_ids(output_path)
+    pending = [b for b in briefs if b["id"] not in done]
+    if requests_per_minute:
+        SCHEDULER.configure(requests_per_minute=requests_per_minute)
+    runner = InMemoryRunner(app=app)
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for brief in pending:
+        queue.put_nowait(brief)
+    write_lock = asyncio.Lock()
+    counts = {"skipped": len(briefs) - len(pending), "ok": 0, "error": 0}
+
+    async def run_one(brief: dict) -> dict:
+        user_id = f"batch-{brief['id']}"
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name, user_id=user_id
+        )
+        message = types.Content(
+            role="user", parts=[types.Part.from_text(text=brief["brief"])]
+        )
+        started = time.perf_counter()
+        async for _ in runner.run_async(
+            user_id=user_id, session_id=session.id, new_message=message
+        ):
+            pass
+        session = await runner.session_service.get_session(
+            app_name=runner.app_name, user_id=user_id, session_id=session.id
+        )
+        latency_s = round(time.perf_counter() - started, 3)
+        delivery_result = parse_agent_json(session.state.get("delivery_result"))
+        if not delivery_result:
+            # Not "ok", so a resumed batch retries it.
+            logger.error("Campaign %s finished without a delivery_result", brief["id"])
+            return {
+                "id": brief["id"],
+                "status": "error",
+                "error": "no delivery_result in the final session state",
+                "latency_s": latency_s,
+            }
+        return {
+            "id": brief["id"],
+            "status": "ok",
+            "latency_s": latency_s,
+            "delivery_result": delivery_result,
+        }
+
+    async def worker(output) -> None:
+        while True:
+            try:
+                brief = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                record = await run_one(brief)
+            except Exception as exc:
+                logger.exception("Campaign %s failed", brief["id"])
+                record = {"id": brief["id"], "status": "error", "error": repr(exc)}
+            async with write_lock:
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+            counts[record["status"]] += 1
+
+    with open(output_path, "a") as output:
+        await asyncio.gather(*(worker(output) for _ in range(max(1, concurrency))))
+    await runner.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("briefs", help="input JSONL with one campaign brief per line")
+    parser.add_argument("output", help="output JSONL, appended to and used for resume")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=None,
+        help="max model requests per minute per model",
+    )
+    args = parser.parse_args()
+
+    from .agent import get_app
+    from .telemetry import shutdown_telemetry
+
+    counts = asyncio.run(
+        run_batch(
+            get_app(),
+            load_briefs(args.briefs),
+            args.output,
+            concurrency=args.concurrency,
+            requests_per_minute=args.rpm,
+        )
+    )
+    shutdown_telemetry()
+    print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
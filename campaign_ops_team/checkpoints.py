@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+
+import google.genai.types as types
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.tools import AgentTool
+from opentelemetry import trace
+
+from .config import (
+    CHECKPOINT_MAX_ENTRIES,
+    CHECKPOINT_MODE,
+    CHECKPOINT_PATH,
+    CHECKPOINT_TTL_SECONDS,
+    FRONTLINE_CACHE_BACKEND,
+)
+from .search_cache import SqliteCacheStore
+from .telemetry import CHECKPOINT_HIT
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_STORE = (
+    SqliteCacheStore(
+        CHECKPOINT_PATH, max_entries=CHECKPOINT_MAX_ENTRIES, table="stage_checkpoints"
+    )
+    if CHECKPOINT_MODE in ("write", "resume")
+    else None
+)
+
+_fingerprints: dict[str, str] = {}
+
+
+def agent_fingerprint(agent: BaseAgent) -> str:
+    """Hash of every instruction in the stage, so editing a prompt invalidates it."""
+    if agent.name not in _fingerprints:
+        instructions = []
+        pending = [agent]
+        while pending:
+            current = pending.pop()
+            if isinstance(current, LlmAgent):
+                instructions.append(f"{current.name}:{current.instruction}")
+                pending.extend(
+                    t.agent for t in current.tools if isinstance(t, AgentTool)
+                )
+            pending.extend(current.sub_agents)
+        _fingerprints[agent.name] = hashlib.sha256(
+            "\n".join(sorted(instructions)).encode()
+        ).hexdigest()
+    return _fingerprints[agent.name]
+
+
+def _checkpoint_key(callback_context: CallbackContext, input_keys) -> str:
+    context = callback_context._invocation_context
+    inputs = {key: callback_context.state.get(key) for key in input_keys}
+    payload = json.dumps(
+        [context.user_id, agent_fingerprint(context.agent), inputs],
+        sort_keys=True,
+        default=str,
+    )
+    return f"{context.agent.name}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def record_campaign_brief(callback_context: CallbackContext):
+    """Keeps the user's latest brief in state for the frontline checkpoint and cache."""
+    if not callback_context.user_content or (
+        CHECKPOINT_STORE is None and FRONTLINE_CACHE_BACKEND == "off"
+    ):
+        return None
+    callback_context.state["campaign_brief"] = "".join(
+        part.text or "" for part in callback_context.user_content.parts or []
+    )
+    return None
+
+
+def checkpointed(output_key: str, input_keys: tuple[str, ...]):
+    """Returns (before, after) agent callbacks that checkpoint `output_key`.
+
+    The checkpoint is keyed on the values of `input_keys`, the user and the stage's
+    instructions. In resume mode a stage whose checkpoint is still valid is skipped and
+    its saved output restored, so a late failure only reruns the stages after it.
+    """
+
+    def before(callback_context: CallbackContext):
+        if CHECKPOINT_MODE != "resume":
+            return None
+        saved = CHECKPOINT_STORE.get(_checkpoint_key(callback_context, input_keys))
+        trace.get_current_span().set_attribute(CHECKPOINT_HIT, saved is not None)
+        if saved is None:
+            return None
+        logger.info("Resuming %s from checkpoint", callback_context.agent_name)
+        callback_context.state[output_key] = saved
+        text = saved if isinstance(saved, str) else json.dumps(saved)
+        return types.Content(role="model", parts=[types.Part(text=text)])
+
+    def after(callback_context: CallbackContext):
+        if CHECKPOINT_STORE is None:
+            return None
+        value = callback_context.state.get(output_key)
+        if value:
+            CHECKPOINT_STORE.set(
+                _checkpoint_key(callback_context, input_keys),
+                value,
+                CHECKPOINT_TTL_SECONDS,
+            )
+        return None
+
+    return before, after
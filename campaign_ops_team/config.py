@@ -0,0 +1,141 @@
+import os
+
+
+def _flag(name: str, default: str = "0") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _mapping(name: str, default: str = "") -> dict[str, str]:
+    """Parses "key=value,key=value"; entries without a value are ignored."""
+    pairs = (item.partition("=") for item in os.getenv(name, default).split(","))
+    return {key.strip(): value.strip() for key, _, value in pairs if value.strip()}
+
+
+# Planner loop behaviour after a rejection:
+# - "full": rerun goal planning and segmentation every round.
+# - "targeted": rerun only the planner whose section the critic rejected.
+PLANNER_LOOP_MODE = os.getenv("CAMPAIGN_OPS_PLANNER_LOOP_MODE", "full")
+
+# Prefetch internal data + market research once per planner run, side by side in a
+# ParallelAgent, before goal planning and segmentation (which stay sequential).
+PLANNER_PARALLEL = _flag("CAMPAIGN_OPS_PLANNER_PARALLEL")
+
+# Cache in front of the Google Search AgentTool: "memory", "sqlite" or "off".
+SEARCH_CACHE_BACKEND = os.getenv("CAMPAIGN_OPS_SEARCH_CACHE", "memory")
+SEARCH_CACHE_PATH = os.getenv(
+    "CAMPAIGN_OPS_SEARCH_CACHE_PATH", ".cache/search_cache.sqlite3"
+)
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("CAMPAIGN_OPS_SEARCH_CACHE_TTL", "86400"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("CAMPAIGN_OPS_SEARCH_CACHE_SIZE", "512"))
+
+# Shared model call scheduler (see rate_limit.py). 0 disables the RPM/TPM budget;
+# concurrency adapts to 429s between 1 and MODEL_MAX_CONCURRENCY per model.
+MODEL_REQUESTS_PER_MINUTE = float(os.getenv("CAMPAIGN_OPS_MODEL_RPM", "0"))
+MODEL_TOKENS_PER_MINUTE = float(os.getenv("CAMPAIGN_OPS_MODEL_TPM", "0"))
+MODEL_MAX_CONCURRENCY = int(os.getenv("CAMPAIGN_OPS_MODEL_MAX_CONCURRENCY", "16"))
+MODEL_MAX_RETRIES = int(os.getenv("CAMPAIGN_OPS_MODEL_MAX_RETRIES", "4"))
+
+# Model registry (see models.py): the model every agent uses unless overridden per
+# agent name ("planner_critic_agent=gemini-2.5-flash,..."), and the keep-alive HTTP
+# pool that all model clients share per event loop.
+MODEL_NAME = os.getenv("CAMPAIGN_OPS_MODEL", "gemini-2.5-flash-lite")
+MODEL_OVERRIDES = _mapping("CAMPAIGN_OPS_MODEL_OVERRIDES")
+# Model tiers, cheapest first. Overrides may name a tier instead of a model, and with
+# escalation on (see routing.py) an agent whose reply fails schema validation or
+# whose draft the critic rejects moves one tier up for the rest of the invocation.
+MODEL_TIERS = _mapping(
+    "CAMPAIGN_OPS_MODEL_TIERS", "fast=gemini-2.5-flash-lite,strong=gemini-2.5-flash"
+)
+MODEL_ESCALATION = _flag("CAMPAIGN_OPS_MODEL_ESCALATION")
+MODEL_CLIENT_POOL = _flag("CAMPAIGN_OPS_MODEL_CLIENT_POOL", "1")
+MODEL_MAX_CONNECTIONS = int(os.getenv("CAMPAIGN_OPS_MODEL_MAX_CONNECTIONS", "32"))
+MODEL_KEEPALIVE_SECONDS = float(os.getenv("CAMPAIGN_OPS_MODEL_KEEPALIVE", "60"))
+
+# Prompt token budgets (see token_budget.py): estimated tokens per model request for
+# every agent, overridden per agent or stage name ("reporter_agent=8000,delivery=6000");
+# 0 only records prompt sizes. Requests over budget lose low-priority context first.
+TOKEN_BUDGET = int(os.getenv("CAMPAIGN_OPS_TOKEN_BUDGET", "32000"))
+TOKEN_BUDGETS = {
+    name: int(tokens) for name, tokens in _mapping("CAMPAIGN_OPS_TOKEN_BUDGETS").items()
+}
+
+# Stage checkpoints (see checkpoints.py): "off", "write" (record stage outputs) or
+# "resume" (record, and skip stages whose inputs match a saved checkpoint).
+CHECKPOINT_MODE = os.getenv("CAMPAIGN_OPS_CHECKPOINTS", "off")
+CHECKPOINT_PATH = os.getenv(
+    "CAMPAIGN_OPS_CHECKPOINT_PATH", ".cache/checkpoints.sqlite3"
+)
+CHECKPOINT_TTL_SECONDS = float(os.getenv("CAMPAIGN_OPS_CHECKPOINT_TTL", "604800"))
+CHECKPOINT_MAX_ENTRIES = int(os.getenv("CAMPAIGN_OPS_CHECKPOINT_SIZE", "2048"))
+
+# Reuse of frontline_result across campaigns with similar briefs (see
+# similarity_cache.py): "memory", "sqlite" or "off". Briefs match when their TF-IDF
+# cosine similarity reaches the threshold and they name the same products and dates.
+FRONTLINE_CACHE_BACKEND = os.getenv("CAMPAIGN_OPS_FRONTLINE_CACHE", "off")
+FRONTLINE_CACHE_PATH = os.getenv(
+    "CAMPAIGN_OPS_FRONTLINE_CACHE_PATH", ".cache/frontline_cache.sqlite3"
+)
+FRONTLINE_CACHE_THRESHOLD = float(
+    os.getenv("CAMPAIGN_OPS_FRONTLINE_CACHE_THRESHOLD", "0.7")
+)
+FRONTLINE_CACHE_TTL_SECONDS = float(
+    os.getenv("CAMPAIGN_OPS_FRONTLINE_CACHE_TTL", "604800")
+)
+FRONTLINE_CACHE_MAX_ENTRIES = int(
+    os.getenv("CAMPAIGN_OPS_FRONTLINE_CACHE_SIZE", "1024")
+)
+
+# Session storage for the local runners (see sessions.py): "memory" (ADK's default)
+# or "sqlite", which persists sessions and compacts earlier turns once their events
+# exceed SESSION_COMPACT_TOKENS, keeping summaries of the last SESSION_KEEP_CAMPAIGNS.
+SESSION_BACKEND = os.getenv("CAMPAIGN_OPS_SESSIONS", "memory")
+SESSION_DB_PATH = os.getenv("CAMPAIGN_OPS_SESSION_DB", ".cache/sessions.sqlite3")
+SESSION_COMPACT_TOKENS = int(os.getenv("CAMPAIGN_OPS_SESSION_COMPACT_TOKENS", "20000"))
+SESSION_KEEP_CAMPAIGNS = int(os.getenv("CAMPAIGN_OPS_SESSION_KEEP_CAMPAIGNS", "10"))
+
+# Level passed to logging.basicConfig when the agent graph is built.
+LOG_LEVEL = os.getenv("CAMPAIGN_OPS_LOG_LEVEL", "INFO").upper()
+
+# Root agent: "orchestrator" (LLM calling the three stage AgentTools) or "pipeline"
+# (SequentialAgent running frontline -> planner -> delivery directly).
+ROOT_MODE = os.getenv("CAMPAIGN_OPS_ROOT", "orchestrator")
+
+# Forward stage progress (stage started/finished, loop rounds, critic verdicts, drafts)
+# to the caller while the stages run, as partial events (see progress.py).
+STREAM_PROGRESS = _flag("CAMPAIGN_OPS_STREAM_PROGRESS", "1")
+
+# Planner/delivery JSON outputs (see structured_output.py) are repaired locally; a
+# reply still missing required content is sent back to the model this many times.
+OUTPUT_REPROMPTS = int(os.getenv("CAMPAIGN_OPS_OUTPUT_REPROMPTS", "1"))
+
+# Run the deterministic checks in critic_checks.py before each critic model call;
+# drafts with mechanical gaps are sent back without an LLM review.
+CRITIC_PRECHECK = _flag("CAMPAIGN_OPS_CRITIC_PRECHECK", "1")
+
+# Delivery backend behind the delivery tools (see delivery_backends.py): "memory"
+# (in-process) or "http" (delivery_server.py or a service with the same API).
+DELIVERY_BACKEND = os.getenv("CAMPAIGN_OPS_DELIVERY_BACKEND", "memory")
+DELIVERY_URL = os.getenv("CAMPAIGN_OPS_DELIVERY_URL", "http://127.0.0.1:8765")
+DELIVERY_MAX_CONNECTIONS = int(os.getenv("CAMPAIGN_OPS_DELIVERY_MAX_CONNECTIONS", "20"))
+DELIVERY_TIMEOUT_SECONDS = float(os.getenv("CAMPAIGN_OPS_DELIVERY_TIMEOUT", "10"))
+# Latency injected into every in-process backend call, for load testing.
+DELIVERY_LATENCY_SECONDS = float(os.getenv("CAMPAIGN_OPS_DELIVERY_LATENCY", "0"))
+DELIVERY_JITTER_SECONDS = float(os.getenv("CAMPAIGN_OPS_DELIVERY_JITTER", "0"))
+
+# How delivery_result is assembled: "code" (copied from state in Python; the model
+# only writes the summary) or "llm" (one aggregator model call re-emits everything).
+DELIVERY_AGGREGATOR = os.getenv("CAMPAIGN_OPS_DELIVERY_AGGREGATOR", "code")
+
+# Audience sizing (see audience_engine.py): synthetic user table size, where its
+# memory-mapped columns are stored, and how many predicate bitmaps stay cached.
+AUDIENCE_USERS = int(os.getenv("CAMPAIGN_OPS_AUDIENCE_USERS", "1000000"))
+AUDIENCE_DATA_PATH = os.getenv("CAMPAIGN_OPS_AUDIENCE_PATH", ".cache/audience")
+AUDIENCE_CACHE_SIZE = int(os.getenv("CAMPAIGN_OPS_AUDIENCE_CACHE_SIZE", "256"))
+
+# OpenTelemetry export (see telemetry.py): "off", "console", "file" (OTLP/JSON lines
+# under TELEMETRY_PATH) or "otlp" (OTLP/HTTP to OTEL_EXPORTER_OTLP_ENDPOINT).
+TELEMETRY_EXPORTER = os.getenv("CAMPAIGN_OPS_TELEMETRY", "off")
+TELEMETRY_PATH = os.getenv("CAMPAIGN_OPS_TELEMETRY_PATH", ".cache/telemetry")
+TELEMETRY_METRICS_INTERVAL_SECONDS = float(
+    os.getenv("CAMPAIGN_OPS_TELEMETRY_METRICS_INTERVAL", "30")
+)
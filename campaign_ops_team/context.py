@@ -0,0 +1,95 @@
+import json
+import logging
+import re
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.utils.instructions_utils import inject_session_state
+
+logger = logging.getLogger(__name__)
+
+# Pseudo state key for the message that started the invocation: the user's brief
+# in pipeline mode, or the orchestrator's request when the stage runs as an AgentTool.
+REQUEST = "request"
+
+
+def parse_agent_json(value):
+    """Decodes an agent's JSON output, tolerating ```json fences; returns text as is otherwise."""
+    if not isinstance(value, str):
+        return value
+    match = re.search(r"```(?:json)?\s*(.*?)```", value, re.DOTALL)
+    try:
+        return json.loads(match.group(1) if match else value)
+    except json.JSONDecodeError:
+        return value
+
+
+def _request_text(context: ReadonlyContext) -> str:
+    content = context.user_content
+    if not content:
+        return ""
+    return "".join(part.text or "" for part in content.parts or [])
+
+
+def read_path(context: ReadonlyContext, path: str):
+    """Resolves `key.field.field` against session state (None when absent or empty).
+
+    A field applied to a list is applied to each item, e.g. `planner_result.segments.name`.
+    Falls back to the whole top-level value when it is not JSON, so a malformed
+    upstream output is passed through rather than dropped.
+    """
+    key, *fields = path.split(".")
+    value = _request_text(context) if key == REQUEST else context.state.get(key)
+    if value in (None, "", [], {}):
+        return None
+    if not fields:
+        return parse_agent_json(value)
+    node = parse_agent_json(value)
+    if isinstance(node, str):
+        logger.debug("%s is not JSON; passing the whole value for %s", key, path)
+        return node
+    for field in fields:
+        if isinstance(node, list):
+            node = [item.get(field) for item in node if isinstance(item, dict)]
+        elif isinstance(node, dict):
+            node = node.get(field)
+        else:
+            return None
+    return node
+
+
+def _render(value) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def input_line(context: ReadonlyContext, path: str) -> str | None:
+    """The line `ScopedInstruction` renders for `path` (None when the value is absent)."""
+    value = read_path(context, path)
+    if value is None:
+        return None
+    return f"    - {path}: {_render(value)}"
+
+
+class ScopedInstruction:
+    """Instruction provider for an agent's declared `reads` contract.
+
+    Renders `template` (with the usual `{key?}` state placeholders) followed by only
+    the state slices listed in `reads`. Agents using it set `include_contents="none"`,
+    so these slices plus the current turn are all the context they receive.
+    """
+
+    def __init__(self, template: str, reads: tuple[str, ...]):
+        self.template = template
+        self.reads = tuple(reads)
+
+    def __repr__(self) -> str:
+        # Stable across processes; checkpoint fingerprints hash it.
+        return f"ScopedInstruction({self.template!r}, reads={self.reads!r})"
+
+    async def __call__(self, context: ReadonlyContext) -> str:
+        instruction = await inject_session_state(self.template, context)
+        inputs = [line for path in self.reads if (line := input_line(context, path))]
+        if not inputs:
+            return instruction
+        return instruction + "\n    Inputs:\n" + "\n".join(inputs) + "\n"
@@ -0,0 +1,122 @@
+"""Deterministic checks run before the LLM critics.
+
+Mechanical gaps (a KPI target without a number, a segment without a size, an unknown
+channel, no launch window) are rejected here with precise feedback, so the LLM
+critics only review drafts that are structurally complete.
+"""
+
+import re
+from dataclasses import asdict, dataclass
+
+from pydantic import ValidationError
+
+from .context import parse_agent_json
+from .schemas import GoalPlan, SegmentsPlan
+
+CHANNELS = frozenset({"eligible", "email", "push", "omni"})
+
+INTAKE_FIELDS = ("goal", "possible_features", "best_case", "worst_case", "average_case")
+
+_NUMBER = re.compile(r"\d")
+
+
+@dataclass
+class CriticStats:
+    reviews: int = 0
+    precheck_rejections: int = 0  # rejected without a model call
+    llm_reviews: int = 0
+    llm_approvals: int = 0
+
+    @property
+    def approval_rate(self) -> float:
+        return self.llm_approvals / self.reviews if self.reviews else 0.0
+
+    def as_dict(self) -> dict:
+        return dict(
+            asdict(self),
+            llm_rejections=self.llm_reviews - self.llm_approvals,
+            approval_rate=self.approval_rate,
+        )
+
+
+CRITIC_STATS = {"frontline": CriticStats(), "planner": CriticStats()}
+
+
+def _has_number(value) -> bool:
+    return bool(_NUMBER.search(str(value or "")))
+
+
+def _parse(name: str, schema, value):
+    """Returns (model, []) for a valid draft, or (None, issues)."""
+    data = parse_agent_json(value)
+    if not isinstance(data, dict):
+        return None, [f"`{name}` is not a JSON object."]
+    try:
+        return schema.model_validate(data), []
+    except ValidationError as exc:
+        return None, [
+            f"`{name}.{'.'.join(map(str, error['loc']))}`: {error['msg']}."
+            for error in exc.errors()
+        ]
+
+
+def check_intake(intake_result) -> list[str]:
+    """Issues with the intake draft; an empty list means the LLM critic should review it."""
+    data = parse_agent_json(intake_result)
+    if not data:
+        return ["The intake produced no proposal."]
+    if isinstance(data, str):
+        # Prose intakes write the fields as "Best case:" or "possible-features".
+        text = re.sub(r"[\s-]+", "_", data.lower())
+        return [f"Missing `{field}`." for field in INTAKE_FIELDS if field not in text]
+    if not isinstance(data, dict):
+        return ["`intake_result` must be a JSON object."]
+    issues = [f"Missing `{field}`." for field in INTAKE_FIELDS if not data.get(field)]
+    issues += [
+        f'`{field}` must be quantified (e.g. "+14% QR transactions per user").'
+        for field in ("best_case", "average_case", "worst_case")
+        if data.get(field) and not _has_number(data[field])
+    ]
+    return issues
+
+
+def check_goal_plan(goal_plan) -> list[str]:
+    plan, issues = _parse("goal_plan", GoalPlan, goal_plan)
+    if plan is None:
+        return issues
+    for index, action in enumerate(plan.action_plan):
+        unknown = sorted({c.strip().lower() for c in action.channel_focus} - CHANNELS)
+        if unknown:
+            issues.append(
+                f"action_plan[{index}].channel_focus has {unknown}; "
+                f"use only {sorted(CHANNELS)}."
+            )
+        if not _has_number(action.quant_target.target_value):
+            issues.append(
+                f"action_plan[{index}].quant_target.target_value needs a number."
+            )
+    if not plan.measurement_plan.kpi_targets:
+        issues.append("measurement_plan.kpi_targets is empty.")
+    for target in plan.measurement_plan.kpi_targets:
+        if not _has_number(target.target):
+            issues.append(f"KPI target for `{target.metric}` needs a number.")
+    if not plan.schedule_intent.launch_window.strip():
+        issues.append("schedule_intent.launch_window is missing.")
+    return issues
+
+
+def check_segments_plan(segments_plan) -> list[str]:
+    plan, issues = _parse("segments_plan", SegmentsPlan, segments_plan)
+    if plan is None:
+        return issues
+    for segment in plan.segments:
+        if not _has_number(segment.estimated_size):
+            issues.append(f"Segment `{segment.name}` needs a numeric estimated_size.")
+        if segment.activation_channel.strip().lower() not in CHANNELS:
+            issues.append(
+                f"Segment `{segment.name}` activation_channel "
+                f"{segment.activation_channel!r} is not one of {sorted(CHANNELS)}."
+            )
+        if not segment.eligibility_attributes:
+            issues.append(f"Segment `{segment.name}` has no eligibility_attributes.")
+    return issues
@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import threading
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel
+
+from .audience_engine import AudienceRuleError, get_audience_engine
+from .config import (
+    DELIVERY_BACKEND,
+    DELIVERY_JITTER_SECONDS,
+    DELIVERY_LATENCY_SECONDS,
+    DELIVERY_MAX_CONNECTIONS,
+    DELIVERY_TIMEOUT_SECONDS,
+    DELIVERY_URL,
+)
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class AudienceSpec(BaseModel):
+    audience_name: str
+    rules: list[str]
+
+
+class CampaignSpec(BaseModel):
+    campaign_name: str
+    channel: str
+    details: str
+
+
+class DeliveryBackendError(Exception):
+    pass
+
+
+def _fingerprint(spec: dict) -> str:
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def _size(rules: list[str]) -> dict:
+    try:
+        size = get_audience_engine().size(rules)
+    except AudienceRuleError as exc:
+        return {"matched_users": None, "sizing_error": str(exc)}
+    return {"matched_users": size.matched_users, "total_users": size.total_users}
+
+
+class DeliveryStore:
+    """Thread-safe in-memory state behind both the in-process and the HTTP backend.
+
+    Creation is idempotent by name and spec, so a retried request returns the existing
+    audience or campaign instead of creating a duplicate. A name already used with a
+    different spec comes back with status "conflict" and an `error` instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.audiences: dict[str, dict] = {}
+        self.payloads: list[dict] = []
+        self.campaigns: dict[str, dict] = {}
+        self._fingerprints: dict[tuple[str, str], str] = {}
+
+    def _existing(self, kind: str, records: dict, name: str, spec: dict) -> dict | None:
+        """The reply for a name that is already taken, else None."""
+        existing = records.get(name)
+        if existing is None:
+            return None
+        if self._fingerprints[kind, name] == _fingerprint(spec):
+            return dict(existing, status="exists")
+        return {
+            f"{kind}_name": name,
+            "status": "conflict",
+            "error": f"{kind} {name!r} already exists with a different spec;"
+            " use another name",
+        }
+
+    def create_audiences(self, audiences: list[dict]) -> list[dict]:
+        # Sized outside the lock; sizing is cached, so a retried audience is cheap.
+        sizes = [_size(spec["rules"]) for spec in audiences]
+        results = []
+        with self._lock:
+            for spec, size in zip(audiences, sizes):
+                name = spec["audience_name"]
+                existing = self._existing("audience", self.audiences, name, spec)
+                if existing:
+                    results.append(existing)
+                    continue
+                record = {
+                    "audience_id": f"aud_{next(self._ids):05d}",
+                    "audience_name": spec["audience_name"],
+                    "rules": list(spec["rules"]),
+                    **size,
+                }
+                self.audiences[name] = record
+                self._fingerprints["audience", name] = _fingerprint(spec)
+                results.append(dict(record, status="created"))
+        return results
+
+    def register_payload(self, channel: str, payload: dict) -> dict:
+        with self._lock:
+            record = {
+                "payload_id": f"pl_{next(self._ids):05d}",
+                "channel": channel,
+                **payload,
+            }
+            self.payloads.append(record)
+        return dict(record, status="registered")
+
+    def create_campaigns(self, campaigns: list[dict]) -> list[dict]:
+        results = []
+        with self._lock:
+            for spec in campaigns:
+                name = spec["campaign_name"]
+                existing = self._existing("campaign", self.campaigns, name, spec)
+                if existing:
+                    results.append(existing)
+                    continue
+                record = {"campaign_id": f"cmp_{next(self._ids):05d}", **spec}
+                self.campaigns[name] = record
+                self._fingerprints["campaign", name] = _fingerprint(spec)
+                results.append(dict(record, status="created"))
+        return results
+
+
+class DeliveryBackend(ABC):
+    """Where the delivery tools send their work. Bulk calls are one round trip each."""
+
+    @abstractmethod
+    async def create_audiences(self, audiences: list[AudienceSpec]) -> list[dict]: ...
+
+    @abstractmethod
+    async def register_payload(self, channel: str, payload: dict) -> dict: ...
+
+    @abstractmethod
+    async def create_campaigns(self, campaigns: list[CampaignSpec]) -> list[dict]: ...
+
+    async def aclose(self) -> None:
+        pass
+
+
+class InMemoryDeliveryBackend(DeliveryBackend):
+    """In-process backend; `latency_s` (+ up to `jitter_s`) is added to every call."""
+
+    def __init__(self, latency_s: float = 0.0, jitter_s: float = 0.0, store=None):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.store = store or DeliveryStore()
+
+    async def _round_trip(self) -> None:
+        delay = self.latency_s + random.uniform(0, self.jitter_s)
+        if delay:
+            await asyncio.sleep(delay)
+
+    async def create_audiences(self, audiences):
+        await self._round_trip()
+        return self.store.create_audiences([a.model_dump() for a in audiences])
+
+    async def register_payload(self, channel, payload):
+        await self._round_trip()
+        return self.store.register_payload(channel, payload)
+
+    async def create_campaigns(self, campaigns):
+        await self._round_trip()
+        return self.store.create_campaigns([c.model_dump() for c in campaigns])
+
+
+class HttpDeliveryBackend(DeliveryBackend):
+    """Client for `delivery_server` (or a real service with the same API).
+
+    One pooled keep-alive `httpx.AsyncClient` per event loop is shared by every tool
+    call, so concurrent specialists reuse up to `max_connections` connections instead
+    of opening one per request.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 20, timeout_s=10.0):
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.timeout_s = timeout_s
+        self._clients: dict[asyncio.AbstractEventLoop, "httpx.AsyncClient"] = {}
+
+    def _client(self) -> "httpx.AsyncClient":
+        import httpx  # only the http backend needs it; keeps it off the import path
+
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            )
+            client = self._clients[loop] = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout_s,
+                # Retries connection failures only; requests themselves are idempotent.
+                transport=httpx.AsyncHTTPTransport(limits=limits, retries=2),
+            )
+        return client
+
+    async def _post(self, path: str, body: dict):
+        import httpx
+
+        try:
+            response = await self._client().post(path, json=body)
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            raise DeliveryBackendError(f"POST {path} failed: {exc!r}") from exc
+        return response.json()
+
+    async def create_audiences(self, audiences):
+        body = {"audiences": [a.model_dump() for a in audiences]}
+        return (await self._post("/audiences:batch", body))["audiences"]
+
+    async def register_payload(self, channel, payload):
+        return await self._post("/payloads", {"channel": channel, "payload": payload})
+
+    async def create_campaigns(self, campaigns):
+        body = {"campaigns": [c.model_dump() for c in campaigns]}
+        return (await self._post("/campaigns:batch", body))["campaigns"]
+
+    async def aclose(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+
+def _default_backend() -> DeliveryBackend:
+    if DELIVERY_BACKEND == "http":
+        return HttpDeliveryBackend(
+            DELIVERY_URL,
+            max_connections=DELIVERY_MAX_CONNECTIONS,
+            timeout_s=DELIVERY_TIMEOUT_SECONDS,
+        )
+    return InMemoryDeliveryBackend(DELIVERY_LATENCY_SECONDS, DELIVERY_JITTER_SECONDS)
+
+
+_backend: DeliveryBackend | None = None
+
+
+def get_delivery_backend() -> DeliveryBackend:
+    global _backend
+    if _backend is None:
+        _backend = _default_backend()
+    return _backend
+
+
+def set_delivery_backend(backend: DeliveryBackend | None) -> None:
+    """Replaces the backend used by the delivery tools (None restores the default)."""
+    global _backend
+    _backend = backend
@@ -0,0 +1,122 @@
+"""Local HTTP stand-in for the delivery systems (audiences, payloads, campaigns).
+
+uv run python -m campaign_ops_team.delivery_server --port 8765 --latency 0.05
+
+Point the agents at it with CAMPAIGN_OPS_DELIVERY_BACKEND=http. `--latency` and
+`--jitter` delay every request to load test the delivery stage.
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .delivery_backends import DeliveryStore
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # socketserver's default backlog of 5 drops SYNs when a pool opens its
+    # connections in a burst, and each dropped SYN costs a 1s retransmit.
+    request_queue_size = 128
+
+    def __init__(self, address, latency_s: float = 0.0, jitter_s: float = 0.0):
+        super().__init__(address, _Handler)
+        self.store = DeliveryStore()
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.requests = 0
+        self.connections = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> threading.Thread:
+        """Serves from a daemon thread; stop with `shutdown()`."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients reuse connections
+    # Headers and body are separate writes; with Nagle on, every keep-alive response
+    # would wait ~40ms for the client's delayed ACK.
+    disable_nagle_algorithm = True
+    server: DeliveryServer
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._reply(200, {"status": "ok"})
+        else:
+            self._reply(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        self.server.requests += 1
+        delay = self.server.latency_s + random.uniform(0, self.server.jitter_s)
+        if delay:
+            time.sleep(delay)
+        try:
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            store = self.server.store
+            if self.path == "/audiences:batch":
+                result = {"audiences": store.create_audiences(body["audiences"])}
+            elif self.path == "/payloads":
+                result = store.register_payload(body["channel"], body["payload"])
+            elif self.path == "/campaigns:batch":
+                result = {"campaigns": store.create_campaigns(body["campaigns"])}
+            else:
+                self._reply(404, {"error": f"unknown path {self.path}"})
+                return
+        except (KeyError, TypeError, ValueError) as exc:
+            self._reply(400, {"error": repr(exc)})
+            return
+        self._reply(200, result)
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to every request"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="extra random seconds per request"
+    )
+    args = parser.parse_args()
+
+    server = DeliveryServer((args.host, args.port), args.latency, args.jitter)
+    print(f"Delivery backend listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
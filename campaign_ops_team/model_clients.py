@@ -0,0 +1,97 @@
+"""Shared keep-alive HTTP clients for model calls.
+
+ADK's `Gemini` builds a `google.genai.Client`, and with it an httpx connection pool,
+per model instance, so every agent held its own connections. `CLIENT_POOL` hands out
+one genai client per retry profile instead, and all of them send through a single
+keep-alive `httpx.AsyncClient` per event loop, so concurrent sessions and agents reuse
+the same connections to the model endpoint.
+"""
+
+import asyncio
+from typing import TYPE_CHECKING
+
+import google.genai.types as types
+
+from .config import MODEL_KEEPALIVE_SECONDS, MODEL_MAX_CONNECTIONS
+
+if TYPE_CHECKING:  # both load with the first model call, not at import
+    import httpx
+    from google.genai import Client
+
+
+class ModelClientPool:
+    """genai clients keyed by retry options, sharing one HTTP pool per event loop.
+
+    httpx connections belong to the loop that opened them, so a new loop (e.g. a second
+    `asyncio.run`) gets new clients; those of closed loops are dropped.
+    """
+
+    def __init__(self, max_connections: int = 32, keepalive_s: float = 60.0):
+        self.max_connections = max_connections
+        self.keepalive_s = keepalive_s
+        self._http: dict[asyncio.AbstractEventLoop, "httpx.AsyncClient"] = {}
+        self._clients: dict[tuple[str, asyncio.AbstractEventLoop | None], "Client"] = {}
+
+    def _http_client(self, loop: asyncio.AbstractEventLoop) -> "httpx.AsyncClient":
+        import httpx
+
+        client = self._http.get(loop)
+        if client is None:
+            for closed in [l for l in self._http if l.is_closed()]:
+                del self._http[closed]
+            self._clients = {
+                key: c
+                for key, c in self._clients.items()
+                if key[1] is None or not key[1].is_closed()
+            }
+            client = self._http[loop] = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.keepalive_s,
+                ),
+                # genai sets its own per-request timeout when one is configured.
+                timeout=None,
+            )
+        return client
+
+    def client(
+        self,
+        retry_options: types.HttpRetryOptions | None,
+        headers: dict[str, str] | None = None,
+    ) -> "Client":
+        """The shared client for `retry_options` on the running loop.
+
+        Outside a running loop (sync calls, setup code) the client gets genai's own
+        async pool, since there is no loop to bind a shared one to.
+        """
+        from google.genai import Client
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        key = (retry_options.model_dump_json() if retry_options else "", loop)
+        client = self._clients.get(key)
+        if client is None:
+            http_options = types.HttpOptions(
+                headers=headers, retry_options=retry_options
+            )
+            if loop is not None:
+                http_options.httpx_async_client = self._http_client(loop)
+            client = self._clients[key] = Client(http_options=http_options)
+        return client
+
+    def stats(self) -> dict:
+        return {"http_pools": len(self._http), "clients": len(self._clients)}
+
+    async def aclose(self) -> None:
+        """Closes the running loop's HTTP pool (other loops' pools close with them)."""
+        loop = asyncio.get_running_loop()
+        client = self._http.pop(loop, None)
+        self._clients = {k: c for k, c in self._clients.items() if k[1] is not loop}
+        if client is not None:
+            await client.aclose()
+
+
+CLIENT_POOL = ModelClientPool(MODEL_MAX_CONNECTIONS, MODEL_KEEPALIVE_SECONDS)
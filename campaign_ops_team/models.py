@@ -0,0 +1,64 @@
+"""Model registry: which model each agent calls, with which retries and priority.
+
+Agents get their model from `get_model(agent_name, ...)` instead of building their
+own `Gemini`. The model is CAMPAIGN_OPS_MODEL unless CAMPAIGN_OPS_MODEL_OVERRIDES
+names the agent (with a model or a CAMPAIGN_OPS_MODEL_TIERS tier), and agents asking
+for the same model, retry profile and priority share one instance. Every instance
+calls through the shared `CLIENT_POOL` connections (see model_clients.py) and the
+shared `SCHEDULER` (see rate_limit.py). Escalation to a stronger tier during a run is
+applied per call by `routing.RoutingPlugin`.
+"""
+
+import functools
+
+import google.genai.types as types
+
+from .config import MODEL_NAME, MODEL_OVERRIDES, MODEL_TIERS
+from .rate_limit import Priority, ScheduledGemini
+
+# HTTP-level retries of transient server errors, by profile name.
+RETRY_PROFILES = {
+    "default": types.HttpRetryOptions(
+        attempts=2,
+        exp_base=3,
+        initial_delay=1,
+        http_status_codes=[500, 503, 504],  # 429s are retried by SCHEDULER
+    ),
+}
+
+
+def model_name(agent_name: str) -> str:
+    """The model `agent_name` starts on, after CAMPAIGN_OPS_MODEL_OVERRIDES."""
+    model = MODEL_OVERRIDES.get(agent_name, MODEL_NAME)
+    return MODEL_TIERS.get(model, model)
+
+
+def tier_name(model: str) -> str | None:
+    """The CAMPAIGN_OPS_MODEL_TIERS tier `model` belongs to, if any."""
+    return next((tier for tier, m in MODEL_TIERS.items() if m == model), None)
+
+
+def next_tier(model: str) -> str | None:
+    """The model one tier above `model`; None at the top or outside the tiers."""
+    ladder = list(MODEL_TIERS.values())
+    if model not in ladder or model == ladder[-1]:
+        return None
+    return ladder[ladder.index(model) + 1]
+
+
+@functools.cache
+def _model(model: str, retry_profile: str, priority: Priority) -> ScheduledGemini:
+    return ScheduledGemini(
+        model=model, retry_options=RETRY_PROFILES[retry_profile], priority=priority
+    )
+
+
+def get_model(
+    agent_name: str,
+    priority: Priority = Priority.NORMAL,
+    retry_profile: str = "default",
+) -> ScheduledGemini:
+    """The shared model instance for `agent_name`."""
+    if retry_profile not in RETRY_PROFILES:
+        raise ValueError(f"Unknown retry profile: {retry_profile!r}")
+    return _model(model_name(agent_name), retry_profile, priority)
@@ -0,0 +1,304 @@
+"""Progress events streamed to the caller while the stages run.
+
+A stage called through an AgentTool runs in a child runner, so none of its events reach
+the caller until the tool returns. `ProgressPlugin` (which child runners inherit)
+reports what happens inside the stages, and `stream_progress` merges those reports into
+the root agent's event stream as partial events, which the session does not store.
+
+Each progress event has text for simple clients and a payload under
+`custom_metadata["campaign_ops_progress"]`, whose `type` is one of:
+
+- `stage_started`: {"stage"}
+- `stage_finished`: {"stage", "elapsed_s"}, plus `"resumed": true` for a stage
+  restored from its checkpoint
+- `loop_iteration`: {"stage", "loop", "iteration"}
+- `critic_verdict`: {"stage", "critic", "verdict": "approved" | "revise", "issues"}
+- `partial_output`: {"stage", "key", "value"}, sent when a draft or a stage result
+  is written to state
+"""
+
+import asyncio
+import contextvars
+import re
+import time
+from typing import AsyncGenerator
+
+import google.genai.types as types
+from google.adk.agents import BaseAgent, LoopAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.utils.context_utils import Aclosing
+
+from .config import STREAM_PROGRESS
+from .context import parse_agent_json
+
+PROGRESS_METADATA_KEY = "campaign_ops_progress"
+
+STAGES = {
+    "frontline_manager_agent": "frontline",
+    "planner_manager_agent": "planner",
+    "delivery_agent": "delivery",
+}
+
+CRITICS = ("frontline_critic_agent", "planner_critic_agent")
+
+# Drafts and stage results reported as `partial_output`, in pipeline order.
+OUTPUT_KEYS = (
+    "intake_result",
+    "frontline_result",
+    "goal_plan",
+    "segments_plan",
+    "planner_result",
+    "eligibility_output",
+    "email_output",
+    "push_output",
+    "delivery_result",
+)
+
+# Set by `stream_progress` for the run it is merging; copied into the tasks that run
+# the stages, so plugin callbacks in child runners find it too.
+_PROGRESS_QUEUE: contextvars.ContextVar[asyncio.Queue | None] = contextvars.ContextVar(
+    "campaign_ops_progress_queue", default=None
+)
+_DONE = object()
+
+# A whole reply that approves without the APPROVED keyword.
+_BARE_APPROVAL = re.compile(
+    r"\W*(approved?|looks good( to me)?|lgtm|all good|no (blocking )?issues)\W*",
+    re.IGNORECASE,
+)
+
+
+def _emit(payload: dict) -> None:
+    queue = _PROGRESS_QUEUE.get()
+    if queue is not None:
+        queue.put_nowait(payload)
+
+
+def agent_stage(agent: BaseAgent | None) -> str | None:
+    while agent is not None:
+        if agent.name in STAGES:
+            return STAGES[agent.name]
+        agent = agent.parent_agent
+    return None
+
+
+def _event_stage(invocation_context: InvocationContext, event: Event) -> str | None:
+    # A stage's child runner has the stage as its agent; in pipeline mode the stage
+    # is on the event's branch.
+    stage = agent_stage(invocation_context.agent)
+    if stage:
+        return stage
+    for name in (event.branch or "").split("."):
+        if name in STAGES:
+            return STAGES[name]
+    return None
+
+
+def _summary(payload: dict) -> str:
+    stage = payload.get("stage")
+    kind = payload["type"]
+    if kind == "stage_started":
+        return f"[{stage}] started"
+    if kind == "stage_finished":
+        return f"[{stage}] finished in {payload['elapsed_s']:.1f}s"
+    if kind == "loop_iteration":
+        return f"[{stage}] {payload['loop']} round {payload['iteration']}"
+    if kind == "critic_verdict":
+        issues = len(payload["issues"])
+        suffix = f" ({issues} issue{'s' if issues != 1 else ''})" if issues else ""
+        return f"[{stage}] {payload['critic']}: {payload['verdict']}{suffix}"
+    return f"[{stage}] {payload['key']} ready"
+
+
+def progress_event(ctx: InvocationContext, payload: dict) -> Event:
+    return Event(
+        invocation_id=ctx.invocation_id,
+        author=ctx.agent.name,
+        branch=ctx.branch,
+        partial=True,
+        content=types.Content(role="model", parts=[types.Part(text=_summary(payload))]),
+        custom_metadata={PROGRESS_METADATA_KEY: payload},
+    )
+
+
+def progress_payload(event: Event) -> dict | None:
+    """The progress payload of `event`, or None for any other event."""
+    return (event.custom_metadata or {}).get(PROGRESS_METADATA_KEY)
+
+
+class ProgressPlugin(BasePlugin):
+    """Reports stage, loop, critic and output progress to the run's `stream_progress`.
+
+    Does nothing outside `stream_progress`. Keyed by invocation id because concurrent
+    runs and each AgentTool child runner share this one instance.
+    """
+
+    def __init__(self):
+        super().__init__(name="campaign_ops_progress")
+        self._stage_started: dict[tuple[str, str], float] = {}
+        self._iterations: dict[tuple[str, str], int] = {}
+
+    async def before_agent_callback(self, *, agent, callback_context):
+        if _PROGRESS_QUEUE.get() is None:
+            return None
+        key = (callback_context.invocation_id, agent.name)
+        if agent.name in STAGES:
+            self._stage_started[key] = time.perf_counter()
+            _emit({"type": "stage_started", "stage": STAGES[agent.name]})
+        elif isinstance(agent, LoopAgent):
+            self._iterations[key] = 0
+        loop = agent.parent_agent
+        if isinstance(loop, LoopAgent) and loop.sub_agents[0] is agent:
+            loop_key = (callback_context.invocation_id, loop.name)
+            self._iterations[loop_key] = self._iterations.get(loop_key, 0) + 1
+            _emit(
+                {
+                    "type": "loop_iteration",
+                    "stage": agent_stage(loop),
+                    "loop": loop.name,
+                    "iteration": self._iterations[loop_key],
+                }
+            )
+        return None
+
+    async def after_agent_callback(self, *, agent, callback_context):
+        if _PROGRESS_QUEUE.get() is None:
+            return None
+        key = (callback_context.invocation_id, agent.name)
+        if agent.name in STAGES:
+            self._finish_stage(key)
+        elif isinstance(agent, LoopAgent):
+            self._iterations.pop(key, None)
+        return None
+
+    async def on_event_callback(self, *, invocation_context, event):
+        if _PROGRESS_QUEUE.get() is None or progress_payload(event):
+            return None
+        key = (invocation_context.invocation_id, event.author)
+        if event.author in STAGES and key in self._stage_started and event.content:
+            # A stage skipped by its before-callback (a resumed checkpoint) gets no
+            # after-callback, so it finishes with the callback's event.
+            self._finish_stage(key, resumed=True)
+        delta = event.actions.state_delta
+        if event.author in CRITICS:
+            verdict = critic_verdict(event)
+            if verdict:
+                _emit(
+                    {
+                        "type": "critic_verdict",
+                        "stage": _event_stage(invocation_context, event),
+                        "critic": event.author,
+                        **verdict,
+                    }
+                )
+        if event.get_function_responses():
+            # An AgentTool's response repeats the state its stage already reported.
+            return None
+        for output_key in OUTPUT_KEYS:
+            if delta.get(output_key):
+                _emit(
+                    {
+                        "type": "partial_output",
+                        "stage": _event_stage(invocation_context, event),
+                        "key": output_key,
+                        "value": parse_agent_json(delta[output_key]),
+                    }
+                )
+        return None
+
+    def _finish_stage(self, key: tuple[str, str], resumed: bool = False) -> None:
+        started = self._stage_started.pop(key, None)
+        elapsed_s = time.perf_counter() - started if started else 0.0
+        payload = {
+            "type": "stage_finished",
+            "stage": STAGES[key[1]],
+            "elapsed_s": round(elapsed_s, 3),
+        }
+        if resumed:
+            payload["resumed"] = True
+        _emit(payload)
+
+
+def is_approval(text: str) -> bool:
+    """Whether a critic's prose reply approves the draft ("APPROVED", "Looks good.")."""
+    return "APPROVED" in text or bool(_BARE_APPROVAL.fullmatch(text.strip()))
+
+
+def critic_verdict(event: Event) -> dict | None:
+    """The verdict a critic's event records, if any.
+
+    The planner critic (and its pre-check) writes `planner_critic_feedback`; the
+    frontline critic approves by escalating and otherwise writes its `critique`.
+    """
+    delta = event.actions.state_delta
+    feedback = delta.get("planner_critic_feedback")
+    if isinstance(feedback, dict) and feedback.get("verdict"):
+        return {
+            "verdict": "approved" if feedback["verdict"] == "APPROVED" else "revise",
+            "issues": [
+                f"{issue['section']}: {issue['reason']}"
+                for issue in feedback.get("issues", [])
+            ],
+        }
+    if event.actions.escalate:
+        return {"verdict": "approved", "issues": []}
+    critique = delta.get("critique")
+    if critique and not is_approval(critique):
+        return {"verdict": "revise", "issues": [critique]}
+    return None
+
+
+async def stream_progress(
+    ctx: InvocationContext, events: AsyncGenerator[Event, None]
+) -> AsyncGenerator[Event, None]:
+    """Yields `events` with the progress of the stages they run merged in.
+
+    `events` is driven from a separate task so progress can be yielded while a stage
+    tool is still running, but each of its events is only resumed after the runner
+    has processed the previous one, exactly as if it were iterated directly. Closing
+    this generator (a client disconnecting) cancels the run.
+    """
+    if not STREAM_PROGRESS:
+        async with Aclosing(events) as agen:
+            async for event in agen:
+                yield event
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def drive():
+        try:
+            async with Aclosing(events) as agen:
+                async for event in agen:
+                    processed = asyncio.get_running_loop().create_future()
+                    queue.put_nowait((event, processed))
+                    await processed
+        finally:
+            queue.put_nowait(_DONE)
+
+    # Stays set while suspended at a yield, so the runner's own plugin callbacks
+    # (in pipeline mode, the stages' events) report to this queue as well.
+    token = _PROGRESS_QUEUE.set(queue)
+    task = asyncio.create_task(drive())
+    try:
+        while (item := await queue.get()) is not _DONE:
+            if isinstance(item, dict):
+                yield progress_event(ctx, item)
+                continue
+            event, processed = item
+            yield event
+            processed.set_result(None)
+        await task  # re-raises a failure inside the run
+    finally:
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        try:
+            _PROGRESS_QUEUE.reset(token)
+        except ValueError:  # closed from another context
+            pass
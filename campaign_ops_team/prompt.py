@@ -21,4 +21,7 @@ CAMPAIGN_ORCHESTRATOR_PROMPT = """
     Then transfer to the Frontline Group Agent.
 
     In the case that input has been defined the goals and objectives. Send the data to the Frontline Group Agent.
+
+    Each group's output is handed to the next group through session state. When calling `planner_manager_agent`
+    or `delivery_agent`, send a one-line request; DO NOT copy the previous group's JSON into it.
 """
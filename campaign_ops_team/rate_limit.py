@@ -0,0 +1,340 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import random
+import time
+from enum import IntEnum
+from typing import AsyncGenerator, Callable
+
+import google.genai.types as types
+from google.adk.models import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.utils.context_utils import Aclosing
+from google.genai.errors import ClientError
+from opentelemetry import trace
+
+from .config import (
+    MODEL_CLIENT_POOL,
+    MODEL_MAX_CONCURRENCY,
+    MODEL_MAX_RETRIES,
+    MODEL_REQUESTS_PER_MINUTE,
+    MODEL_TOKENS_PER_MINUTE,
+)
+from .model_clients import CLIENT_POOL
+from .telemetry import MODEL_QUEUE_WAIT, MODEL_RETRIES
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def delay(self, amount: float = 1.0) -> float:
+        """Seconds until `amount` tokens are available (0.0 if they already are)."""
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self._tokens) / self.rate)
+
+    def take(self, amount: float = 1.0) -> None:
+        """Removes tokens without waiting; the balance may go negative to repay overuse."""
+        self._refill()
+        self._tokens -= amount
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        async with self._lock:  # FIFO: waiters are served in arrival order
+            while (wait := self.delay(amount)) > 0:
+                await asyncio.sleep(wait)
+            self.take(amount)
+
+
+def _per_minute_bucket(limit: float) -> TokenBucket | None:
+    # Allow bursts of ~10 seconds' worth so a minute never exceeds the budget much.
+    return TokenBucket(rate=limit / 60, capacity=max(1.0, limit / 6)) if limit else None
+
+
+# Rough prompt size: ~4 characters per token.
+CHARS_PER_TOKEN = 4
+
+
+def content_chars(content: types.Content) -> int:
+    """Characters of a content's text, function call args and function responses."""
+    chars = 0
+    for part in content.parts or []:
+        if part.text:
+            chars += len(part.text)
+        elif part.function_call:
+            chars += len(json.dumps(part.function_call.args or {}, default=str))
+        elif part.function_response:
+            chars += len(json.dumps(part.function_response.response or {}, default=str))
+    return chars
+
+
+def estimate_request_tokens(llm_request: LlmRequest) -> int:
+    """Rough prompt size, used to charge the TPM bucket and check token budgets."""
+    config = llm_request.config
+    chars = len(str(config.system_instruction or "")) if config else 0
+    chars += sum(content_chars(content) for content in llm_request.contents)
+    return max(1, chars // CHARS_PER_TOKEN)
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    return isinstance(exc, ClientError) and exc.code == 429
+
+
+class Priority(IntEnum):
+    """Admission order when model calls queue up; lower values go first."""
+
+    CRITICAL = 0  # planner loop: every later stage waits on it
+    NORMAL = 1
+    BACKGROUND = 2  # delivery fan-out and search lookups
+
+
+class _ModelLane:
+    """Admission state for one model: rate buckets, AIMD concurrency and a priority queue."""
+
+    def __init__(self, rpm: float, tpm: float, max_concurrency: int):
+        self.loop = asyncio.get_running_loop()
+        self.requests = _per_minute_bucket(rpm)
+        self.tokens = _per_minute_bucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self._waiters: list[tuple[int, int, float, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self._last_decrease = 0.0
+
+    async def admit(self, priority: int, cost: float) -> None:
+        future = self.loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), cost, future))
+        self._grant()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.cancelled():  # granted just before the caller went away
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._grant()
+
+    def _grant(self) -> None:
+        while self._waiters:
+            _, _, cost, future = self._waiters[0]
+            if future.done():  # cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_flight >= int(self.limit):
+                return
+            wait = max(
+                self.requests.delay(1) if self.requests else 0.0,
+                self.tokens.delay(cost) if self.tokens else 0.0,
+            )
+            if wait > 0:
+                # Hold the head of the queue so a later, lower-priority call can't overtake it.
+                if self._timer is None:
+                    self._timer = self.loop.call_later(wait, self._on_timer)
+                return
+            heapq.heappop(self._waiters)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(cost)
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._grant()
+
+    def charge_tokens(self, amount: float) -> None:
+        if self.tokens and amount:
+            self.tokens.take(amount)
+
+    def on_success(self) -> None:
+        # Additive increase: about one more slot per `limit` successful calls.
+        self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        self._grant()
+
+    def on_rate_limited(self) -> None:
+        self.rate_limited += 1
+        now = time.monotonic()
+        # Multiplicative decrease, once per burst: calls already in flight when the
+        # quota ran out all fail together and should count as a single signal.
+        if now - self._last_decrease >= 1.0:
+            self.limit = max(1.0, self.limit / 2)
+            self._last_decrease = now
+            logger.warning(
+                "Model rate limited; concurrency limit lowered to %d", self.limit
+            )
+
+    def as_dict(self) -> dict:
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": sum(1 for *_, f in self._waiters if not f.done()),
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+        }
+
+
+class ModelScheduler:
+    """Process-wide admission control for model calls.
+
+    Every call to a model waits for a concurrency slot and for RPM/TPM budget, in
+    priority order. 429 responses halve that model's concurrency limit and are retried
+    after a fully jittered exponential backoff, so concurrent sessions don't retry in
+    lockstep; successful calls grow the limit back one slot at a time.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 16,
+        max_retries: int = 4,
+        base_delay_s: float = 1.0,
+        max_delay_s: float = 30.0,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self._lanes: dict[str, _ModelLane] = {}
+
+    def configure(self, **limits) -> None:
+        """Updates limits (same names as the constructor) and starts fresh lanes."""
+        for name, value in limits.items():
+            if not hasattr(self, name):
+                raise TypeError(f"Unknown scheduler limit: {name}")
+            setattr(self, name, value)
+        self._lanes.clear()
+
+    def _lane(self, model: str) -> _ModelLane:
+        lane = self._lanes.get(model)
+        # asyncio primitives belong to one loop; a new loop (e.g. a second asyncio.run)
+        # gets a new lane.
+        if lane is None or lane.loop is not asyncio.get_running_loop():
+            lane = self._lanes[model] = _ModelLane(
+                self.requests_per_minute, self.tokens_per_minute, self.max_concurrency
+            )
+        return lane
+
+    def backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay_s, self.base_delay_s * 2**attempt))
+
+    async def stream(
+        self,
+        model: str,
+        priority: int,
+        llm_request: LlmRequest,
+        call: Callable[[], AsyncGenerator[LlmResponse, None]],
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """Runs `call()` once admitted, retrying 429s that happen before any output."""
+        lane = self._lane(model)
+        estimated = estimate_request_tokens(llm_request)
+        span = trace.get_current_span()  # ADK's call_llm span
+        queued_s = 0.0
+        for attempt in range(self.max_retries + 1):
+            span.set_attribute(MODEL_RETRIES, attempt)
+            admit_started = time.monotonic()
+            await lane.admit(priority, estimated)
+            queued_s += time.monotonic() - admit_started
+            span.set_attribute(MODEL_QUEUE_WAIT, round(queued_s, 4))
+            # The last response is held back until the slot is released: ADK runs the
+            # tools it asks for (nested AgentTool calls included) while this generator
+            # is suspended at that yield, and they need slots of their own.
+            last, yielded = None, False
+            try:
+                async with Aclosing(call()) as responses:
+                    async for response in responses:
+                        usage = response.usage_metadata
+                        if usage and usage.total_token_count:
+                            lane.charge_tokens(usage.total_token_count - estimated)
+                            estimated = usage.total_token_count
+                        if last is not None:
+                            yielded = True
+                            yield last
+                        last = response
+            except ClientError as exc:
+                lane.release()
+                if not is_rate_limit_error(exc) or yielded:
+                    raise
+                lane.on_rate_limited()
+                if attempt == self.max_retries:
+                    raise
+            except BaseException:
+                lane.release()
+                raise
+            else:
+                lane.on_success()
+                lane.release()
+                if last is not None:
+                    yield last
+                return
+            lane.retries += 1
+            delay = self.backoff_delay(attempt)
+            span.add_event("rate_limited", {"attempt": attempt, "backoff_s": delay})
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {model: lane.as_dict() for model, lane in self._lanes.items()}
+
+
+SCHEDULER = ModelScheduler(
+    requests_per_minute=MODEL_REQUESTS_PER_MINUTE,
+    tokens_per_minute=MODEL_TOKENS_PER_MINUTE,
+    max_concurrency=MODEL_MAX_CONCURRENCY,
+    max_retries=MODEL_MAX_RETRIES,
+)
+
+
+class ScheduledGemini(Gemini):
+    """`Gemini` whose calls are admitted by the shared `SCHEDULER` at `priority`.
+
+    Calls go through `CLIENT_POOL`'s shared keep-alive connections rather than a
+    client of its own (unless CAMPAIGN_OPS_MODEL_CLIENT_POOL=0).
+    """
+
+    priority: int = Priority.NORMAL
+
+    @property
+    def api_client(self):
+        if not MODEL_CLIENT_POOL:
+            return super().api_client
+        return CLIENT_POOL.client(self.retry_options, self._tracking_headers)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        generate = super().generate_content_async
+        responses = SCHEDULER.stream(
+            llm_request.model or self.model,
+            self.priority,
+            llm_request,
+            lambda: generate(llm_request, stream),
+        )
+        async with Aclosing(responses) as agen:
+            async for response in agen:
+                yield response
@@ -0,0 +1,199 @@
+"""Model routing: tier escalation on failure, and latency and cost per model.
+
+Agents start on the model `models.get_model` assigns them. With
+CAMPAIGN_OPS_MODEL_ESCALATION on, an agent moves one CAMPAIGN_OPS_MODEL_TIERS tier up,
+for the rest of the invocation, when
+- its reply still fails schema validation after local repair (the re-prompt already
+  goes to the stronger tier; see structured_output.py), or
+- the critic reviewing its draft asks for a revision (the redraft goes there).
+
+`RoutingPlugin` applies the escalations to each model call and records every call in
+`ROUTER`'s per-model stats. Escalations are logged at INFO.
+"""
+
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+
+from google.adk.plugins.base_plugin import BasePlugin
+from opentelemetry import trace
+
+from .config import MODEL_ESCALATION
+from .models import next_tier, tier_name
+from .progress import critic_verdict
+from .telemetry import MODEL_ESCALATED, MODEL_TIER
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M prompt / completion tokens (list prices), for comparing tiers.
+MODEL_PRICES = {
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+# The drafting agent behind each section a critic can reject.
+CRITIC_DRAFTERS = {
+    "frontline_critic_agent": {"intake_result": "intake_agent"},
+    "planner_critic_agent": {
+        "goal_plan": "goal_planning_agent",
+        "segments_plan": "segmentation_discovery_agent",
+    },
+}
+
+
+@dataclass
+class ModelCallStats:
+    calls: int = 0
+    escalated_calls: int = 0  # calls made on a tier the agent was escalated to
+    latency_s: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    def as_dict(self, model: str) -> dict:
+        prices = MODEL_PRICES.get(model)
+        cost = (
+            (self.prompt_tokens * prices[0] + self.completion_tokens * prices[1]) / 1e6
+            if prices
+            else None
+        )
+        return dict(
+            asdict(self),
+            tier=tier_name(model),
+            mean_latency_s=self.latency_s / self.calls if self.calls else 0.0,
+            cost_usd=cost,
+        )
+
+
+class ModelRouter:
+    """Per-invocation escalations and process-wide per-model call stats."""
+
+    def __init__(self, escalation: bool = True):
+        self.escalation = escalation
+        self._escalated: dict[tuple[str, str], str] = {}
+        self.calls: dict[str, ModelCallStats] = {}
+        self.escalations: dict[str, int] = {}  # by reason
+
+    def model_for(self, invocation_id: str, agent_name: str, model: str) -> str:
+        return self._escalated.get((invocation_id, agent_name), model)
+
+    def escalate(
+        self, invocation_id: str, agent_name: str, model: str, reason: str
+    ) -> str | None:
+        """Moves `agent_name` one tier above `model`; None if there is none."""
+        if not self.escalation:
+            return None
+        stronger = next_tier(model)
+        if stronger is None:
+            return None
+        self._escalated[(invocation_id, agent_name)] = stronger
+        self.escalations[reason] = self.escalations.get(reason, 0) + 1
+        logger.info(
+            "Routing %s from %s to %s after %s", agent_name, model, stronger, reason
+        )
+        return stronger
+
+    def is_escalated(self, invocation_id: str, agent_name: str) -> bool:
+        return (invocation_id, agent_name) in self._escalated
+
+    def record(
+        self, model: str, latency_s: float, usage, escalated: bool = False
+    ) -> None:
+        stats = self.calls.setdefault(model, ModelCallStats())
+        stats.calls += 1
+        stats.escalated_calls += escalated
+        stats.latency_s += latency_s
+        if usage:
+            stats.prompt_tokens += usage.prompt_token_count or 0
+            stats.completion_tokens += usage.candidates_token_count or 0
+
+    def forget(self, invocation_id: str) -> None:
+        for key in [k for k in self._escalated if k[0] == invocation_id]:
+            del self._escalated[key]
+
+    def stats(self) -> dict:
+        return {
+            "models": {m: s.as_dict(m) for m, s in self.calls.items()},
+            "escalations": dict(self.escalations),
+        }
+
+
+ROUTER = ModelRouter(MODEL_ESCALATION)
+
+# (started, model, escalated) of the model call in flight; its before and after
+# callbacks run in the same task.
+_CALL: ContextVar[tuple[float, str, bool] | None] = ContextVar(
+    "routed_model_call", default=None
+)
+
+
+def _rejected_drafters(event) -> list[str]:
+    drafters = CRITIC_DRAFTERS.get(event.author)
+    if not drafters:
+        return []
+    verdict = critic_verdict(event)
+    if not verdict or verdict["verdict"] != "revise":
+        return []
+    feedback = event.actions.state_delta.get("planner_critic_feedback")
+    sections = {
+        issue.get("section") for issue in (feedback or {}).get("issues", [])
+    } & drafters.keys()
+    return [drafters[s] for s in sorted(sections)] or list(drafters.values())
+
+
+class RoutingPlugin(BasePlugin):
+    """Routes each model call to the agent's current tier and records it in `ROUTER`."""
+
+    def __init__(self, router: ModelRouter = ROUTER):
+        super().__init__(name="campaign_ops_routing")
+        self.router = router
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        invocation_id = callback_context.invocation_id
+        agent_name = callback_context.agent_name
+        llm_request.model = self.router.model_for(
+            invocation_id, agent_name, llm_request.model
+        )
+        _CALL.set(
+            (
+                time.perf_counter(),
+                llm_request.model,
+                self.router.is_escalated(invocation_id, agent_name),
+            )
+        )
+        return None
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        call = _CALL.get()
+        if call is None or llm_response.partial:
+            return None
+        _CALL.set(None)
+        started, model, escalated = call
+        self.router.record(
+            model, time.perf_counter() - started, llm_response.usage_metadata, escalated
+        )
+        span = trace.get_current_span()  # ADK's call_llm span
+        span.set_attribute(MODEL_TIER, tier_name(model) or model)
+        span.set_attribute(MODEL_ESCALATED, escalated)
+        return None
+
+    async def on_event_callback(self, *, invocation_context, event):
+        for drafter in _rejected_drafters(event):
+            current = self.router.model_for(
+                invocation_context.invocation_id,
+                drafter,
+                _agent_model(invocation_context, drafter),
+            )
+            self.router.escalate(
+                invocation_context.invocation_id, drafter, current, "critic"
+            )
+        return None
+
+    async def after_run_callback(self, *, invocation_context):
+        self.router.forget(invocation_context.invocation_id)
+
+
+def _agent_model(invocation_context, agent_name: str) -> str:
+    agent = invocation_context.agent.root_agent.find_agent(agent_name)
+    return agent.canonical_model.model if agent else ""
@@ -0,0 +1,307 @@
+"""Pydantic contracts for the JSON each planner and delivery agent hands downstream.
+
+Only the fields later stages cannot do without are required; everything else
+defaults, so a reply that is merely incomplete still validates. Models must not use
+bare `dict` fields: the Gemini API rejects `additionalProperties` in response schemas.
+"""
+
+from typing import Annotated
+
+from pydantic import (
+    BaseModel,
+    BeforeValidator,
+    ConfigDict,
+    Field,
+    StringConstraints,
+    model_validator,
+)
+
+
+def _as_list(value):
+    return [value] if isinstance(value, (str, dict)) else value
+
+
+# A required, non-empty string: blank values are the gaps worth a re-prompt.
+Text = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+# A lone string where a list is expected is wrapped rather than rejected.
+TextList = Annotated[list[str], BeforeValidator(_as_list)]
+
+
+class Contract(BaseModel):
+    """Lenient base: numbers are accepted as strings and nulls fall back to defaults."""
+
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _drop_nulls(cls, data):
+        if isinstance(data, dict):
+            return {key: value for key, value in data.items() if value is not None}
+        return data
+
+
+def _items(model):
+    return Annotated[list[model], BeforeValidator(_as_list)]
+
+
+# ---------------------------------------------------------------------------
+# Planner group
+# ---------------------------------------------------------------------------
+
+
+class KpiTarget(Contract):
+    metric: Text
+    baseline: str = ""
+    target: Text
+    unit: str = ""
+    timeframe: str = ""
+
+
+class QuantTarget(Contract):
+    metric: str = ""
+    target_value: str = ""
+    timeframe: str = ""
+
+
+class PlannedAction(Contract):
+    action: Text
+    channel_focus: TextList = []
+    how: str = ""
+    quant_target: QuantTarget = QuantTarget()
+    reward_logic: str = ""
+    consumer_message: str = ""
+    adapt_plan: str = ""
+    collaboration_owner: str = ""
+    success_metric: str = ""
+
+
+class MeasurementPlan(Contract):
+    primary_kpis: TextList = []
+    secondary_kpis: TextList = []
+    checkpoints: TextList = []
+    kpi_targets: _items(KpiTarget) = []
+
+
+class ScheduleIntent(Contract):
+    launch_window: str = ""
+    cadences: TextList = []
+    prerequisites: TextList = []
+
+
+class Collaboration(Contract):
+    team: str = ""
+    need: str = ""
+    status: str = ""
+
+
+class GoalPlan(Contract):
+    campaign_type: str = ""
+    campaign_name: Text
+    campaign_theme: str = ""
+    hero_promise: str = ""
+    primary_goal: Text
+    secondary_goals: TextList = []
+    action_plan: _items(PlannedAction) = Field(min_length=1)
+    measurement_plan: MeasurementPlan = MeasurementPlan()
+    schedule_intent: ScheduleIntent = ScheduleIntent()
+    collaboration_matrix: _items(Collaboration) = []
+    open_questions: TextList = []
+
+
+class Segment(Contract):
+    name: Text
+    campaign_alignment: str = ""
+    definition: Text
+    estimated_size: str = ""
+    eligibility_attributes: TextList = []
+    activation_channel: str = ""
+    tooling_or_integrations: TextList = []
+    collaboration_required: TextList = []
+    frequency_goal: str = ""
+    spend_goal: str = ""
+    reward_mechanics: str = ""
+    offer_copy: str = ""
+    cta_hint: str = ""
+    risks: TextList = []
+    next_best_action: str = ""
+
+
+class SegmentsPlan(Contract):
+    segment_overview: TextList = []
+    segments: _items(Segment) = Field(min_length=1)
+    tool_calls: TextList = []
+
+
+class CampaignMessage(Contract):
+    audience: str = ""
+    message: Text
+    timeframe: str = ""
+
+
+class SegmentEstimate(Contract):
+    name: str = ""
+    estimate: str = ""
+    # Filled from the audience engine after the reporter replies (see
+    # planner_agents.record_audience_overlap).
+    priority: int | None = None
+    matched_users: int | None = None
+    exclusive_users: int | None = None
+    exclusive_rules: TextList = []
+
+
+class SegmentOverlap(Contract):
+    segments: TextList = []
+    users: int | None = None
+    jaccard: float | None = None
+
+
+class AudienceSize(Contract):
+    total_estimate: str = ""
+    per_segment: _items(SegmentEstimate) = []
+    union_users: int | None = None
+    double_counted_users: int | None = None
+    overlaps: _items(SegmentOverlap) = []
+
+
+class SchedulePlan(Contract):
+    launch_window: str = ""
+    cadences: TextList = []
+    blockers: TextList = []
+
+
+class EligibilityBrief(Contract):
+    objective: Text
+    attributes: TextList = []
+    notes: str = ""
+    kpi_threshold: str = ""
+
+
+class EmailContentBrief(Contract):
+    subject: str = ""
+    body: str = ""
+    cta: str = ""
+
+
+class EmailBrief(Contract):
+    objective: Text
+    content_brief: EmailContentBrief = EmailContentBrief()
+    personalization: TextList = []
+    kpi_threshold: str = ""
+
+
+class PushContentBrief(Contract):
+    title: str = ""
+    body: str = ""
+    cta: str = ""
+
+
+class PushBrief(Contract):
+    objective: Text
+    content_brief: PushContentBrief = PushContentBrief()
+    personalization: TextList = []
+    kpi_threshold: str = ""
+
+
+class DeliveryPlan(Contract):
+    eligible: EligibilityBrief
+    email: EmailBrief
+    push: PushBrief
+
+
+class Risk(Contract):
+    risk: str = ""
+    severity: str = ""
+    mitigation: str = ""
+    owner: str = ""
+
+
+class References(Contract):
+    audience_tools_used: TextList = []
+    frontline_links: TextList = []
+    notes: str = ""
+
+
+class PlannerResult(Contract):
+    campaign_type: str = ""
+    campaign_name: Text
+    campaign_theme: str = ""
+    hero_promise: str = ""
+    primary_goal: str = ""
+    secondary_goals: TextList = []
+    campaign_messaging: _items(CampaignMessage) = []
+    segments: _items(Segment) = Field(min_length=1)
+    kpi_targets: _items(KpiTarget) = Field(min_length=1)
+    audience_size: AudienceSize = AudienceSize()
+    constraints: TextList = []
+    schedule_plan: SchedulePlan = SchedulePlan()
+    delivery_plan: DeliveryPlan
+    risks: _items(Risk) = []
+    confidence: float | None = Field(default=None, ge=0, le=1)
+    references: References = References()
+
+
+# ---------------------------------------------------------------------------
+# Delivery group
+# ---------------------------------------------------------------------------
+
+
+class EligibilityToolOutputs(Contract):
+    eligibility: str = ""
+    find_audience: str = ""
+    create_audience: str = ""
+    campaign_creation: str = ""
+
+
+class EligibilityOutput(Contract):
+    audience_name: Text
+    eligibility_rules: TextList = Field(min_length=1)
+    tool_outputs: EligibilityToolOutputs = EligibilityToolOutputs()
+    notes: str = ""
+
+
+class EmailOutput(Contract):
+    subject: Text
+    body: Text
+    cta: Text
+    personalization: TextList = []
+    kpi_threshold: str = ""
+    tool_output: str = ""
+    creation_result: str = ""
+    notes: str = ""
+
+
+class PushOutput(Contract):
+    title: Text
+    body: Text
+    cta: Text
+    personalization: TextList = []
+    kpi_threshold: str = ""
+    tool_output: str = ""
+    creation_result: str = ""
+    notes: str = ""
+
+
+class CreationEvents(Contract):
+    eligible: str = ""
+    email: str = ""
+    push: str = ""
+
+
+class DeliverySummary(Contract):
+    summary: Text
+
+
+class DeliveryResult(Contract):
+    campaign_name: Text
+    campaign_type: str = ""
+    campaign_theme: str = ""
+    hero_promise: str = ""
+    campaign_messaging: _items(CampaignMessage) = []
+    audience_reference: str = ""
+    eligible: EligibilityOutput
+    email: EmailOutput
+    push: PushOutput
+    kpi_targets: _items(KpiTarget) = []
+    launch_plan: SchedulePlan = SchedulePlan()
+    summary: Text
+    creation_events: CreationEvents = CreationEvents()
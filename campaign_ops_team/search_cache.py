@@ -0,0 +1,199 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from google.adk.tools import AgentTool
+from google.adk.tools.tool_context import ToolContext
+from opentelemetry import trace
+
+from .telemetry import CACHE_HIT
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive cache key for a search request."""
+    query = unicodedata.normalize("NFKC", query).lower()
+    return " ".join(re.sub(r"[^\w\s%]", " ", query).split())
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict:
+        return dict(asdict(self), hit_rate=self.hit_rate)
+
+
+# ---------------------------------------------------------------------------
+# Storage backends: get/set with absolute expiry, LRU eviction past max_entries
+# ---------------------------------------------------------------------------
+
+
+class InMemoryCacheStore:
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.stats.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        self._entries[key] = (time.time() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def items(self) -> list[tuple[str, Any]]:
+        """Unexpired (key, value) pairs, least recently used first."""
+        now = time.time()
+        return [
+            (k, v) for k, (expires_at, v) in self._entries.items() if expires_at > now
+        ]
+
+
+class SqliteCacheStore:
+    """On-disk store so cached values survive restarts and are shared across processes."""
+
+    def __init__(self, path: str, max_entries: int = 512, table: str = "search_cache"):
+        self.max_entries = max_entries
+        self.table = table
+        self.stats = CacheStats()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Any | None:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.stats.expirations += 1
+                return None
+            self._db.execute(
+                f"UPDATE {self.table} SET last_used = ? WHERE key = ?", (now, key)
+            )
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl_seconds, now),
+            )
+            evicted = self._db.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f" SELECT key FROM {self.table} ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        self.stats.evictions += max(0, evicted)
+
+    def items(self) -> list[tuple[str, Any]]:
+        """Unexpired (key, value) pairs, least recently used first."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT key, value FROM {self.table} WHERE expires_at > ?"
+                " ORDER BY last_used",
+                (time.time(),),
+            ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+
+def build_cache_store(
+    backend: str, path: str, max_entries: int, table: str = "search_cache"
+):
+    """Returns the store for `backend` ("memory", "sqlite"), or None when caching is off."""
+    if backend == "memory":
+        return InMemoryCacheStore(max_entries=max_entries)
+    if backend == "sqlite":
+        return SqliteCacheStore(path, max_entries=max_entries, table=table)
+    if backend in ("off", "none", ""):
+        return None
+    raise ValueError(f"Unknown cache backend: {backend!r}")
+
+
+class CachedAgentTool(AgentTool):
+    """AgentTool that answers repeated requests from a cache instead of rerunning the agent."""
+
+    def __init__(self, agent, store, ttl_seconds: float, skip_summarization=False):
+        super().__init__(agent=agent, skip_summarization=skip_summarization)
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.store.stats if self.store else CacheStats()
+
+    async def run_async(
+        self, *, args: dict[str, Any], tool_context: ToolContext
+    ) -> Any:
+        if self.store is None:
+            return await super().run_async(args=args, tool_context=tool_context)
+
+        key = normalize_query(args.get("request") or json.dumps(args, sort_keys=True))
+        cached = self.store.get(key)
+        trace.get_current_span().set_attribute(CACHE_HIT, cached is not None)
+        if cached is not None:
+            self.store.stats.hits += 1
+            logger.debug("%s cache hit: %s", self.name, key)
+            return cached
+
+        self.store.stats.misses += 1
+        # Concurrent identical requests share one agent run instead of racing.
+        if key in self._in_flight:
+            return await asyncio.shield(self._in_flight[key])
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await super().run_async(args=args, tool_context=tool_context)
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._in_flight[key]
+        future.set_result(result)
+        if result:
+            self.store.set(key, result, self.ttl_seconds)
+        return result
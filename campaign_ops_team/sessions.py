@@ -0,0 +1,256 @@
+"""SQLite session service that keeps long-lived sessions bounded.
+
+A client that sends every campaign into one session (see manual_operations/test.py)
+makes its event history grow with each campaign, and every turn loads, and the root
+agent re-reads, all of it. `CompactingSqliteSessionService` stores sessions in SQLite
+like ADK's `SqliteSessionService` and additionally:
+
+- at the start of a turn, once the earlier turns' events exceed `compact_tokens`
+  (estimated at ~4 characters per token), replaces them with one ADK compaction event
+  whose summary lists the last `keep_campaigns` briefs and their outcomes; ADK sends
+  that summary to the model in place of the replaced events;
+- during a turn, drops an agent's earlier output event once it writes the same
+  `output_key` again on the same branch, so a loop keeps only its latest draft. With
+  CAMPAIGN_OPS_ROOT=pipeline the critic loops run in the root session, on the
+  `root_agent.<stage>` branches; the orchestrator runs them in AgentTool child
+  sessions, where the root session only sees each stage's final output.
+
+Session state is untouched: it always holds the latest value of every key.
+"""
+
+import logging
+import os
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+
+import aiosqlite
+import google.genai.types as types
+from google.adk.events import Event, EventActions
+from google.adk.events.event_actions import EventCompaction
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
+from google.adk.sessions.sqlite_session_service import (
+    CREATE_SCHEMA_SQL,
+    PRAGMA_FOREIGN_KEYS,
+    SqliteSessionService,
+)
+
+from .config import (
+    SESSION_BACKEND,
+    SESSION_COMPACT_TOKENS,
+    SESSION_DB_PATH,
+    SESSION_KEEP_CAMPAIGNS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Campaigns summarized by a compaction event, as [{"brief", "outcome"}].
+COMPACTED_METADATA_KEY = "campaign_ops_compacted"
+
+_BRIEF_CHARS = 300
+_OUTCOME_CHARS = 600
+
+
+@dataclass
+class CompactionStats:
+    compactions: int = 0
+    events_compacted: int = 0
+    drafts_dropped: int = 0
+    tokens_before: int = 0  # estimated, summed over compactions
+    tokens_after: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _text(event: Event) -> str:
+    if not event.content or not event.content.parts:
+        return ""
+    return "".join(part.text or "" for part in event.content.parts if not part.thought)
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _campaigns(events: list[Event]) -> list[dict]:
+    """One {"brief", "outcome"} per turn, plus those earlier compactions kept."""
+    campaigns = []
+    turn = None
+    for event in events:
+        compacted = (event.custom_metadata or {}).get(COMPACTED_METADATA_KEY)
+        if compacted is not None:
+            campaigns.extend(compacted)
+        elif event.author == "user" and (
+            turn is None or turn["invocation_id"] != event.invocation_id
+        ):
+            turn = {"invocation_id": event.invocation_id, "brief": _text(event)}
+            campaigns.append(turn)
+        elif turn is not None and event.invocation_id == turn["invocation_id"]:
+            # The last text of the turn is its final reply.
+            turn["outcome"] = _text(event) or turn.get("outcome", "")
+    return [
+        {
+            "brief": _clip(c.get("brief", ""), _BRIEF_CHARS),
+            "outcome": _clip(c.get("outcome", ""), _OUTCOME_CHARS),
+        }
+        for c in campaigns
+    ]
+
+
+def _is_draft(event: Event) -> bool:
+    """A final text output (no tool calls) that only matters until it is rewritten."""
+    return bool(
+        event.actions.state_delta
+        and event.author != "user"
+        and not event.get_function_calls()
+        and not event.get_function_responses()
+    )
+
+
+def _size(event: Event) -> int:
+    return len(event.model_dump_json(exclude_none=True))
+
+
+class CompactingSqliteSessionService(SqliteSessionService):
+    """`SqliteSessionService` that compacts earlier turns and superseded loop drafts."""
+
+    def __init__(
+        self,
+        db_path: str,
+        compact_tokens: int = 20000,
+        keep_campaigns: int = 10,
+    ):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        super().__init__(db_path)
+        self.compact_tokens = compact_tokens
+        self.keep_campaigns = keep_campaigns
+        self.stats = CompactionStats()
+        self._schema_ready = False
+
+    @asynccontextmanager
+    async def _get_db_connection(self):
+        # Same as the base class, but the schema is created once, not per call.
+        async with aiosqlite.connect(self._db_path) as db:
+            db.row_factory = aiosqlite.Row
+            await db.execute(PRAGMA_FOREIGN_KEYS)
+            if not self._schema_ready:
+                await db.execute("PRAGMA journal_mode=WAL")
+                await db.executescript(CREATE_SCHEMA_SQL)
+                self._schema_ready = True
+            await db.execute("PRAGMA synchronous=NORMAL")
+            yield db
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        starts_turn = event.author == "user" and (
+            not session.events
+            or session.events[-1].invocation_id != event.invocation_id
+        )
+        if starts_turn:
+            await self._compact(session)
+        event = await super().append_event(session=session, event=event)
+        if _is_draft(event):
+            await self._drop_superseded(session, event)
+        return event
+
+    async def _compact(self, session: Session) -> None:
+        events = list(session.events)
+        tokens = sum(_size(e) for e in events) // 4
+        if not events or tokens < self.compact_tokens:
+            return
+        campaigns = _campaigns(events)[-self.keep_campaigns :]
+        summary = "Earlier campaigns in this session (most recent last):\n" + "\n".join(
+            f"- Brief: {c['brief']}\n  Outcome: {c['outcome'] or 'n/a'}"
+            for c in campaigns
+        )
+        compaction = Event(
+            author="user",
+            invocation_id=Event.new_id(),
+            timestamp=events[-1].timestamp,
+            actions=EventActions(
+                compaction=EventCompaction(
+                    start_timestamp=events[0].timestamp,
+                    end_timestamp=events[-1].timestamp,
+                    compacted_content=types.Content(
+                        role="model", parts=[types.Part(text=summary)]
+                    ),
+                )
+            ),
+            custom_metadata={COMPACTED_METADATA_KEY: campaigns},
+        )
+        async with self._get_db_connection() as db:
+            await db.executemany(
+                "DELETE FROM events WHERE app_name=? AND user_id=? AND session_id=?"
+                " AND id=?",
+                [(session.app_name, session.user_id, session.id, e.id) for e in events],
+            )
+            await db.execute(
+                "INSERT INTO events (id, app_name, user_id, session_id, invocation_id,"
+                " timestamp, event_data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    compaction.id,
+                    session.app_name,
+                    session.user_id,
+                    session.id,
+                    compaction.invocation_id,
+                    compaction.timestamp,
+                    compaction.model_dump_json(exclude_none=True),
+                ),
+            )
+            await db.commit()
+        session.events[:] = [compaction]
+        self.stats.compactions += 1
+        self.stats.events_compacted += len(events)
+        self.stats.tokens_before += tokens
+        self.stats.tokens_after += _size(compaction) // 4
+        logger.info(
+            "Compacted %d events (~%d tokens) of session %s into %d campaign summaries",
+            len(events),
+            tokens,
+            session.id,
+            len(campaigns),
+        )
+
+    async def _drop_superseded(self, session: Session, event: Event) -> None:
+        keys = event.actions.state_delta.keys()
+        superseded = []
+        for earlier in reversed(session.events[:-1]):
+            if earlier.invocation_id != event.invocation_id:
+                break
+            if (
+                earlier.author == event.author
+                and earlier.branch == event.branch
+                and _is_draft(earlier)
+                and earlier.actions.state_delta.keys() <= keys
+            ):
+                superseded.append(earlier)
+        if not superseded:
+            return
+        async with self._get_db_connection() as db:
+            await db.executemany(
+                "DELETE FROM events WHERE app_name=? AND user_id=? AND session_id=?"
+                " AND id=?",
+                [
+                    (session.app_name, session.user_id, session.id, e.id)
+                    for e in superseded
+                ],
+            )
+            await db.commit()
+        dropped = {id(e) for e in superseded}
+        session.events[:] = [e for e in session.events if id(e) not in dropped]
+        self.stats.drafts_dropped += len(superseded)
+
+
+def build_session_service(backend: str = SESSION_BACKEND) -> BaseSessionService:
+    """The session service for `backend` ("memory" or "sqlite")."""
+    if backend == "memory":
+        return InMemorySessionService()
+    if backend == "sqlite":
+        return CompactingSqliteSessionService(
+            SESSION_DB_PATH,
+            compact_tokens=SESSION_COMPACT_TOKENS,
+            keep_campaigns=SESSION_KEEP_CAMPAIGNS,
+        )
+    raise ValueError(f"Unknown session backend: {backend!r}")
@@ -0,0 +1,284 @@
+"""Reuse of a stage's output across campaigns whose briefs say the same thing.
+
+"Grow QR payments for high spenders in December" and "Boost QR spend among top users
+this December" need the same frontline analysis. `SimilarityCache` indexes past
+briefs as TF-IDF vectors over word stems and character 4-grams (no embedding
+service) and returns the stored output of the most similar one when its cosine
+similarity reaches the threshold.
+
+Two guards keep near-misses out:
+- anchors (numbers, months, quarters, seasons, plus whatever the caller adds, e.g. product
+  features, direction, audience and channel) must match exactly, so "in December" never answers "in January";
+- every entry carries a version (the stage's instructions plus a caller-supplied
+  data version); a lookup under another version ignores and drops it.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+import google.genai.types as types
+from google.adk.agents.callback_context import CallbackContext
+from opentelemetry import trace
+
+from .checkpoints import agent_fingerprint
+from .search_cache import normalize_query
+from .telemetry import SIMILARITY_HIT, SIMILARITY_SCORE
+
+logger = logging.getLogger(__name__)
+
+_STOP_WORDS = frozenset(
+    "a an and all among across at by for from in into of on or our the their this "
+    "these those to via with".split()
+)
+
+# Campaign verbs and qualifiers that mean the same thing in a brief.
+_SYNONYMS = {
+    **dict.fromkeys(
+        ("grow", "boost", "raise", "drive", "lift", "improve", "increase"), "increase"
+    ),
+    **dict.fromkeys(("cut", "reduce", "lower", "decrease"), "decrease"),
+    **dict.fromkeys(("top", "heavy", "high", "big"), "high"),
+    **dict.fromkeys(("customer", "customers", "user", "users"), "user"),
+}
+
+_SUFFIXES = ("ments", "ment", "ers", "er", "ing", "es", "ed", "s")
+
+_MONTHS = (
+    "jan feb mar apr may jun jul aug sep oct nov dec".split()
+    + "january february march april june july august september october november "
+    "december".split()
+)
+_SEASONS = frozenset(("spring", "summer", "autumn", "fall", "winter"))
+_NUMBER = re.compile(r"\d+(?:\.\d+)?%?")
+_QUARTER = re.compile(r"q[1-4]")
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+
+def features(text: str) -> Counter:
+    """Term counts of `text`: stems of its content words and their character 4-grams."""
+    terms = [
+        _SYNONYMS.get(word, _stem(word))
+        for word in normalize_query(text).split()
+        if word not in _STOP_WORDS
+    ]
+    counts = Counter(terms)
+    for term in terms:
+        padded = f"<{term}>"
+        counts.update(f"#{padded[i:i + 4]}" for i in range(len(padded) - 3))
+    return counts
+
+
+def date_and_number_anchors(text: str) -> frozenset[str]:
+    """Numbers, months, quarters and seasons in `text`; briefs must agree on these."""
+    anchors = set()
+    for word in normalize_query(text).split():
+        if _NUMBER.fullmatch(word) or _QUARTER.fullmatch(word):
+            anchors.add(word)
+        elif word in _MONTHS:
+            anchors.add(word[:3])
+        elif word in _SEASONS:
+            anchors.add("autumn" if word == "fall" else word)
+    return frozenset(anchors)
+
+
+@dataclass
+class SimilarityStats:
+    hits: int = 0
+    misses: int = 0
+    anchor_rejections: int = 0  # similar enough, but numbers/dates/products differ
+    stale: int = 0  # entries dropped because their version changed
+    score_total: float = 0.0  # summed similarity of hits
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict:
+        stats = asdict(self)
+        stats.pop("score_total")
+        return dict(
+            stats,
+            hit_rate=self.hit_rate,
+            mean_hit_similarity=self.score_total / self.hits if self.hits else 0.0,
+        )
+
+
+class SimilarityCache:
+    """TF-IDF nearest-neighbour lookup over stored texts, on top of a cache store.
+
+    Values live in `store` (InMemoryCacheStore or SqliteCacheStore, so they expire
+    and are evicted like other cache entries); the term index is kept in memory and
+    rebuilt from the store on first use. Candidates are the entries sharing at least
+    one word stem with the query.
+    """
+
+    def __init__(
+        self,
+        store,
+        threshold: float = 0.85,
+        ttl_seconds: float = 604800,
+        anchors: Callable[[str], frozenset[str]] = date_and_number_anchors,
+    ):
+        self.store = store
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.anchors = anchors
+        self.stats = SimilarityStats()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._entries: dict[str, tuple[str, Counter, frozenset]] = {}
+        self._postings: dict[str, set[str]] = {}
+        self._df: Counter = Counter()
+        self._norms: dict[str, float] = {}  # reset whenever the idf changes
+
+    def _add(self, key: str, version: str, text: str) -> None:
+        if key in self._entries:
+            return
+        terms = features(text)
+        self._entries[key] = (version, terms, self.anchors(text))
+        self._df.update(terms.keys())
+        self._norms.clear()
+        for term in terms:
+            if not term.startswith("#"):
+                self._postings.setdefault(term, set()).add(key)
+
+    def _remove(self, key: str) -> None:
+        _, terms, _ = self._entries.pop(key)
+        self._df.subtract(terms.keys())
+        self._norms.clear()
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings:
+                postings.discard(key)
+
+    def _load(self) -> None:
+        if not self._loaded:
+            self._loaded = True
+            for key, entry in self.store.items():
+                self._add(key, entry["version"], entry["text"])
+
+    def _idf(self, term: str) -> float:
+        return math.log((len(self._entries) + 1) / (1 + self._df[term])) + 1
+
+    def _norm(self, key: str) -> float:
+        norm = self._norms.get(key)
+        if norm is None:
+            terms = self._entries[key][1]
+            norm = self._norms[key] = math.sqrt(
+                sum((count * self._idf(t)) ** 2 for t, count in terms.items())
+            )
+        return norm
+
+    def lookup(self, text: str, version: str) -> tuple[object, float] | None:
+        """(value, similarity) of the closest entry above the threshold, or None."""
+        with self._lock:
+            self._load()
+            query = features(text)
+            anchors = self.anchors(text)
+            candidates = set().union(
+                *(self._postings.get(t, ()) for t in query if not t.startswith("#"))
+            )
+            stale = [k for k in candidates if self._entries[k][0] != version]
+            for key in stale:
+                self._remove(key)
+            self.stats.stale += len(stale)
+            idf = {term: self._idf(term) for term in query}
+            query_norm = math.sqrt(
+                sum((count * idf[t]) ** 2 for t, count in query.items())
+            )
+            best, best_score, anchor_mismatch = None, 0.0, False
+            for key in candidates.difference(stale):
+                _, terms, entry_anchors = self._entries[key]
+                score = sum(
+                    count * terms[t] * idf[t] ** 2
+                    for t, count in query.items()
+                    if t in terms
+                )
+                score /= (query_norm * self._norm(key)) or 1.0
+                if score < self.threshold:
+                    continue
+                if entry_anchors != anchors:
+                    anchor_mismatch = True
+                    continue
+                if score > best_score:
+                    best, best_score = key, score
+            entry = self.store.get(best) if best else None
+            if best and entry is None:  # expired or evicted from the store
+                self._remove(best)
+            if entry is None:
+                self.stats.misses += 1
+                self.stats.anchor_rejections += anchor_mismatch
+                return None
+            self.stats.hits += 1
+            self.stats.score_total += best_score
+            return entry["value"], best_score
+
+    def remember(self, text: str, version: str, value) -> None:
+        key = hashlib.sha256(
+            f"{version}\n{normalize_query(text)}".encode()
+        ).hexdigest()[:32]
+        entry = {"text": text, "version": version, "value": value}
+        with self._lock:
+            self._load()
+            self.store.set(key, entry, self.ttl_seconds)
+            self._add(key, version, text)
+
+
+def similarity_cached(
+    cache: SimilarityCache | None,
+    output_key: str,
+    text_key: str,
+    data_version: str = "",
+):
+    """Returns (before, after) agent callbacks that reuse `output_key` across similar inputs.
+
+    Before the stage runs, the text in state `text_key` is looked up; on a hit the
+    stage is skipped and the stored output restored. After it runs, its output is
+    remembered under that text. Entries are versioned by the stage's instructions and
+    `data_version`, so changing either invalidates them.
+    """
+
+    def version(callback_context: CallbackContext) -> str:
+        agent = callback_context._invocation_context.agent
+        return f"{data_version}:{agent_fingerprint(agent)}"
+
+    def before(callback_context: CallbackContext):
+        text = callback_context.state.get(text_key)
+        if cache is None or not text:
+            return None
+        found = cache.lookup(text, version(callback_context))
+        span = trace.get_current_span()
+        span.set_attribute(SIMILARITY_HIT, found is not None)
+        if found is None:
+            return None
+        value, score = found
+        span.set_attribute(SIMILARITY_SCORE, round(score, 4))
+        logger.info(
+            "Reusing %s of a similar brief (similarity %.2f)", output_key, score
+        )
+        callback_context.state[output_key] = value
+        text = value if isinstance(value, str) else json.dumps(value)
+        return types.Content(role="model", parts=[types.Part(text=text)])
+
+    def after(callback_context: CallbackContext):
+        text = callback_context.state.get(text_key)
+        value = callback_context.state.get(output_key)
+        if cache is not None and text and value:
+            cache.remember(text, version(callback_context), value)
+        return None
+
+    return before, after
@@ -0,0 +1,277 @@
+import json
+import logging
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+
+import google.genai.types as types
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.utils.context_utils import Aclosing
+from google.adk.utils.output_schema_utils import can_use_output_schema_with_tools
+from pydantic import BaseModel, ValidationError
+
+from .config import OUTPUT_REPROMPTS
+from .routing import ROUTER
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutputStats:
+    outputs: int = 0
+    valid: int = 0  # matched the schema as returned
+    repaired: int = 0  # fixed locally, i.e. a model retry saved
+    reprompted: int = 0  # semantic gaps sent back to the model
+    invalid: int = 0  # still invalid afterwards; passed downstream as is
+
+    @property
+    def failure_rate(self) -> float:
+        return (self.outputs - self.valid) / self.outputs if self.outputs else 0.0
+
+    def as_dict(self) -> dict:
+        return dict(
+            asdict(self), failure_rate=self.failure_rate, retries_saved=self.repaired
+        )
+
+
+# One entry per schema, filled by the `structured_output` callbacks.
+OUTPUT_STATS: dict[str, OutputStats] = {}
+
+
+def output_stats() -> dict:
+    """Per-schema validation stats plus a `total` row."""
+    total = OutputStats()
+    for stats in OUTPUT_STATS.values():
+        for field, value in asdict(stats).items():
+            setattr(total, field, getattr(total, field) + value)
+    report = {name: stats.as_dict() for name, stats in OUTPUT_STATS.items()}
+    report["total"] = total.as_dict()
+    return report
+
+
+# ---------------------------------------------------------------------------
+# Local JSON repair
+# ---------------------------------------------------------------------------
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def _complete_value(text: str) -> str | None:
+    """Cuts `text` after its first complete JSON value.
+
+    A value truncated mid-way (e.g. the model hit max tokens) is cut back to its last
+    complete member and its open brackets are closed.
+    """
+    closers, in_string, escaped = [], False, False
+    last_member = None
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if not closers or closers.pop() != char:
+                return None
+            if not closers:
+                return text[: index + 1]
+            last_member = (index + 1, list(closers))
+        elif char == "," and closers:
+            last_member = (index, list(closers))
+    if last_member is None:
+        return None
+    end, closers = last_member
+    return text[:end] + "".join(reversed(closers))
+
+
+def repair_json(text: str):
+    """Parses model output as JSON, fixing the usual defects locally.
+
+    Handles ```json fences, prose around the object, trailing commas and truncated
+    output. Raises ValueError when no JSON value can be recovered.
+    """
+    fence = _FENCE.search(text)
+    candidate = fence.group(1) if fence else text
+    starts = [i for i in (candidate.find("{"), candidate.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("the reply contains no JSON object")
+    candidate = _complete_value(_TRAILING_COMMA.sub(r"\1", candidate[min(starts) :]))
+    if candidate is None:
+        raise ValueError("the reply is not balanced JSON")
+    return json.loads(_TRAILING_COMMA.sub(r"\1", candidate))
+
+
+def _validate(schema: type[BaseModel], data) -> BaseModel:
+    try:
+        return schema.model_validate(data)
+    except ValidationError:
+        # Models sometimes wrap the object in its state key, e.g. {"goal_plan": {...}}.
+        if isinstance(data, dict) and len(data) == 1:
+            inner = next(iter(data.values()))
+            if isinstance(inner, dict):
+                return schema.model_validate(inner)
+        raise
+
+
+def _describe(exc: ValueError) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(map(str, error['loc'])) or 'reply'}: {error['msg']}"
+            for error in exc.errors()[:10]
+        )
+    return str(exc)
+
+
+def _final_text(llm_response: LlmResponse) -> str | None:
+    content = llm_response.content
+    if llm_response.partial or not content or not content.parts:
+        return None
+    if any(part.function_call for part in content.parts):
+        return None
+    text = "".join(
+        part.text for part in content.parts if part.text and not part.thought
+    )
+    return text if text.strip() else None
+
+
+# ---------------------------------------------------------------------------
+# Agent callbacks
+# ---------------------------------------------------------------------------
+
+# The request being answered, so a re-prompt can extend it; before/after model
+# callbacks of one call run in the same task.
+_PENDING_REQUEST: ContextVar[LlmRequest | None] = ContextVar(
+    "pending_request", default=None
+)
+
+
+async def _reprompt(
+    callback_context: CallbackContext,
+    schema: type[BaseModel],
+    reply: str,
+    problem: str,
+) -> str | None:
+    llm_request = _PENDING_REQUEST.get()
+    if llm_request is None:
+        return None
+    # A reply the model couldn't get right is retried one tier up (see routing.py).
+    model_name = ROUTER.escalate(
+        callback_context.invocation_id,
+        callback_context.agent_name,
+        llm_request.model,
+        "schema",
+    )
+    retry = LlmRequest(
+        model=model_name or llm_request.model,
+        contents=[
+            *llm_request.contents,
+            types.Content(role="model", parts=[types.Part(text=reply)]),
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part(
+                        text=f"Your reply does not match the required JSON schema: "
+                        f"{problem}. Reply again with the complete, corrected JSON "
+                        "object only."
+                    )
+                ],
+            ),
+        ],
+        config=llm_request.config.model_copy(
+            update={"tools": None, "tool_config": None}
+        ),
+    )
+    retry.set_output_schema(schema)
+    model = callback_context._invocation_context.agent.canonical_model
+    text, usage = None, None
+    started = time.perf_counter()
+    async with Aclosing(model.generate_content_async(retry)) as responses:
+        async for response in responses:
+            text = _final_text(response) or text
+            usage = response.usage_metadata or usage
+    ROUTER.record(
+        retry.model,
+        time.perf_counter() - started,
+        usage,
+        escalated=ROUTER.is_escalated(
+            callback_context.invocation_id, callback_context.agent_name
+        ),
+    )
+    return text
+
+
+def structured_output(schema: type[BaseModel]):
+    """Returns (before_model, after_model) agent callbacks that enforce `schema`.
+
+    The schema is sent as the response schema whenever the model allows it next to
+    the agent's tools. The final reply is then validated locally: syntax defects are
+    repaired without another model call, and only replies still missing required
+    content are sent back to the model (up to OUTPUT_REPROMPTS times). The reply is
+    rewritten as the validated JSON, so `output_key` stores clean JSON.
+    """
+    stats = OUTPUT_STATS.setdefault(schema.__name__, OutputStats())
+
+    def before_model(callback_context: CallbackContext, llm_request: LlmRequest):
+        agent = callback_context._invocation_context.agent
+        if not agent.tools or can_use_output_schema_with_tools(agent.canonical_model):
+            llm_request.set_output_schema(schema)
+        _PENDING_REQUEST.set(llm_request)
+        return None
+
+    async def after_model(callback_context: CallbackContext, llm_response: LlmResponse):
+        text = _final_text(llm_response)
+        if text is None:
+            return None
+        stats.outputs += 1
+        try:
+            schema.model_validate_json(text)
+            stats.valid += 1
+            return None
+        except ValidationError:
+            pass
+
+        for attempt in range(OUTPUT_REPROMPTS + 1):
+            try:
+                value = _validate(schema, repair_json(text))
+            except ValueError as exc:
+                problem = _describe(exc)
+            else:
+                if attempt == 0:
+                    stats.repaired += 1
+                    logger.info("Repaired %s output locally", schema.__name__)
+                return LlmResponse(
+                    content=types.Content(
+                        role="model",
+                        parts=[
+                            types.Part(text=value.model_dump_json(exclude_unset=True))
+                        ],
+                    ),
+                    usage_metadata=llm_response.usage_metadata,
+                )
+            if attempt == OUTPUT_REPROMPTS:
+                break
+            stats.reprompted += 1
+            logger.info("Re-prompting %s: %s", callback_context.agent_name, problem)
+            text = await _reprompt(callback_context, schema, text, problem)
+            if text is None:
+                break
+        stats.invalid += 1
+        logger.warning(
+            "%s output does not match %s: %s",
+            callback_context.agent_name,
+            schema.__name__,
+            problem,
+        )
+        return None
+
+    return before_model, after_model
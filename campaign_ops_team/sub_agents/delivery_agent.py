@@ -1,92 +1,188 @@
-import google.genai.types as types
-from google.adk.agents import LlmAgent, ParallelAgent, SequentialAgent
-from google.adk.models import Gemini
-from google.adk.tools.function_tool import FunctionTool
+import json
+import logging
+from typing import AsyncGenerator
 
-MODEL = "gemini-2.5-flash-lite"
-
-retry_config = types.HttpRetryOptions(
-    attempts=2,
-    exp_base=3,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
+import google.genai.types as types
+from google.adk.agents import BaseAgent, LlmAgent, ParallelAgent, SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from pydantic import ValidationError
+from ..checkpoints import checkpointed
+from ..config import DELIVERY_AGGREGATOR
+from ..delivery_backends import (
+    AudienceSpec,
+    CampaignSpec,
+    DeliveryBackendError,
+    get_delivery_backend,
 )
+from ..context import ScopedInstruction, parse_agent_json
+from ..schemas import (
+    DeliveryResult,
+    DeliverySummary,
+    EligibilityOutput,
+    EmailOutput,
+    PushOutput,
+)
+from ..structured_output import OUTPUT_STATS, OutputStats, structured_output
+from ..models import get_model
+from ..rate_limit import Priority
+from google.adk.tools.function_tool import FunctionTool
 
+logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
-# Local tool definitions (mock implementations for Delivery group)
+# Delivery tools: thin wrappers over the configured delivery backend. The bulk
+# tools take several items per call so a specialist needs one tool round.
 # ---------------------------------------------------------------------------
 
 
-def eligibility_tool(rules: str) -> str:
-    return f"Eligibility Rules Set: {rules}"
+async def _deliver(key: str, call) -> dict:
+    try:
+        return {"status": "ok", key: await call(get_delivery_backend())}
+    except (DeliveryBackendError, ValidationError) as exc:
+        return {"status": "error", "error": str(exc)}
+
 
+async def create_audiences_tool(audiences: list[AudienceSpec]) -> dict:
+    """Applies eligibility rules to, sizes and creates one or more audiences in a single call.
 
-def find_audience_tool(criteria: str) -> str:
-    return f"Audience Found: [Mock] criteria={criteria}, matched_users=42,000"
+    Args:
+        audiences: One entry per audience, e.g.
+            {"audience_name": "qr_high_spenders", "rules": ["spend >=10,000 THB in 90 days"]}.
 
+    Returns:
+        dict: {"status": "ok", "audiences": [...]} where each audience has `audience_id`,
+            `audience_name`, `rules`, `matched_users` (counted on the user table) and
+            `status` ("created", or "exists" when retried with the same rules). An audience
+            whose rules could not be read has `matched_users: null` and a `sizing_error`.
+            A name already used with different rules has status "conflict" and an
+            `error`; resend it under another name.
+    """
+    return await _deliver(
+        "audiences",
+        lambda backend: backend.create_audiences(
+            [AudienceSpec.model_validate(a) for a in audiences]
+        ),
+    )
 
-def create_audience_tool(audience_name: str, criteria: str) -> str:
-    return f"Audience Created: {audience_name} using {criteria}"
 
+async def email_tool(template_id: str, content: str) -> dict:
+    """Registers the email payload (template + full content) with the delivery backend."""
+    return await _deliver(
+        "payload",
+        lambda backend: backend.register_payload(
+            "email", {"template_id": template_id, "content": content}
+        ),
+    )
 
-def email_tool(template_id: str, content: str) -> str:
-    return f"Email Payload: template={template_id}, content={content[:60]}..."
 
+async def push_notification_tool(title: str, body: str) -> dict:
+    """Registers the push notification payload with the delivery backend."""
+    return await _deliver(
+        "payload",
+        lambda backend: backend.register_payload(
+            "push", {"title": title, "body": body}
+        ),
+    )
 
-def push_notification_tool(title: str, body: str) -> str:
-    return f"Push Payload: title={title}, body={body[:80]}..."
 
+async def create_campaigns_tool(campaigns: list[CampaignSpec]) -> dict:
+    """Creates one or more campaign artifacts in a single call.
 
-def campaign_creation_tool(campaign_name: str, details: str) -> str:
-    return f"Campaign Created: {campaign_name} | details={details[:80]}..."
+    Args:
+        campaigns: One entry per artifact, e.g. {"campaign_name": "QR Dash - Email",
+            "channel": "email", "details": "<one-line summary>"}; channel is one of
+            "eligible", "email", "push".
 
+    Returns:
+        dict: {"status": "ok", "campaigns": [...]} where each campaign has `campaign_id`,
+            `campaign_name`, `channel`, `details` and `status` ("created" or "exists"). A
+            name already used with different details has status "conflict" and an
+            `error`; resend it under another name.
+    """
+    return await _deliver(
+        "campaigns",
+        lambda backend: backend.create_campaigns(
+            [CampaignSpec.model_validate(c) for c in campaigns]
+        ),
+    )
+
+
+# Specialists are checkpointed individually so a failed aggregator (or one failed
+# specialist) doesn't rerun the others.
+resume_eligibility, checkpoint_eligibility = checkpointed(
+    "eligibility_output", ("planner_result",)
+)
+resume_email, checkpoint_email = checkpointed("email_output", ("planner_result",))
+resume_push, checkpoint_push = checkpointed("push_output", ("planner_result",))
+
+enforce_eligibility, repair_eligibility = structured_output(EligibilityOutput)
+enforce_email, repair_email = structured_output(EmailOutput)
+enforce_push, repair_push = structured_output(PushOutput)
+enforce_delivery_result, repair_delivery_result = structured_output(DeliveryResult)
+enforce_delivery_summary, repair_delivery_summary = structured_output(DeliverySummary)
 
 # Eligibility Specialist Agent
 eligibility_specialist_agent = LlmAgent(
     name="eligibility_specialist_agent",
-    model=Gemini(model=MODEL, retry_options=retry_config),
+    model=get_model("eligibility_specialist_agent", Priority.BACKGROUND),
     description="Prepares eligibility attributes and audience objects from planner instructions.",
-    instruction="""
+    instruction=ScopedInstruction(
+        """
     You are the Eligibility Specialist in the Delivery group. Consume `planner_result` and translate the
     delivery_plan.eligible guidance plus relevant segments into a concrete audience definition.
 
     Required steps:
     1. List the exact eligibility attributes/rules (e.g., ">=20 wallet transactions in 30 days", "spend >=10,000 THB").
-    2. Call `eligibility_tool` with a concise rule string to document the configuration.
-    3. Call `find_audience_tool` to simulate user counts and capture the result.
-    4. Call `create_audience_tool` to register the audience name that will be referenced downstream.
-    5. Call `campaign_creation_tool` to log the eligibility configuration as a campaign artifact (same
-       interface the other specialists use).
+    2. In ONE turn, call both tools:
+       - `create_audiences_tool` with every audience (name + rules); it applies the rules, sizes the
+         audience and registers the audience name that will be referenced downstream.
+       - `create_campaigns_tool` with the eligibility configuration as a campaign artifact
+         (channel "eligible"; same interface the other specialists use).
+    Create one audience per entry of `planner_result.audience_size.per_segment`, named after its segment, with
+    its `exclusive_rules` as rules: they are mutually exclusive, so no user lands in two audiences. Only for a
+    segment without `exclusive_rules`, use its eligibility attributes.
+    Write each rule as one field, a comparison and a number so it can be counted (e.g. "QR share below 35%",
+    "active in the last 7 days", "opted in to push", "spend between 1,000 and 5,000 THB", "top 10% spenders"). If an audience comes back with a `sizing_error`, say so
+    in "notes".
 
     If the planner output is missing any value, infer it from segments + KPI targets before proceeding. Provide
     JSON like {
       "audience_name": str,
       "eligibility_rules": [str],
       "tool_outputs": {
-          "eligibility": str,
-          "find_audience": str,
-          "create_audience": str,
-          "campaign_creation": str
+          "eligibility": str (rules applied),
+          "find_audience": str (matched_users),
+          "create_audience": str (audience_id),
+          "campaign_creation": str (campaign_id + status)
       },
       "notes": str
     }
     """,
-    tools=[
-        FunctionTool(eligibility_tool),
-        FunctionTool(find_audience_tool),
-        FunctionTool(create_audience_tool),
-        FunctionTool(campaign_creation_tool),
-    ],
+        reads=(
+            "planner_result.campaign_name",
+            "planner_result.delivery_plan.eligible",
+            "planner_result.segments",
+            "planner_result.kpi_targets",
+            "planner_result.audience_size",
+        ),
+    ),
+    include_contents="none",
+    tools=[FunctionTool(create_audiences_tool), FunctionTool(create_campaigns_tool)],
+    before_model_callback=enforce_eligibility,
+    after_model_callback=repair_eligibility,
     output_key="eligibility_output",
+    before_agent_callback=resume_eligibility,
+    after_agent_callback=checkpoint_eligibility,
 )
 
 # Email Specialist Agent
 email_specialist_agent = LlmAgent(
     name="email_specialist_agent",
-    model=Gemini(model=MODEL, retry_options=retry_config),
+    model=get_model("email_specialist_agent", Priority.BACKGROUND),
     description="Creates the email payload with full subject/body/CTA per planner delivery plan.",
-    instruction="""
+    instruction=ScopedInstruction(
+        """
     You are the Email Campaign Specialist. Use `planner_result.delivery_plan.email`, campaign_theme, hero_promise,
     and segments to craft consumer-facing creative that sounds like "Free Point Dash" or "Spend 10K THB in June,
     get 5% cashback on 10 trips in July". If any creative element is missing, derive it from the planner
@@ -104,20 +200,38 @@ email_specialist_agent = LlmAgent(
       "notes": str
     }
 
-    Always call `email_tool` with the template/content you construct and capture the response in `tool_output`.
-    After the payload is ready, call `campaign_creation_tool` with the email campaign name + summary and store
-    the response in `creation_result`.
+    In ONE turn, call `email_tool` with the template/content you construct and `create_campaigns_tool` with
+    the email campaign name + summary (channel "email"). Capture the payload response in `tool_output` and
+    the campaign creation response in `creation_result`. Address the campaign to the deduplicated audiences
+    in `audience_size.per_segment` (one per segment, no shared users), never to raw segment definitions, so
+    no user gets the email twice.
     """,
-    tools=[FunctionTool(email_tool), FunctionTool(campaign_creation_tool)],
+        reads=(
+            "planner_result.campaign_name",
+            "planner_result.campaign_theme",
+            "planner_result.hero_promise",
+            "planner_result.delivery_plan.email",
+            "planner_result.segments",
+            "planner_result.kpi_targets",
+            "planner_result.audience_size.per_segment",
+        ),
+    ),
+    include_contents="none",
+    tools=[FunctionTool(email_tool), FunctionTool(create_campaigns_tool)],
+    before_model_callback=enforce_email,
+    after_model_callback=repair_email,
     output_key="email_output",
+    before_agent_callback=resume_email,
+    after_agent_callback=checkpoint_email,
 )
 
 # Push Specialist Agent
 push_specialist_agent = LlmAgent(
     name="push_specialist_agent",
-    model=Gemini(model=MODEL, retry_options=retry_config),
+    model=get_model("push_specialist_agent", Priority.BACKGROUND),
     description="Creates push notification payload from planner delivery plan.",
-    instruction="""
+    instruction=ScopedInstruction(
+        """
     You are the Push Notification Specialist. Study `planner_result.delivery_plan.push`, campaign_theme, hero_promise,
     schedule, and KPIs to produce a ready-to-send push payload. If planner content is incomplete, infer the
     title/body/CTA and describe personalization logic derived from segments so that the push reads like a real
@@ -135,12 +249,33 @@ push_specialist_agent = LlmAgent(
       "notes": str
     }
 
-    Always call `push_notification_tool` with the payload you craft and record the response in `tool_output`.
-    After the payload is ready, call `campaign_creation_tool` with the push campaign name + summary and store
-    the response in `creation_result`.
+    In ONE turn, call `push_notification_tool` with the payload you craft and `create_campaigns_tool` with
+    the push campaign name + summary (channel "push"). Record the payload response in `tool_output` and
+    the campaign creation response in `creation_result`. Address the campaign to the deduplicated audiences
+    in `audience_size.per_segment` (one per segment, no shared users), never to raw segment definitions, so
+    no user gets the push twice.
     """,
-    tools=[FunctionTool(push_notification_tool), FunctionTool(campaign_creation_tool)],
+        reads=(
+            "planner_result.campaign_name",
+            "planner_result.campaign_theme",
+            "planner_result.hero_promise",
+            "planner_result.delivery_plan.push",
+            "planner_result.segments",
+            "planner_result.kpi_targets",
+            "planner_result.schedule_plan",
+            "planner_result.audience_size.per_segment",
+        ),
+    ),
+    include_contents="none",
+    tools=[
+        FunctionTool(push_notification_tool),
+        FunctionTool(create_campaigns_tool),
+    ],
+    before_model_callback=enforce_push,
+    after_model_callback=repair_push,
     output_key="push_output",
+    before_agent_callback=resume_push,
+    after_agent_callback=checkpoint_push,
 )
 
 # Run channel specialists in parallel
@@ -153,12 +288,13 @@ delivery_parallel_agent = ParallelAgent(
     ],
 )
 
-# Aggregator Agent
-delivery_aggregator_agent = LlmAgent(
+# Aggregator Agent ("llm" mode): re-emits every upstream field in one model call.
+llm_delivery_aggregator_agent = LlmAgent(
     name="delivery_aggregator_agent",
-    model=Gemini(model=MODEL, retry_options=retry_config),
+    model=get_model("delivery_aggregator_agent", Priority.BACKGROUND),
     description="Synthesizes channel outputs and finalizes campaign creation.",
-    instruction="""
+    instruction=ScopedInstruction(
+        """
     You are the Delivery Aggregator Agent. Combine `planner_result`, `eligibility_output`, `email_output`, and
     `push_output` to finalize the execution packet. If any specialist left placeholders or if planner data was
     incomplete, you must outline the missing content structure (objective, KPI thresholds, creative brief). Do not
@@ -187,11 +323,138 @@ delivery_aggregator_agent = LlmAgent(
     }
     Always describe any inferred content or KPIs you authored so downstream reviewers know what was assumed.
     """,
+        reads=(
+            "planner_result.campaign_name",
+            "planner_result.campaign_type",
+            "planner_result.campaign_theme",
+            "planner_result.hero_promise",
+            "planner_result.campaign_messaging",
+            "planner_result.kpi_targets",
+            "planner_result.schedule_plan",
+            "eligibility_output",
+            "email_output",
+            "push_output",
+        ),
+    ),
+    include_contents="none",
+    before_model_callback=enforce_delivery_result,
+    after_model_callback=repair_delivery_result,
     output_key="delivery_result",
 )
 
+# Summary Agent ("code" mode): the only model output the aggregator needs.
+delivery_summary_agent = LlmAgent(
+    name="delivery_summary_agent",
+    model=get_model("delivery_summary_agent", Priority.BACKGROUND),
+    description="Writes the summary of the finalized delivery packet.",
+    instruction=ScopedInstruction(
+        """
+    You are the Delivery Summary Agent. The channel specialists have created the campaign below. Write a
+    short summary (at most 3 sentences) of what will launch: audiences, channels, hero promise and timing.
+    Then name any content or KPIs the specialists inferred because the planner left them out (see their
+    notes), so downstream reviewers know what was assumed. Do not call tools.
+
+    Output JSON: {"summary": str}
+    """,
+        reads=(
+            "planner_result.campaign_name",
+            "planner_result.hero_promise",
+            "planner_result.kpi_targets.metric",
+            "planner_result.schedule_plan",
+            "eligibility_output.audience_name",
+            "eligibility_output.notes",
+            "email_output.subject",
+            "email_output.notes",
+            "push_output.title",
+            "push_output.notes",
+        ),
+    ),
+    include_contents="none",
+    before_model_callback=enforce_delivery_summary,
+    after_model_callback=repair_delivery_summary,
+    output_key="delivery_summary",
+)
+
+
+def _section(state, key: str) -> dict:
+    value = parse_agent_json(state.get(key))
+    return value if isinstance(value, dict) else {}
+
+
+def assemble_delivery_result(state) -> dict:
+    """Builds the `delivery_result` packet from planner and specialist outputs in state."""
+    planner = _section(state, "planner_result")
+    eligible = _section(state, "eligibility_output")
+    email = _section(state, "email_output")
+    push = _section(state, "push_output")
+    summary = _section(state, "delivery_summary").get("summary") or (
+        f"{planner.get('campaign_name', 'The campaign')} is ready: audience "
+        f"{eligible.get('audience_name', 'n/a')}, email and push created."
+    )
+    tool_outputs = eligible.get("tool_outputs")
+    return {
+        "campaign_name": planner.get("campaign_name", ""),
+        "campaign_type": planner.get("campaign_type", ""),
+        "campaign_theme": planner.get("campaign_theme", ""),
+        "hero_promise": planner.get("hero_promise", ""),
+        "campaign_messaging": planner.get("campaign_messaging", []),
+        "audience_reference": eligible.get("audience_name", ""),
+        "eligible": eligible,
+        "email": email,
+        "push": push,
+        "kpi_targets": planner.get("kpi_targets", []),
+        "launch_plan": planner.get("schedule_plan", {}),
+        "summary": summary,
+        "creation_events": {
+            "eligible": (
+                tool_outputs.get("campaign_creation", "")
+                if isinstance(tool_outputs, dict)
+                else ""
+            ),
+            "email": email.get("creation_result", ""),
+            "push": push.get("creation_result", ""),
+        },
+    }
+
+
+class DeliveryAggregatorAgent(BaseAgent):
+    """Assembles `delivery_result` from state without a model call."""
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        stats = OUTPUT_STATS.setdefault(DeliveryResult.__name__, OutputStats())
+        stats.outputs += 1
+        result = assemble_delivery_result(ctx.session.state)
+        try:
+            value = DeliveryResult.model_validate(result)
+        except ValidationError as exc:
+            stats.invalid += 1
+            logger.warning("Assembled delivery_result is incomplete: %s", exc)
+            output = json.dumps(result, ensure_ascii=False)
+        else:
+            stats.valid += 1
+            output = value.model_dump_json(exclude_unset=True)
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            # Also the stage's reply, as the LLM aggregator's was.
+            content=types.Content(role="model", parts=[types.Part(text=output)]),
+            actions=EventActions(state_delta={"delivery_result": output}),
+        )
+
+
 # Delivery Agent Pipeline
 delivery_agent = SequentialAgent(
     name="delivery_agent",
-    sub_agents=[delivery_parallel_agent, delivery_aggregator_agent],
+    sub_agents=(
+        [delivery_parallel_agent, llm_delivery_aggregator_agent]
+        if DELIVERY_AGGREGATOR == "llm"
+        else [
+            delivery_parallel_agent,
+            delivery_summary_agent,
+            DeliveryAggregatorAgent(name="delivery_aggregator_agent"),
+        ]
+    ),
 )
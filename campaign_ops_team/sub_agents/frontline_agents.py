@@ -1,48 +1,44 @@
+import functools
+import hashlib
+import json
+import re
+from types import MappingProxyType
+
+import google.genai.types as types
 from google.adk.agents import LlmAgent, LoopAgent, SequentialAgent
-from google.adk.models import Gemini
+from google.adk.agents.callback_context import CallbackContext
+from ..checkpoints import checkpointed
+from ..config import (
+    CRITIC_PRECHECK,
+    FRONTLINE_CACHE_BACKEND,
+    FRONTLINE_CACHE_MAX_ENTRIES,
+    FRONTLINE_CACHE_PATH,
+    FRONTLINE_CACHE_THRESHOLD,
+    FRONTLINE_CACHE_TTL_SECONDS,
+)
+from ..context import REQUEST, ScopedInstruction
+from ..critic_checks import CRITIC_STATS, check_intake
+from ..models import get_model
+from ..search_cache import build_cache_store
+from ..similarity_cache import (
+    SimilarityCache,
+    date_and_number_anchors,
+    similarity_cached,
+)
 from google.adk.tools.function_tool import FunctionTool
+from google.adk.tools.tool_context import ToolContext
 
-MODEL = "gemini-2.5-flash-lite"
 
+def _freeze(rows: list[dict]) -> tuple:
+    """Read-only snapshot rows, built once at import and shared by every tool call."""
+    return tuple(MappingProxyType(row) for row in rows)
 
-def internal_data_agent_tool(query: str) -> dict:
-    """
-    Provides company-wide FinTech KPIs and daily-used product features for use by agents.
-    This tool acts as the unified internal data source for Intake, Planner, and Critic agents.
-
-    It returns:
-    - The full list of company-wide KPIs (DAU, GMV, success rate, monetization metrics, etc.)
-    - The full list of commonly-used FinTech features (P2P transfer, QR payments, bill payment, etc.)
-    - A `mock_current_kpis` section that surfaces current baselines for a 1,000-user scale app so
-      Planner agents can set concrete KPI deltas and thresholds.
 
-    Query Behavior:
-        The `query` parameter is included for future semantic lookup or filtering,
-        but in this current version it returns the full dataset regardless of the query.
-        Agents typically pass values like "metrics", "features", "payments", or
-        "company health" when requesting internal references.
-
-    Intended Use:
-        • The Intake Agent uses this tool to understand platform context, goals, and constraints.
-        • The Planner/Marketing group uses it to estimate feasibility, segment behavior, and strategic planning.
-        • Critic Agents use it to validate assumptions, detect contradictions, and score plan quality.
-        • The Reporter Agent may compact or summarize this data before passing to Delivery.
-
-    Args:
-        query (str): A keyword or phrase used to request relevant internal data.
-                     Currently not used for filtering, but included for forward compatibility.
-
-    Returns:
-        dict: A dictionary containing:
-            - all_kpis: List of company-wide KPIs relevant to FinTech business performance.
-            - all_features: List of top daily-used FinTech features with metadata
-                            (category, goal, monetization logic, user journey).
-    """
-
-    # -------------------------
-    # Company-wide KPIs (5)
-    # -------------------------
-    company_wide_kpis = [
+# -------------------------
+# Company-wide KPIs (5)
+# -------------------------
+_COMPANY_WIDE_KPIS = _freeze(
+    [
         {
             "id": "active_users_dau",
             "name": "Daily Active Users",
@@ -74,11 +70,13 @@ def internal_data_agent_tool(query: str) -> dict:
             "reason": "Critical indicator for funnel efficiency and quarterly growth.",
         },
     ]
+)
 
-    # -------------------------
-    # Daily-used FinTech features (7)
-    # -------------------------
-    fintech_features = [
+# -------------------------
+# Daily-used FinTech features (7)
+# -------------------------
+_FINTECH_FEATURES = _freeze(
+    [
         {
             "id": "send_money_p2p",
             "name": "P2P Money Transfer",
@@ -136,11 +134,13 @@ def internal_data_agent_tool(query: str) -> dict:
             "brief_user_journey": "User selects bank → enters amount → confirms.",
         },
     ]
+)
 
-    # -------------------------
-    # Mock KPI baselines for a 1,000-user scale
-    # -------------------------
-    mock_current_kpis = [
+# -------------------------
+# Mock KPI baselines for a 1,000-user scale
+# -------------------------
+_MOCK_CURRENT_KPIS = _freeze(
+    [
         {
             "metric": "monthly_active_users",
             "value": 1000,
@@ -178,25 +178,238 @@ def internal_data_agent_tool(query: str) -> dict:
             "comment": "Share of users who redeem at least one voucher per month.",
         },
     ]
+)
+
+_SECTIONS = MappingProxyType(
+    {
+        "all_kpis": _COMPANY_WIDE_KPIS,
+        "all_features": _FINTECH_FEATURES,
+        "mock_current_kpis": _MOCK_CURRENT_KPIS,
+    }
+)
+
+# Fields whose words are searchable, per section.
+_INDEXED_FIELDS = {
+    "all_kpis": ("id", "name"),
+    "all_features": ("id", "name", "category"),
+    "mock_current_kpis": ("metric",),
+}
+
+# Generic words that select a whole section rather than single entries.
+_SECTION_ALIASES = {
+    "kpi": ("all_kpis",),
+    "metric": ("all_kpis", "mock_current_kpis"),
+    "feature": ("all_features",),
+    "product": ("all_features",),
+    "baseline": ("mock_current_kpis",),
+    "mock": ("mock_current_kpis",),
+    "current": ("mock_current_kpis",),
+}
+
+
+def _terms(text: str) -> list[str]:
+    """Lower-cases, splits on non-alphanumerics and strips a plural "s"."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return [
+        w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+        for w in words
+    ]
+
+
+def _build_index() -> dict[str, frozenset]:
+    index = {}
+    for section, fields in _INDEXED_FIELDS.items():
+        for position, row in enumerate(_SECTIONS[section]):
+            for field in fields:
+                for term in _terms(str(row[field])):
+                    index.setdefault(term, set()).add((section, position))
+    return {term: frozenset(hits) for term, hits in index.items()}
+
+
+_INDEX = MappingProxyType(_build_index())
+
+# Words that name one product feature in a brief, keyed (like the brief's words and
+# bigrams) after `_terms`. Two briefs only share a frontline analysis when they name
+# the same features.
+_FEATURE_WORDS = {
+    "qr_payment_offline": "qr",
+    "send_money_p2p": "p2p peer",
+    "bill_payments": "bills utility utilities",
+    "topup_mobile": "topups airtime",
+    "cashback_rewards": "cashback vouchers",
+    "transaction_history": "history",
+    "linked_bank_transfer": "bank withdrawals",
+}
+_FEATURE_ALIASES = {
+    term: feature
+    for feature, words in _FEATURE_WORDS.items()
+    for word in words.split()
+    for term in _terms(word)
+}
+
+# Words (after `_terms`, bigrams joined) that set a brief's direction, audience or
+# channel. Briefs that differ in any of these need their own analysis, however alike
+# the rest of their wording.
+_QUALIFIER_WORDS = {
+    "direction:increase": "grow growing boost raise drive lift improve increase "
+    "increasing more",
+    "direction:decrease": "reduce reducing cut lower decrease decreasing decline drop "
+    "fewer less",
+    "audience:high": "high top heavy big premium",
+    "audience:low": "low light small occasional",
+    "audience:new": "new",
+    "audience:existing": "existing returning loyal",
+    "audience:inactive": "inactive dormant lapsed churned",
+    "channel:email": "email",
+    "channel:sms": "sms",
+    "channel:push": "pushnotification pushmessage viapush",
+    "channel:only": "only exclusively",
+}
+_QUALIFIERS = {
+    term: anchor
+    for anchor, words in _QUALIFIER_WORDS.items()
+    for word in words.split()
+    for term in _terms(word)
+}
+
+# Changes whenever the internal data changes, invalidating outputs derived from it.
+INTERNAL_DATA_VERSION = hashlib.sha256(
+    json.dumps(
+        {section: [dict(row) for row in rows] for section, rows in _SECTIONS.items()},
+        sort_keys=True,
+    ).encode()
+).hexdigest()[:16]
+
 
+def brief_anchors(brief: str) -> frozenset[str]:
+    """Numbers, dates, product features, direction, audience and channel a brief names."""
+    terms = _terms(brief)
+    # Normalized like single words, so "top-ups" and "top up" both give "topup".
+    bigrams = [_terms(a + b)[0] for a, b in zip(terms, terms[1:])]
+    words = terms + bigrams
+    features = {_FEATURE_ALIASES[w] for w in words if w in _FEATURE_ALIASES}
+    topup = {
+        i
+        for i, bigram in enumerate(bigrams)
+        if _FEATURE_ALIASES.get(bigram) == "topup_mobile"
+    }
+    # The words of "top up" name the feature, not an audience.
+    plain = [t for i, t in enumerate(terms) if i not in topup and i - 1 not in topup]
+    qualifiers = {_QUALIFIERS[w] for w in plain + bigrams if w in _QUALIFIERS}
+    return date_and_number_anchors(brief) | features | qualifiers
+
+
+_EVERYTHING = MappingProxyType(
+    {section: tuple(range(len(rows))) for section, rows in _SECTIONS.items()}
+)
+
+
+def _normalize(query: str) -> str:
+    query = query.strip().lower()
+    return query if query in _SECTIONS else " ".join(_terms(query))
+
+
+@functools.lru_cache(maxsize=256)
+def _select(normalized_query: str) -> MappingProxyType:
+    """Maps each section to the positions of its matching rows (everything when nothing matches)."""
+    if normalized_query in _SECTIONS:
+        return MappingProxyType({normalized_query: _EVERYTHING[normalized_query]})
+
+    hits = set()
+    for term in normalized_query.split():
+        for section in _SECTION_ALIASES.get(term, ()):
+            hits.update((section, position) for position in _EVERYTHING[section])
+        hits.update(_INDEX.get(term, ()))
+    if not hits:
+        return _EVERYTHING
+    return MappingProxyType(
+        {
+            section: tuple(sorted(p for s, p in hits if s == section))
+            for section in _SECTIONS
+        }
+    )
+
+
+def internal_data_agent_tool(query: str) -> dict:
+    """
+    Provides company-wide FinTech KPIs and daily-used product features for use by agents.
+    This tool acts as the unified internal data source for Intake, Planner, and Critic agents.
+
+    It returns:
+    - Company-wide KPIs (DAU, GMV, success rate, monetization metrics, etc.)
+    - Commonly-used FinTech features (P2P transfer, QR payments, bill payment, etc.)
+    - A `mock_current_kpis` section that surfaces current baselines for a 1,000-user scale app so
+      Planner agents can set concrete KPI deltas and thresholds.
+
+    Query Behavior:
+        Only entries matching the `query` keywords are returned, matched against KPI ids/names,
+        feature ids/names/categories and `mock_current_kpis` metric names. For example,
+        "payments" returns the payment features and the payment-volume KPI, "qr" returns the
+        QR feature and the QR transaction share baseline.
+        Generic words select whole sections: "kpis", "features", "metrics", "baselines".
+        A section name ("all_kpis", "all_features", "mock_current_kpis") returns only that section.
+        An empty query, "all", or a query with no matching keyword returns the full dataset.
+
+    Intended Use:
+        • The Intake Agent uses this tool to understand platform context, goals, and constraints.
+        • The Planner/Marketing group uses it to estimate feasibility, segment behavior, and strategic planning.
+        • Critic Agents use it to validate assumptions, detect contradictions, and score plan quality.
+        • The Reporter Agent may compact or summarize this data before passing to Delivery.
+
+    Args:
+        query (str): A keyword or phrase used to request relevant internal data.
+
+    Returns:
+        dict: A dictionary containing the matching entries of:
+            - all_kpis: Company-wide KPIs relevant to FinTech business performance.
+            - all_features: Top daily-used FinTech features with metadata
+                            (category, goal, monetization logic, user journey).
+            - mock_current_kpis: Current KPI baselines for the 1,000-user reference app.
+    """
+    selection = _select(_normalize(query))
     return {
-        "all_kpis": company_wide_kpis,
-        "all_features": fintech_features,
-        "mock_current_kpis": mock_current_kpis,
+        section: [dict(rows[p]) for p in selection.get(section, ())]
+        for section, rows in _SECTIONS.items()
     }
 
 
-def exit_loop():
+def exit_loop(tool_context: ToolContext):
     """Call this function ONLY when the critique is 'APPROVED', indicating the analysis is finished and no more changes are needed."""
+    CRITIC_STATS["frontline"].llm_approvals += 1
+    # Escalating is what actually stops the enclosing LoopAgent.
+    tool_context.actions.escalate = True
+    tool_context.actions.skip_summarization = True
     return {"status": "approved"}
 
 
+def reset_frontline_drafts(callback_context: CallbackContext):
+    # The intake agent gets its previous draft and critique as inputs; don't carry
+    # them over from an earlier campaign in the same session.
+    callback_context.state["intake_result"] = ""
+    callback_context.state["critique"] = ""
+
+
+def precheck_intake(callback_context: CallbackContext):
+    """Sends a mechanically incomplete intake back without calling the critic model."""
+    stats = CRITIC_STATS["frontline"]
+    stats.reviews += 1
+    issues = check_intake(callback_context.state.get("intake_result"))
+    if not CRITIC_PRECHECK or not issues:
+        stats.llm_reviews += 1
+        return None
+    stats.precheck_rejections += 1
+    critique = "Fix these before review:\n" + "\n".join(f"- {i}" for i in issues)
+    callback_context.state["critique"] = critique
+    return types.Content(role="model", parts=[types.Part(text=critique)])
+
+
 # Intake Agent
 intake_agent = LlmAgent(
     name="intake_agent",
-    model=Gemini(model=MODEL),
+    model=get_model("intake_agent"),
     description="Discover possible features that fit the goal of the user request by taking a look in internal metrics and product features.",
-    instruction="""
+    instruction=ScopedInstruction(
+        """
     You are the Intake Agent. Your goal is to discover possible features that fit the goal of the user request.
     User will provide a short metric goal or complex goal. Your work will be to find the best possible features that fit the goal.
     Use the `internal_data_agent_tool` to get context about product features and company metrics.
@@ -209,7 +422,11 @@ intake_agent = LlmAgent(
     - best_case (optimistic outcome scenario if the campaign performs exceptionally well)
     - worst_case (negative outcome scenario if the campaign fails or underperforms)
     - average_case (expected or most likely outcome scenario under typical conditions)
+    Quantify each case against a baseline (e.g. "QR transactions per user rise from 2.9 to 3.3/month").
     """,
+        reads=(REQUEST, "intake_result", "critique"),
+    ),
+    include_contents="none",
     tools=[FunctionTool(func=internal_data_agent_tool)],
     output_key="intake_result",
 )
@@ -217,15 +434,20 @@ intake_agent = LlmAgent(
 # Frontline Critic Agent
 frontline_critic_agent = LlmAgent(
     name="frontline_critic_agent",
-    model=Gemini(model=MODEL),
+    model=get_model("frontline_critic_agent"),
     description="Evaluates the Intake Agent's output.",
-    instruction="""
+    instruction=ScopedInstruction(
+        """
     You are the Frontline Critic Agent. Your goal is to evaluate the Intake Agent's output for realism, missing elements, and conflicts.
     Evaluate the latest proposal.
     If the intake is good, output "APPROVED" and call the `exit_loop` tool.
     If there are issues, explain them clearly so the intake agent can fix them.
     """,
+        reads=(REQUEST, "intake_result"),
+    ),
+    include_contents="none",
     tools=[FunctionTool(func=exit_loop)],
+    before_agent_callback=precheck_intake,
     output_key="critique",
 )
 
@@ -234,13 +456,15 @@ product_market_estimation_loop = LoopAgent(
     name="ProductMarketEstimationLoop",
     sub_agents=[intake_agent, frontline_critic_agent],
     max_iterations=2,  # Prevents infinite loops
+    before_agent_callback=reset_frontline_drafts,
 )
 
 frontline_evidence_agent = LlmAgent(
     name="frontline_evidence_agent",
-    model=Gemini(model=MODEL),
+    model=get_model("frontline_evidence_agent"),
     description="Gathers evidence to support final feature selection.",
-    instruction="""
+    instruction=ScopedInstruction(
+        """
     You are the final Frontline agent before the Planner group receives context. Take the latest
     approved intake package and produce a structured summary.
 
@@ -251,11 +475,43 @@ frontline_evidence_agent = LlmAgent(
     - worst_case (negative outcome scenario if the campaign fails or underperforms)
     - average_case (expected or most likely outcome scenario under typical conditions)
     """,
+        reads=("intake_result",),
+    ),
+    include_contents="none",
     output_key="frontline_result",
 )
 
 # Frontline Manager Agent
+resume_frontline, checkpoint_frontline = checkpointed(
+    "frontline_result", ("campaign_brief",)
+)
+
+# Shared across campaigns: a brief similar to an earlier one reuses its analysis.
+_frontline_cache_store = build_cache_store(
+    FRONTLINE_CACHE_BACKEND,
+    FRONTLINE_CACHE_PATH,
+    FRONTLINE_CACHE_MAX_ENTRIES,
+    table="frontline_cache",
+)
+FRONTLINE_CACHE = (
+    SimilarityCache(
+        _frontline_cache_store,
+        threshold=FRONTLINE_CACHE_THRESHOLD,
+        ttl_seconds=FRONTLINE_CACHE_TTL_SECONDS,
+        anchors=brief_anchors,
+    )
+    if _frontline_cache_store is not None
+    else None
+)
+reuse_frontline, remember_frontline = similarity_cached(
+    FRONTLINE_CACHE,
+    "frontline_result",
+    "campaign_brief",
+    data_version=INTERNAL_DATA_VERSION,
+)
 frontline_manager_agent = SequentialAgent(
     name="frontline_manager_agent",
     sub_agents=[product_market_estimation_loop, frontline_evidence_agent],
+    before_agent_callback=[resume_frontline, reuse_frontline],
+    after_agent_callback=[checkpoint_frontline, remember_frontline],
 )
@@ -1,21 +1,19 @@
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
+from ..models import get_model
+from ..rate_limit import Priority
 from google.adk.tools.google_search_tool import google_search
-import google.genai.types as types
-
-MODEL = "gemini-2.5-flash-lite"
-
-retry_config = types.HttpRetryOptions(
-    attempts=2,
-    exp_base=3,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
+from ..config import (
+    SEARCH_CACHE_BACKEND,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_PATH,
+    SEARCH_CACHE_TTL_SECONDS,
 )
+from ..search_cache import CachedAgentTool, build_cache_store
 
 # Google Search Agent
 search_agent = LlmAgent(
     name="google_search_agent",
-    model=Gemini(model=MODEL, retry_options=retry_config),
+    model=get_model("google_search_agent", Priority.BACKGROUND),
     description="Supports competitive research, seasonal patterns, industry insights.",
     instruction="""
     You are the Google Search Agent. Your goal is to provide competitive research, seasonal patterns, and industry insights.
@@ -23,3 +21,12 @@ search_agent = LlmAgent(
     """,
     tools=[google_search],
 )
+
+# Shared by every agent that needs search, so repeated queries hit one cache.
+search_agent_tool = CachedAgentTool(
+    agent=search_agent,
+    store=build_cache_store(
+        SEARCH_CACHE_BACKEND, SEARCH_CACHE_PATH, SEARCH_CACHE_MAX_ENTRIES
+    ),
+    ttl_seconds=SEARCH_CACHE_TTL_SECONDS,
+)
@@ -1,31 +1,354 @@
+import json
+import logging
+from typing import AsyncGenerator
+
 import google.genai.types as types
-from google.adk.agents import LlmAgent, LoopAgent, SequentialAgent
-from google.adk.tools import AgentTool
+from google.adk.agents import (
+    BaseAgent,
+    LlmAgent,
+    LoopAgent,
+    ParallelAgent,
+    SequentialAgent,
+)
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
 from google.adk.tools.function_tool import FunctionTool
-from google.adk.models import Gemini
-from .google_search_agent import search_agent
+from google.adk.tools.google_search_tool import google_search
+from google.adk.tools.tool_context import ToolContext
+from google.adk.models.llm_response import LlmResponse
+from ..checkpoints import checkpointed
+from ..models import get_model
+from ..rate_limit import Priority
+from ..config import CRITIC_PRECHECK, PLANNER_LOOP_MODE, PLANNER_PARALLEL
+from ..context import ScopedInstruction, parse_agent_json
+from ..critic_checks import CRITIC_STATS, check_goal_plan, check_segments_plan
+from ..progress import is_approval
+from ..delivery_backends import AudienceSpec
+from ..schemas import GoalPlan, PlannerResult, SegmentsPlan
+from ..audience_engine import find_audience_tool, get_audience_engine
+from ..structured_output import structured_output
+from .google_search_agent import search_agent_tool
 from .frontline_agents import internal_data_agent_tool
 
-MODEL = "gemini-2.5-flash-lite"
+logger = logging.getLogger(__name__)
+
+PLANNER_MAX_ITERATIONS = 3
+
+
+def segment_group_preparing_tool(segments: list[AudienceSpec]) -> dict:
+    """Materializes segments from their eligibility rules and reports how they overlap.
+
+    Pass every segment in priority order, highest first: a user matching several segments
+    is assigned to the earliest, and `exclusive_users` is what each segment keeps.
+
+    Args:
+        segments: One entry per segment, e.g.
+            {"audience_name": "High Spenders - Low QR",
+             "rules": ["spend >=10,000 THB in 90 days", "QR share below 35%"]}.
+
+    Returns:
+        dict: per segment `priority`, `matched_users` and `exclusive_users`; pairwise
+        `overlaps` (`users`, `jaccard`); `union_users` and `double_counted_users`; and
+        `errors` for segments whose rules could not be read.
+    """
+    specs = [AudienceSpec.model_validate(segment) for segment in segments]
+    report = get_audience_engine().overlap(
+        [(spec.audience_name, spec.rules) for spec in specs]
+    )
+    for segment in report["segments"]:
+        del segment["exclusive_rules"]  # Delivery gets these through planner_result
+    return {"status": "ok", **report}
+
+
+def approve_plan(tool_context: ToolContext) -> dict:
+    """Call this function ONLY when both `goal_plan` and `segments_plan` are APPROVED. It ends the planner loop so no further revision round runs."""
+    iterations = tool_context.state.get("planner_iterations", PLANNER_MAX_ITERATIONS)
+    saved = max(0, PLANNER_MAX_ITERATIONS - iterations)
+    tool_context.state["planner_critic_feedback"] = {
+        "verdict": "APPROVED",
+        "issues": [],
+    }
+    tool_context.state["planner_revision_sections"] = []
+    tool_context.state["planner_iterations_saved"] = saved
+    CRITIC_STATS["planner"].llm_approvals += 1
+    tool_context.actions.escalate = True
+    tool_context.actions.skip_summarization = True
+    logger.info("Planner approved after %d iteration(s), %d saved", iterations, saved)
+    return {"status": "approved", "iterations_saved": saved}
+
+
+def request_revision(
+    goal_plan_issues: list[str],
+    segments_plan_issues: list[str],
+    tool_context: ToolContext,
+) -> dict:
+    """Call this function when the plans are NOT approved. List each blocking issue under the section that must change: `goal_plan_issues` for the goal plan, `segments_plan_issues` for the segments. Leave a list empty when that section is fine."""
+    sections = _record_revision(
+        tool_context.state, goal_plan_issues, segments_plan_issues
+    )
+    tool_context.actions.skip_summarization = True
+    return {"status": "revise", "sections": sections}
+
+
+def _record_revision(state, goal_plan_issues, segments_plan_issues) -> list[str]:
+    issues = [{"section": "goal_plan", "reason": r} for r in goal_plan_issues] + [
+        {"section": "segments_plan", "reason": r} for r in segments_plan_issues
+    ]
+    sections = sorted({issue["section"] for issue in issues})
+    state["planner_critic_feedback"] = {"verdict": "REVISE", "issues": issues}
+    state["planner_revision_sections"] = sections
+    return sections
+
+
+# ---------------------------------------------------------------------------
+# Planner loop bookkeeping (state is shared across campaigns in one session)
+# ---------------------------------------------------------------------------
+
+
+def reset_planner_iterations(callback_context: CallbackContext):
+    callback_context.state["planner_iterations"] = 0
+    callback_context.state["planner_iterations_saved"] = 0
+    callback_context.state["planner_revision_sections"] = []
+    # Drafts are injected as "previous version" inputs; don't carry them over
+    # from an earlier campaign in the same session.
+    for key in ("goal_plan", "segments_plan", "planner_critic_feedback"):
+        callback_context.state[key] = ""
+
+
+def _audience_size(report: dict, segments: list[tuple[str, list[str]]]) -> dict:
+    per_segment = [
+        {
+            "name": segment["name"],
+            "estimate": f"{segment['exclusive_users']:,} users after dedup "
+            f"({segment['matched_users']:,} match)",
+            "priority": segment["priority"],
+            "matched_users": segment["matched_users"],
+            "exclusive_users": segment["exclusive_users"],
+            "exclusive_rules": segment["exclusive_rules"],
+        }
+        for segment in report["segments"]
+    ]
+    per_segment += [
+        {"name": name, "estimate": f"not sized: {report['errors'][name]}"}
+        for name, _ in segments
+        if name in report.get("errors", {})
+    ]
+    union, total = report["union_users"], report["total_users"]
+    return {
+        "total_estimate": f"{union:,} unique users ({union / total:.1%} of {total:,}); "
+        f"segments sum to {report['sum_of_segments']:,}",
+        "per_segment": per_segment,
+        "union_users": union,
+        "double_counted_users": report["double_counted_users"],
+        "overlaps": report["overlaps"],
+    }
+
+
+def record_audience_overlap(callback_context: CallbackContext):
+    """Replaces the reporter's audience_size with counted, deduplicated sizes.
+
+    Segments are taken in the order the reporter lists them (priority order), so
+    Delivery can create one audience per segment from its `exclusive_rules` and no
+    user is targeted twice.
+    """
+    plan = parse_agent_json(callback_context.state.get("planner_result"))
+    if not isinstance(plan, dict) or not isinstance(plan.get("segments"), list):
+        return None
+    segments = []
+    for index, segment in enumerate(plan["segments"], start=1):
+        if not isinstance(segment, dict):
+            continue
+        rules = segment.get("eligibility_attributes") or []
+        segments.append(
+            (
+                str(segment.get("name") or f"segment_{index}"),
+                [rules] if isinstance(rules, str) else list(rules),
+            )
+        )
+    if not segments:
+        return None
+    report = get_audience_engine().overlap(segments)
+    plan["audience_size"] = _audience_size(report, segments)
+    callback_context.state["planner_result"] = json.dumps(plan, ensure_ascii=False)
+    return None
+
+
+def count_planner_iteration(callback_context: CallbackContext):
+    iterations = callback_context.state.get("planner_iterations", 0) + 1
+    callback_context.state["planner_iterations"] = iterations
+
 
-retry_config = types.HttpRetryOptions(
-    attempts=2,
-    exp_base=3,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
+def record_critic_feedback(
+    callback_context: CallbackContext, llm_response: LlmResponse
+):
+    """Handles a critic reply written as prose (no tool call).
+
+    An approval ("APPROVED", "Looks good") becomes an approve_plan call; any other
+    text is filed as a critique under both sections. The critic has no output_key:
+    after approve_plan/request_revision its final event is the text-less tool
+    response, and output_key would overwrite planner_critic_feedback with "".
+    """
+    if llm_response.partial or not llm_response.content:
+        return None
+    parts = llm_response.content.parts or []
+    if any(part.function_call for part in parts):
+        return None
+    feedback = "".join(part.text or "" for part in parts if not part.thought).strip()
+    if not feedback:
+        return None
+    if is_approval(feedback):
+        return LlmResponse(
+            content=types.Content(
+                role="model",
+                parts=[
+                    types.Part(
+                        function_call=types.FunctionCall(name="approve_plan", args={})
+                    )
+                ],
+            )
+        )
+    _record_revision(callback_context.state, [feedback], [feedback])
+    return None
+
+
+def precheck_plans(callback_context: CallbackContext):
+    """Sends plans with mechanical gaps back for revision without calling the critic model."""
+    stats = CRITIC_STATS["planner"]
+    stats.reviews += 1
+    if CRITIC_PRECHECK:
+        goal_plan_issues = check_goal_plan(callback_context.state.get("goal_plan"))
+        segments_plan_issues = check_segments_plan(
+            callback_context.state.get("segments_plan")
+        )
+        if goal_plan_issues or segments_plan_issues:
+            stats.precheck_rejections += 1
+            sections = _record_revision(
+                callback_context.state, goal_plan_issues, segments_plan_issues
+            )
+            issues = goal_plan_issues + segments_plan_issues
+            return types.Content(
+                role="model",
+                parts=[
+                    types.Part(
+                        text=f"Pre-check requested revision of {', '.join(sections)}:\n"
+                        + "\n".join(f"- {issue}" for issue in issues)
+                    )
+                ],
+            )
+    stats.llm_reviews += 1
+    return None
+
+
+def skip_unless_revised(output_key: str):
+    """In targeted mode, keeps `output_key` as is when the critic only rejected the other plan."""
+
+    def callback(callback_context: CallbackContext):
+        if PLANNER_LOOP_MODE != "targeted":
+            return None
+        sections = callback_context.state.get("planner_revision_sections")
+        if (
+            not sections
+            or output_key in sections
+            or output_key not in callback_context.state
+        ):
+            return None
+        return types.Content(
+            role="model",
+            parts=[
+                types.Part(
+                    text=f"`{output_key}` kept unchanged; the critic did not reject it."
+                )
+            ],
+        )
+
+    return callback
+
+
+# ---------------------------------------------------------------------------
+# Shared context prefetch (parallel planner mode only)
+# ---------------------------------------------------------------------------
+
+
+class PlannerContextAgent(BaseAgent):
+    """Looks up the internal data both planners need once per run, without a model call."""
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        frontline_result = str(ctx.session.state.get("frontline_result", ""))
+        internal_context = internal_data_agent_tool(frontline_result)
+        internal_context["mock_current_kpis"] = internal_data_agent_tool(
+            "mock_current_kpis"
+        )["mock_current_kpis"]
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(
+                state_delta={
+                    "planner_internal_context": json.dumps(internal_context),
+                    # Drafts from an earlier campaign in this session are stale.
+                    "goal_plan": "",
+                    "segments_plan": "",
+                }
+            ),
+        )
+
+
+market_research_agent = LlmAgent(
+    name="market_research_agent",
+    model=get_model("market_research_agent", Priority.CRITICAL),
+    description="Prefetches seasonal and competitor research shared by both planners.",
+    instruction=ScopedInstruction(
+        """
+    You are the Market Research Agent. Read the frontline package below and use the google_search tool
+    once or twice to collect seasonal patterns, competitor promotions, and industry benchmarks that the
+    Goal Planning and Segmentation agents will need. Reply with at most 8 concise, factual bullets.
+    """,
+        reads=("frontline_result",),
+    ),
+    include_contents="none",
+    tools=[google_search],
+    output_key="planner_market_context",
 )
 
+planner_context_prefetch_agent = ParallelAgent(
+    name="planner_context_prefetch_agent",
+    sub_agents=[
+        PlannerContextAgent(name="planner_internal_context_agent"),
+        market_research_agent,
+    ],
+)
+
+SHARED_CONTEXT_INSTRUCTION = (
+    """
+
+    Shared planner context (`planner_internal_context`, `planner_market_context` in your inputs) has
+    already been fetched for this run. Use it instead of calling `internal_data_agent_tool` or the Google
+    Search agent; only call them for data missing from it.
+    """
+    if PLANNER_PARALLEL
+    else ""
+)
+
+# State prefetched once per planner run in parallel mode.
+SHARED_CONTEXT_READS = (
+    ("planner_internal_context", "planner_market_context") if PLANNER_PARALLEL else ()
+)
 
-def segment_group_preparing_tool(segment_criteria: str) -> str:
-    return f"Segment Prepared: {segment_criteria}"
+enforce_goal_plan, repair_goal_plan = structured_output(GoalPlan)
+enforce_segments_plan, repair_segments_plan = structured_output(SegmentsPlan)
+enforce_planner_result, repair_planner_result = structured_output(PlannerResult)
 
 
 # Goal Planning Agent
 goal_planning_agent = LlmAgent(
     name="goal_planning_agent",
-    model=Gemini(model=MODEL, retry_options=retry_config),
+    model=get_model("goal_planning_agent", Priority.CRITICAL),
     description="Converts the frontline package into actionable campaign definition, actions, and KPIs.",
-    instruction="""
+    instruction=ScopedInstruction(
+        """
     You are the Goal Planning Agent. Take the `frontline_result` JSON, confirm the campaign_type, and
     craft the official campaign definition that the Planner group will own. You must translate the intake
     hypotheses into SPECIFIC action items, campaign narratives, and collaboration asks that Delivery can
@@ -71,17 +394,29 @@ goal_planning_agent = LlmAgent(
     }
     Every KPI target must be numeric (e.g., ">=20 QR transactions per user in 30 days" or "Pay >=10,000 THB
     this month to unlock a 200 THB reward next month").
-    """,
-    tools=[AgentTool(agent=search_agent), FunctionTool(func=internal_data_agent_tool)],
+    """ + SHARED_CONTEXT_INSTRUCTION,
+        reads=(
+            "frontline_result",
+            "goal_plan",
+            "planner_critic_feedback",
+            *SHARED_CONTEXT_READS,
+        ),
+    ),
+    include_contents="none",
+    tools=[search_agent_tool, FunctionTool(func=internal_data_agent_tool)],
+    before_agent_callback=skip_unless_revised("goal_plan"),
+    before_model_callback=enforce_goal_plan,
+    after_model_callback=repair_goal_plan,
     output_key="goal_plan",
 )
 
 # Segmentation Discovery Agent
 segmentation_discovery_agent = LlmAgent(
     name="segmentation_discovery_agent",
-    model=Gemini(model=MODEL, retry_options=retry_config),
+    model=get_model("segmentation_discovery_agent", Priority.CRITICAL),
     description="Turns the goal plan into explicit segments/audience instructions.",
-    instruction="""
+    instruction=ScopedInstruction(
+        """
     You are the Segmentation Discovery Agent. Pair the `goal_plan` with the frontline evidence to produce
     highly specific audience definitions. Each segment must describe who they are, why they matter to the
     action plan, how large they are, and what eligibility attributes or personalization hooks Delivery must
@@ -89,6 +424,11 @@ segmentation_discovery_agent = LlmAgent(
     detail (frequency, spend, reward) is missing, recommend it directly based on mock KPIs instead of escalating
     back to the user.
 
+    Size every segment with `find_audience_tool`, passing its `eligibility_attributes` (one field, comparison
+    and number each, e.g. "spend >=10,000 THB in 90 days", "QR share below 35%"). It counts the users who
+    match in milliseconds, so call it for all segments in the same turn and again after changing a rule. Set
+    `estimated_size` from its result, e.g. "45,212 users (4.5%, ~45 per 1,000)"; never guess a size.
+
     Provide JSON with:
     {
       "segment_overview": ["summary bullets tying segments back to campaign actions"],
@@ -111,45 +451,68 @@ segmentation_discovery_agent = LlmAgent(
           "next_best_action": str
         }
       ],
-      "tool_calls": record outputs from `segment_group_preparing_tool` whenever you need to materialize
-        a segment definition or pass it to Delivery tooling.
+      "tool_calls": [str] (one line per tool call summarizing its output, e.g.
+        "segment_group_preparing_tool: 2 segments, 195,386 users overlap; Active QR Dabblers keeps 170,766")
     }
 
-    Call `segment_group_preparing_tool` to draft any complex criteria objects and cite its outputs in
-    "tool_calls". Use the Google Search agent if market/seasonal insight is necessary.
-    """,
+    List segments in priority order (highest first) and call `segment_group_preparing_tool` once with all
+    of them, in that order (name + eligibility_attributes). It materializes every segment and returns their
+    overlaps and how many users each keeps after users are assigned to their highest-priority segment.
+    Tighten the rules of a segment whose `exclusive_users` is small, and summarize each call's output in one line of "tool_calls" (not the raw output). Use the Google Search agent if market/seasonal insight is necessary.
+    """ + SHARED_CONTEXT_INSTRUCTION,
+        reads=(
+            "frontline_result",
+            "goal_plan",
+            "segments_plan",
+            "planner_critic_feedback",
+            *SHARED_CONTEXT_READS,
+        ),
+    ),
+    include_contents="none",
     tools=[
         FunctionTool(func=segment_group_preparing_tool),
-        AgentTool(agent=search_agent),
+        FunctionTool(func=find_audience_tool),
+        search_agent_tool,
         FunctionTool(func=internal_data_agent_tool),
     ],
+    before_agent_callback=skip_unless_revised("segments_plan"),
+    before_model_callback=enforce_segments_plan,
+    after_model_callback=repair_segments_plan,
     output_key="segments_plan",
 )
 
 # Planner Critic Agent
 planner_critic_agent = LlmAgent(
     name="planner_critic_agent",
-    model=Gemini(model=MODEL, retry_options=retry_config),
+    model=get_model("planner_critic_agent", Priority.CRITICAL),
     description="Validates feasibility, conflicts, and downstream readiness for Planner outputs.",
-    instruction="""
+    instruction=ScopedInstruction(
+        """
     You are the Planner Critic Agent. Pressure-test both `goal_plan` and `segments_plan`:
     - Do the proposed campaign actions ladder up to the frontline objective and have clear owners?
     - Are the eligibility/email/push plans specific enough for Delivery to create content + audiences?
     - Are timelines, KPIs, and dependencies realistic and de-conflicted?
     - Do segments have concrete attributes, tooling notes, and coverage of total audience size?
 
-    If the plans meet the bar, respond exactly with "APPROVED". Otherwise provide concise, prioritized
-    feedback referencing which part (goal plan vs. segments) must change.
+    If the plans meet the bar, call the `approve_plan` tool and do not write anything else. Otherwise call
+    `request_revision` with concise, prioritized issues filed under the section that must change
+    (goal plan vs. segments); only the rejected section is revised in the next round.
     """,
-    output_key="planner_critic_feedback",
+        reads=("frontline_result.goal", "goal_plan", "segments_plan"),
+    ),
+    include_contents="none",
+    tools=[FunctionTool(func=approve_plan), FunctionTool(func=request_revision)],
+    before_agent_callback=[count_planner_iteration, precheck_plans],
+    after_model_callback=record_critic_feedback,
 )
 
 # Reporter Agent
 reporter_agent = LlmAgent(
     name="reporter_agent",
-    model=Gemini(model=MODEL, retry_options=retry_config),
+    model=get_model("reporter_agent", Priority.CRITICAL),
     description="Produces a clean, validated, normalized JSON for delivery.",
-    instruction="""
+    instruction=ScopedInstruction(
+        """
     You are the Reporter Agent, the final step of the Planner group. Merge the approved `goal_plan`
     and `segments_plan` into the orchestrator contract. Output JSON that Delivery can consume without
     guessing. Required shape:
@@ -163,11 +526,10 @@ reporter_agent = LlmAgent(
       "campaign_messaging": [
           {"audience": str, "message": str, "timeframe": str}
       ],
-      "segments": list of segment objects copied from `segments_plan`,
+      "segments": list of segment objects copied from `segments_plan`, in priority order (highest first),
       "kpi_targets": [
           {"metric": str, "baseline": str, "target": str, "unit": str, "timeframe": str}
       ],
-      "audience_size": {"total_estimate": str, "per_segment": [{"name": str, "estimate": str}]},
       "constraints": [str],
       "schedule_plan": {"launch_window": str, "cadences": [], "blockers": []},
       "delivery_plan": {
@@ -185,6 +547,9 @@ reporter_agent = LlmAgent(
       "references": {"audience_tools_used": [str], "frontline_links": [str], "notes": str}
     }
 
+    Leave out "audience_size": after you reply it is counted from the segments' eligibility_attributes,
+    with users in several segments assigned to the first one, so the total never double-counts.
+
     Ensure all narrative text is concise and grounded in the upstream evidence so Delivery can set
     eligibility, draft content (email + push), and finalize the campaign payloads immediately. Every
     KPI/threshold must state a numeric requirement such as ">=20 wallet transactions per user in 30 days"
@@ -194,10 +559,20 @@ reporter_agent = LlmAgent(
     metrics or creative details rather than pausing for user clarification; only surface clarifying questions
     alongside the final output if absolutely necessary.
     """,
+        reads=("frontline_result", "goal_plan", "segments_plan"),
+    ),
+    include_contents="none",
+    before_model_callback=enforce_planner_result,
+    after_model_callback=repair_planner_result,
     output_key="planner_result",
+    after_agent_callback=record_audience_overlap,
 )
 
 # Planner Loop + Manager Agent
+# Segmentation drafts after goal planning so its segments always follow the current
+# goal plan; only the context prefetch (independent of both) runs in parallel.
+planner_prefetch_agents = [planner_context_prefetch_agent] if PLANNER_PARALLEL else []
+
 planner_strategy_loop = LoopAgent(
     name="planner_strategy_loop",
     sub_agents=[
@@ -205,10 +580,16 @@ planner_strategy_loop = LoopAgent(
         segmentation_discovery_agent,
         planner_critic_agent,
     ],
-    max_iterations=3,
+    max_iterations=PLANNER_MAX_ITERATIONS,
+    before_agent_callback=reset_planner_iterations,
 )
 
+resume_planner, checkpoint_planner = checkpointed(
+    "planner_result", ("frontline_result",)
+)
 planner_manager_agent = SequentialAgent(
     name="planner_manager_agent",
-    sub_agents=[planner_strategy_loop, reporter_agent],
+    sub_agents=[*planner_prefetch_agents, planner_strategy_loop, reporter_agent],
+    before_agent_callback=resume_planner,
+    after_agent_callback=checkpoint_planner,
 )
@@ -0,0 +1,197 @@
+"""OpenTelemetry spans and metrics for agent turns, model and tool calls and loop rounds.
+
+ADK already opens a span for every agent run (`invoke_agent`), model call (`call_llm`)
+and tool call (`execute_tool`). `TelemetryPlugin` tags those with the agent, stage and
+loop round, and adds a `loop_iteration` span per LoopAgent round. The scheduler adds
+retries and queue wait to `call_llm`, and the search cache adds hit/miss to its tool
+span. Histograms are derived from the finished spans, so spans and metrics always
+agree.
+
+With CAMPAIGN_OPS_TELEMETRY=file, traces and metrics are appended as OTLP/JSON lines
+(the OpenTelemetry Collector file exporter format) for offline breakdowns; see
+`benchmarks/trace_breakdown.py`.
+"""
+
+from google.adk.agents import LoopAgent
+from google.adk.plugins.base_plugin import BasePlugin
+from opentelemetry import metrics, trace
+
+from .config import (
+    TELEMETRY_EXPORTER,
+    TELEMETRY_METRICS_INTERVAL_SECONDS,
+    TELEMETRY_PATH,
+)
+from .progress import agent_stage
+
+# Span attributes added on top of ADK's gen_ai.* ones.
+AGENT = "campaign_ops.agent"
+STAGE = "campaign_ops.stage"
+LOOP = "campaign_ops.loop"
+LOOP_ITERATION = "campaign_ops.loop.iteration"
+MODEL_RETRIES = "campaign_ops.model.retries"
+MODEL_QUEUE_WAIT = "campaign_ops.model.queue_wait_s"
+MODEL_TIER = "campaign_ops.model.tier"
+MODEL_ESCALATED = "campaign_ops.model.escalated"
+PROMPT_TOKENS_ESTIMATE = "campaign_ops.model.prompt_tokens_estimate"
+PROMPT_TOKENS_TRIMMED = "campaign_ops.model.prompt_tokens_trimmed"
+CACHE_HIT = "campaign_ops.cache.hit"
+CHECKPOINT_HIT = "campaign_ops.checkpoint.hit"
+SIMILARITY_HIT = "campaign_ops.similarity_cache.hit"
+SIMILARITY_SCORE = "campaign_ops.similarity_cache.score"
+
+_tracer = trace.get_tracer(__name__)
+_meter = metrics.get_meter(__name__)
+# Recorded from finished spans by telemetry_export.SpanMetricsProcessor.
+agent_duration = _meter.create_histogram(
+    "campaign_ops.agent.duration", unit="s", description="Agent run wall time"
+)
+model_duration = _meter.create_histogram(
+    "campaign_ops.model.duration", unit="s", description="Model call wall time"
+)
+model_tokens = _meter.create_histogram(
+    "campaign_ops.model.tokens", unit="{token}", description="Tokens per model call"
+)
+model_retries = _meter.create_counter(
+    "campaign_ops.model.retries", description="Model calls retried after a 429"
+)
+tool_duration = _meter.create_histogram(
+    "campaign_ops.tool.duration", unit="s", description="Tool call wall time"
+)
+loop_iteration_duration = _meter.create_histogram(
+    "campaign_ops.loop.iteration.duration",
+    unit="s",
+    description="LoopAgent round wall time",
+)
+cache_lookups = _meter.create_counter(
+    "campaign_ops.cache.lookups", description="Search cache and checkpoint lookups"
+)
+
+
+def _enclosing_loop(agent) -> LoopAgent | None:
+    agent = agent.parent_agent
+    while agent is not None and not isinstance(agent, LoopAgent):
+        agent = agent.parent_agent
+    return agent
+
+
+class TelemetryPlugin(BasePlugin):
+    """Tags ADK's spans with agent, stage and loop round; opens a span per loop round.
+
+    Every callback runs inside the span it tags (ADK opens the span first). Rounds are
+    keyed by invocation id, which the loop and its sub-agents share.
+    """
+
+    def __init__(self):
+        super().__init__(name="campaign_ops_telemetry")
+        self._loop_spans: dict[tuple[str, str], trace.Span] = {}
+        self._rounds: dict[tuple[str, str], tuple[int, trace.Span]] = {}
+
+    def _round(self, invocation_id: str, loop: LoopAgent | None) -> int | None:
+        if loop is None:
+            return None
+        current = self._rounds.get((invocation_id, loop.name))
+        return current[0] if current else None
+
+    def _tag(self, span: trace.Span, invocation_id: str, agent) -> None:
+        span.set_attribute(AGENT, agent.name)
+        stage = agent_stage(agent)
+        if stage:
+            span.set_attribute(STAGE, stage)
+        loop = agent if isinstance(agent, LoopAgent) else _enclosing_loop(agent)
+        iteration = self._round(invocation_id, loop)
+        if iteration is not None:
+            span.set_attribute(LOOP, loop.name)
+            span.set_attribute(LOOP_ITERATION, iteration)
+
+    def _end_round(self, key: tuple[str, str]) -> None:
+        current = self._rounds.pop(key, None)
+        if current:
+            current[1].end()
+
+    async def before_agent_callback(self, *, agent, callback_context):
+        invocation_id = callback_context.invocation_id
+        span = trace.get_current_span()
+        if isinstance(agent, LoopAgent):
+            self._loop_spans[(invocation_id, agent.name)] = span
+        loop = agent.parent_agent
+        if isinstance(loop, LoopAgent) and loop.sub_agents[0] is agent:
+            key = (invocation_id, loop.name)
+            previous = self._rounds.get(key)
+            self._end_round(key)
+            iteration = previous[0] + 1 if previous else 1
+            parent = self._loop_spans.get(key, trace.INVALID_SPAN)
+            round_span = _tracer.start_span(
+                f"loop_iteration {loop.name}",
+                context=trace.set_span_in_context(parent),
+                attributes={
+                    AGENT: loop.name,
+                    STAGE: agent_stage(loop) or "",
+                    LOOP: loop.name,
+                    LOOP_ITERATION: iteration,
+                },
+            )
+            self._rounds[key] = (iteration, round_span)
+        self._tag(span, invocation_id, agent)
+        return None
+
+    async def after_agent_callback(self, *, agent, callback_context):
+        if isinstance(agent, LoopAgent):
+            key = (callback_context.invocation_id, agent.name)
+            self._end_round(key)
+            self._loop_spans.pop(key, None)
+        return None
+
+    async def after_run_callback(self, *, invocation_context):
+        # Loops that ended without their after-callback (an error, a cancelled run).
+        for key in [
+            k for k in self._rounds if k[0] == invocation_context.invocation_id
+        ]:
+            self._end_round(key)
+        for key in [
+            k for k in self._loop_spans if k[0] == invocation_context.invocation_id
+        ]:
+            del self._loop_spans[key]
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        context = callback_context._invocation_context
+        self._tag(trace.get_current_span(), context.invocation_id, context.agent)
+        return None
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        context = tool_context._invocation_context
+        self._tag(trace.get_current_span(), context.invocation_id, context.agent)
+        return None
+
+
+_configured = None
+
+
+def setup_telemetry(
+    exporter: str = TELEMETRY_EXPORTER,
+    path: str = TELEMETRY_PATH,
+    metrics_interval_s: float = TELEMETRY_METRICS_INTERVAL_SECONDS,
+):
+    """Installs the exporters once per process; a no-op for exporter "off".
+
+    The OpenTelemetry SDK is only imported here, so it stays off the import path when
+    telemetry is off.
+    """
+    global _configured
+    if exporter in ("off", "none", "") or _configured is not None:
+        return _configured
+    from .telemetry_export import install
+
+    _configured = install(exporter, path, metrics_interval_s)
+    return _configured
+
+
+def shutdown_telemetry() -> None:
+    """Flushes pending spans and a final metrics collection."""
+    if _configured is None:
+        return
+    from opentelemetry.sdk.metrics import MeterProvider
+
+    _configured.force_flush()
+    meter_provider = metrics.get_meter_provider()
+    if isinstance(meter_provider, MeterProvider):
+        meter_provider.force_flush()
@@ -0,0 +1,205 @@
+"""OpenTelemetry SDK side of `telemetry`: exporters and span-derived metrics.
+
+Imported by `telemetry.setup_telemetry` only, so the SDK and protobuf JSON encoding
+stay off the import path when telemetry is off.
+"""
+
+import base64
+import json
+import logging
+import os
+import threading
+
+from google.protobuf.json_format import MessageToDict
+from opentelemetry import metrics, trace
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import (
+    ConsoleMetricExporter,
+    MetricExporter,
+    MetricExportResult,
+    PeriodicExportingMetricReader,
+)
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+    SpanExportResult,
+)
+
+from . import telemetry
+from .telemetry import (
+    AGENT,
+    CACHE_HIT,
+    CHECKPOINT_HIT,
+    LOOP,
+    LOOP_ITERATION,
+    MODEL_RETRIES,
+    SIMILARITY_HIT,
+    STAGE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SpanMetricsProcessor(SpanProcessor):
+    """Records the histograms and counters from each finished span."""
+
+    def on_end(self, span) -> None:
+        attributes = span.attributes or {}
+        duration_s = (span.end_time - span.start_time) / 1e9
+        agent = attributes.get(AGENT) or attributes.get("gen_ai.agent.name", "")
+        labels = {"agent": agent, "stage": attributes.get(STAGE, "")}
+        if span.name.startswith("invoke_agent"):
+            telemetry.agent_duration.record(duration_s, labels)
+            if CHECKPOINT_HIT in attributes:
+                telemetry.cache_lookups.add(
+                    1, {"cache": "checkpoint", "hit": attributes[CHECKPOINT_HIT]}
+                )
+            if SIMILARITY_HIT in attributes:
+                telemetry.cache_lookups.add(
+                    1,
+                    {
+                        "cache": "frontline_similarity",
+                        "hit": attributes[SIMILARITY_HIT],
+                    },
+                )
+        elif span.name == "call_llm":
+            labels["model"] = attributes.get("gen_ai.request.model", "")
+            telemetry.model_duration.record(duration_s, labels)
+            for direction, key in (
+                ("prompt", "gen_ai.usage.input_tokens"),
+                ("completion", "gen_ai.usage.output_tokens"),
+            ):
+                if attributes.get(key) is not None:
+                    telemetry.model_tokens.record(
+                        attributes[key], {**labels, "type": direction}
+                    )
+            if attributes.get(MODEL_RETRIES):
+                telemetry.model_retries.add(attributes[MODEL_RETRIES], labels)
+        elif span.name.startswith("execute_tool"):
+            labels["tool"] = attributes.get("gen_ai.tool.name", "")
+            telemetry.tool_duration.record(duration_s, labels)
+            if CACHE_HIT in attributes:
+                telemetry.cache_lookups.add(
+                    1, {"cache": "search", "hit": attributes[CACHE_HIT]}
+                )
+        elif span.name.startswith("loop_iteration"):
+            labels["loop"] = attributes.get(LOOP, "")
+            labels["iteration"] = attributes.get(LOOP_ITERATION, 0)
+            telemetry.loop_iteration_duration.record(duration_s, labels)
+
+
+def _hex_ids(value):
+    """OTLP/JSON encodes trace and span ids as hex, not protobuf JSON's base64."""
+    if isinstance(value, list):
+        return [_hex_ids(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {
+        key: (
+            base64.b64decode(item).hex()
+            if key in ("traceId", "spanId", "parentSpanId") and item
+            else _hex_ids(item)
+        )
+        for key, item in value.items()
+    }
+
+
+class _JsonLinesFile:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, message) -> None:
+        line = json.dumps(_hex_ids(MessageToDict(message)), separators=(",", ":"))
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class OtlpJsonFileSpanExporter(SpanExporter):
+    """Appends each batch of spans to `path` as one OTLP/JSON line."""
+
+    def __init__(self, path: str):
+        self._file = _JsonLinesFile(path)
+
+    def export(self, spans) -> SpanExportResult:
+        from opentelemetry.exporter.otlp.proto.common.trace_encoder import (
+            encode_spans,
+        )
+
+        self._file.append(encode_spans(spans))
+        return SpanExportResult.SUCCESS
+
+
+class OtlpJsonFileMetricExporter(MetricExporter):
+    """Appends each metrics collection to `path` as one OTLP/JSON line."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self._file = _JsonLinesFile(path)
+
+    def export(self, metrics_data, timeout_millis: float = 10_000, **kwargs):
+        from opentelemetry.exporter.otlp.proto.common.metrics_encoder import (
+            encode_metrics,
+        )
+
+        self._file.append(encode_metrics(metrics_data))
+        return MetricExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        return True
+
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs) -> None:
+        pass
+
+
+def _exporters(kind: str, path: str) -> tuple[SpanExporter, MetricExporter]:
+    if kind == "console":
+        return ConsoleSpanExporter(), ConsoleMetricExporter()
+    if kind == "file":
+        return (
+            OtlpJsonFileSpanExporter(os.path.join(path, "traces.jsonl")),
+            OtlpJsonFileMetricExporter(os.path.join(path, "metrics.jsonl")),
+        )
+    if kind == "otlp":
+        # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables.
+        from opentelemetry.exporter.otlp.proto.http.metric_exporter import (
+            OTLPMetricExporter,
+        )
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        return OTLPSpanExporter(), OTLPMetricExporter()
+    raise ValueError(f"Unknown telemetry exporter: {kind!r}")
+
+
+def install(exporter: str, path: str, metrics_interval_s: float) -> TracerProvider:
+    """Installs the exporters and the span metrics processor.
+
+    An SDK tracer provider installed earlier (e.g. by Agent Engine) is kept and the
+    local exporter is added to it.
+    """
+    span_exporter, metric_exporter = _exporters(exporter, path)
+    resource = Resource.create({"service.name": "campaign_ops_team"})
+
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider(resource=resource)
+        trace.set_tracer_provider(provider)
+    provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    provider.add_span_processor(SpanMetricsProcessor())
+
+    if isinstance(metrics.get_meter_provider(), MeterProvider):
+        logger.warning("A meter provider is already installed; not adding %s", exporter)
+    else:
+        reader = PeriodicExportingMetricReader(
+            metric_exporter, export_interval_millis=metrics_interval_s * 1000
+        )
+        metrics.set_meter_provider(
+            MeterProvider(resource=resource, metric_readers=[reader])
+        )
+    return provider
@@ -0,0 +1,302 @@
+"""Prompt size per agent and stage, and token budgets enforced before each model call.
+
+`TokenBudgetPlugin` estimates every model request before it is sent (the estimate the
+scheduler charges against the TPM budget) and records it per agent and stage in
+`TOKEN_STATS`. A request over its agent's budget (CAMPAIGN_OPS_TOKEN_BUDGET, or the
+agent's or stage's entry in CAMPAIGN_OPS_TOKEN_BUDGETS) loses context, lowest priority
+first, until it fits:
+
+1. earlier turns of the conversation, oldest first (only agents that include contents
+   see them, i.e. the orchestrator);
+2. the agent's own previous draft, read back while it revises (`intake_result`,
+   `goal_plan`, `segments_plan`);
+3. the critique of that draft (`critique`, `planner_critic_feedback`).
+
+Required inputs are never dropped: a request still over budget is sent as is, logged
+and counted. When a run ends, its token report (prompt tokens per stage and agent) is
+logged at INFO.
+"""
+
+import logging
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+
+from google.adk.plugins.base_plugin import BasePlugin
+from opentelemetry import trace
+
+from .config import TOKEN_BUDGET, TOKEN_BUDGETS
+from .context import ScopedInstruction, input_line
+from .progress import agent_stage
+from .rate_limit import CHARS_PER_TOKEN, content_chars, estimate_request_tokens
+from .telemetry import PROMPT_TOKENS_ESTIMATE, PROMPT_TOKENS_TRIMMED
+
+logger = logging.getLogger(__name__)
+
+# State keys holding a critic's feedback on the draft being revised.
+CRITIQUE_KEYS = ("critique", "planner_critic_feedback")
+
+
+@dataclass
+class PromptStats:
+    calls: int = 0
+    prompt_tokens: int = 0  # estimated, after trimming
+    max_prompt_tokens: int = 0
+    trimmed_calls: int = 0
+    trimmed_tokens: int = 0
+    over_budget: int = 0  # calls still over budget after trimming
+
+    def add(self, tokens: int, trimmed: int, over_budget: bool) -> None:
+        self.calls += 1
+        self.prompt_tokens += tokens
+        self.max_prompt_tokens = max(self.max_prompt_tokens, tokens)
+        self.trimmed_calls += trimmed > 0
+        self.trimmed_tokens += trimmed
+        self.over_budget += over_budget
+
+    def merge(self, other: "PromptStats") -> None:
+        for key, value in asdict(other).items():
+            if key == "max_prompt_tokens":
+                self.max_prompt_tokens = max(self.max_prompt_tokens, value)
+            else:
+                setattr(self, key, getattr(self, key) + value)
+
+    def as_dict(self) -> dict:
+        return dict(
+            asdict(self),
+            mean_prompt_tokens=self.prompt_tokens / self.calls if self.calls else 0.0,
+        )
+
+
+@dataclass
+class TokenReport:
+    """Estimated prompt tokens per agent and per stage.
+
+    Agents outside a stage (the orchestrator, the search agent) count as their own stage.
+    """
+
+    agents: dict[str, PromptStats] = field(default_factory=dict)
+    stages: dict[str, PromptStats] = field(default_factory=dict)
+    total: PromptStats = field(default_factory=PromptStats)
+    runs: int = 0
+
+    def add(
+        self,
+        agent_name: str,
+        stage: str | None,
+        tokens: int,
+        trimmed: int,
+        over_budget: bool,
+    ) -> None:
+        for stats in (
+            self.agents.setdefault(agent_name, PromptStats()),
+            self.stages.setdefault(stage or agent_name, PromptStats()),
+            self.total,
+        ):
+            stats.add(tokens, trimmed, over_budget)
+
+    def merge(self, other: "TokenReport") -> None:
+        for mine, theirs in ((self.agents, other.agents), (self.stages, other.stages)):
+            for name, stats in theirs.items():
+                mine.setdefault(name, PromptStats()).merge(stats)
+        self.total.merge(other.total)
+        self.runs += other.runs
+
+    def as_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "total": self.total.as_dict(),
+            "stages": {name: s.as_dict() for name, s in self.stages.items()},
+            "agents": {name: s.as_dict() for name, s in self.agents.items()},
+        }
+
+    def summary(self) -> str:
+        """One line: total tokens, then tokens per stage and the largest agents."""
+        agents = sorted(
+            self.agents.items(), key=lambda item: item[1].prompt_tokens, reverse=True
+        )
+        return (
+            f"~{self.total.prompt_tokens} prompt tokens in {self.total.calls} model calls"
+            f" (trimmed ~{self.total.trimmed_tokens}, over budget"
+            f" {self.total.over_budget}); stages "
+            + ", ".join(f"{n}={s.prompt_tokens}" for n, s in self.stages.items())
+            + "; largest "
+            + ", ".join(
+                f"{n}={s.prompt_tokens} (max {s.max_prompt_tokens})"
+                for n, s in agents[:5]
+            )
+        )
+
+
+# Process-wide totals of every finished run.
+TOKEN_STATS = TokenReport()
+
+# (estimated tokens, trimmed tokens) of the model call in flight; its before and after
+# callbacks run in the same task.
+_CALL: ContextVar[tuple[int, int] | None] = ContextVar(
+    "budgeted_model_call", default=None
+)
+
+
+@dataclass
+class _Run:
+    invocation_id: str
+    session_service: object
+    report: TokenReport = field(default_factory=TokenReport)
+    done: bool = False
+
+
+# The outermost run in flight. AgentTool child runs (and the tasks of parallel tool
+# calls) inherit it, so their model calls count towards the run that started them.
+_RUN: ContextVar[_Run | None] = ContextVar("token_budget_run", default=None)
+
+
+def budget_for(agent_name: str, stage: str | None) -> int:
+    """The agent's budget, else its stage's, else the default (0: no budget)."""
+    if agent_name in TOKEN_BUDGETS:
+        return TOKEN_BUDGETS[agent_name]
+    return TOKEN_BUDGETS.get(stage or "", TOKEN_BUDGET)
+
+
+def _opens_turn(content) -> bool:
+    parts = content.parts or []
+    return content.role == "user" and any(
+        part.text and not part.thought for part in parts
+    )
+
+
+def _trim_history(llm_request, excess: int) -> int:
+    """Drops earlier turns, oldest first, until `excess` tokens are gone."""
+    contents = llm_request.contents
+    starts = [i for i, content in enumerate(contents) if _opens_turn(content)]
+    if len(starts) < 2:
+        return 0
+    # Whole turns only, so a function call is never separated from its response.
+    cut, chars = 0, 0
+    for start in starts[1:]:
+        chars += sum(content_chars(c) for c in contents[cut:start])
+        cut = start
+        if chars // CHARS_PER_TOKEN >= excess:
+            break
+    del contents[:cut]
+    return chars // CHARS_PER_TOKEN
+
+
+def _trim_inputs(callback_context, llm_request, excess: int) -> int:
+    """Drops the agent's previous draft, then the critique, from its Inputs."""
+    agent = callback_context._invocation_context.agent
+    config = llm_request.config
+    if not isinstance(getattr(agent, "instruction", None), ScopedInstruction):
+        return 0
+    if not config or not isinstance(config.system_instruction, str):
+        return 0
+    reads = agent.instruction.reads
+    output_key = getattr(agent, "output_key", None)
+    droppable = [p for p in reads if p.split(".")[0] == output_key] + [
+        p for p in reads if p.split(".")[0] in CRITIQUE_KEYS
+    ]
+    chars = 0
+    for path in droppable:
+        line = input_line(callback_context, path)
+        if line and line + "\n" in config.system_instruction:
+            config.system_instruction = config.system_instruction.replace(
+                line + "\n", "", 1
+            )
+            chars += len(line) + 1
+            if chars // CHARS_PER_TOKEN >= excess:
+                break
+    return chars // CHARS_PER_TOKEN
+
+
+class TokenBudgetPlugin(BasePlugin):
+    """Estimates, records and budgets the prompt of every model call.
+
+    Each outermost run's report lives in a context variable that the stages' child
+    runs inherit, so concurrent sessions, even of one user, never share a report. The
+    report is logged when the outermost run ends; a run that fails is discarded.
+    """
+
+    def __init__(self, stats: TokenReport = TOKEN_STATS):
+        super().__init__(name="campaign_ops_token_budget")
+        self.stats = stats
+
+    async def before_run_callback(self, *, invocation_context):
+        run = _RUN.get()
+        # AgentTool runs its agent with a new session service; a run on the same one
+        # as the current run is not its child but the next run in this task, after
+        # the current one failed.
+        if (
+            run is None
+            or run.done
+            or run.session_service is invocation_context.session_service
+        ):
+            if run is not None and not run.done:
+                logger.debug(
+                    "Discarding the token report of failed invocation %s",
+                    run.invocation_id,
+                )
+            _RUN.set(
+                _Run(
+                    invocation_context.invocation_id,
+                    invocation_context.session_service,
+                )
+            )
+        return None
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        context = callback_context._invocation_context
+        agent_name = callback_context.agent_name
+        stage = agent_stage(context.agent)
+        budget = budget_for(agent_name, stage)
+        tokens = estimate_request_tokens(llm_request)
+        trimmed = 0
+        for trim in (
+            lambda excess: _trim_history(llm_request, excess),
+            lambda excess: _trim_inputs(callback_context, llm_request, excess),
+        ):
+            if not budget or tokens - trimmed <= budget:
+                break
+            trimmed += trim(tokens - trimmed - budget)
+        if trimmed:
+            tokens = estimate_request_tokens(llm_request)
+            logger.info(
+                "Trimmed ~%d tokens of low-priority context from %s's prompt",
+                trimmed,
+                agent_name,
+            )
+        over_budget = bool(budget) and tokens > budget
+        if over_budget:
+            logger.warning(
+                "%s's prompt is ~%d tokens, over its budget of %d",
+                agent_name,
+                tokens,
+                budget,
+            )
+        run = _RUN.get()
+        if run:
+            run.report.add(agent_name, stage, tokens, trimmed, over_budget)
+        _CALL.set((tokens, trimmed))
+        return None
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        call = _CALL.get()
+        if call is None or llm_response.partial:
+            return None
+        _CALL.set(None)
+        span = trace.get_current_span()  # ADK's call_llm span
+        span.set_attribute(PROMPT_TOKENS_ESTIMATE, call[0])
+        span.set_attribute(PROMPT_TOKENS_TRIMMED, call[1])
+        return None
+
+    async def after_run_callback(self, *, invocation_context):
+        run = _RUN.get()
+        if run is None or run.invocation_id != invocation_context.invocation_id:
+            return  # a stage or tool run by an agent; the outermost run reports
+        run.done = True
+        _RUN.set(None)
+        run.report.runs = 1
+        self.stats.merge(run.report)
+        logger.info(
+            "Token report for invocation %s: %s",
+            run.invocation_id,
+            run.report.summary(),
+        )
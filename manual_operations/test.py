@@ -37,6 +37,13 @@ async def main():
                 session_id=session["id"],
                 message=input_message,
             ):
+                # Progress from inside the stages; see campaign_ops_team/progress.py
+                progress = (event.get("custom_metadata") or {}).get(
+                    "campaign_ops_progress"
+                )
+                if progress:
+                    print(f"  · {event['content']['parts'][0]['text']}")
+                    continue
                 try:
                     print(event["content"]["parts"][0]["text"])
                 except (KeyError, IndexError, TypeError):
@@ -0,0 +1,28 @@
+"""Session services ADK loads from the agents directory for `adk web` / `adk api_server`.
+
+uv run adk web --session_service_uri campaign-ops-sqlite:///.cache/sessions.sqlite3
+"""
+
+from urllib.parse import urlparse
+
+from google.adk.cli.service_registry import get_service_registry
+
+
+def compacting_sqlite_session_service(uri: str, **kwargs):
+    from campaign_ops_team.config import (
+        SESSION_COMPACT_TOKENS,
+        SESSION_DB_PATH,
+        SESSION_KEEP_CAMPAIGNS,
+    )
+    from campaign_ops_team.sessions import CompactingSqliteSessionService
+
+    return CompactingSqliteSessionService(
+        urlparse(uri).path.removeprefix("/") or SESSION_DB_PATH,
+        compact_tokens=SESSION_COMPACT_TOKENS,
+        keep_campaigns=SESSION_KEEP_CAMPAIGNS,
+    )
+
+
+get_service_registry().register_session_service(
+    "campaign-ops-sqlite", compacting_sqlite_session_service
+)